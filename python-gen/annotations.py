@@ -0,0 +1,114 @@
+import os
+import json
+
+from reportlab.pdfbase.pdfmetrics import stringWidth, getAscentDescent
+
+# Ground-truth OCR annotations recorded while invoices are drawn.
+#
+# Every annotated string is measured with the current font and mapped through the
+# canvas transform, so boxes include the page skew applied to dirty invoices.
+# Coordinates are PDF points with the origin at the bottom-left of the page:
+# 'quad' is the rotated text box (four corners, counter-clockwise from the
+# baseline start) and 'bbox' is its axis-aligned bound [x0, y0, x1, y1].
+
+class InvoiceAnnotations:
+    """Field positions for one invoice PDF."""
+
+    def __init__(self, file_name, customer_id, page_size):
+        self.file_name = file_name
+        self.customer_id = customer_id
+        self.page_size = page_size
+        self.page = 1
+        self.skew = 0.0
+        self.has_errors = False
+        self.fields = []
+
+    def record(self, canvas, field, x, y, text, **extra):
+        """Record a string drawn with its baseline start at (x, y) in user space."""
+        font, size = canvas._fontname, canvas._fontsize
+        width = stringWidth(text, font, size)
+        ascent, descent = getAscentDescent(font, size)
+        quad = [canvas.absolutePosition(px, py) for px, py in
+                ((x, y + descent), (x + width, y + descent), (x + width, y + ascent), (x, y + ascent))]
+        xs = [point[0] for point in quad]
+        ys = [point[1] for point in quad]
+        entry = {
+            'page': self.page,
+            'field': field,
+            'text': text,
+            'bbox': [round(min(xs), 2), round(min(ys), 2), round(max(xs), 2), round(max(ys), 2)],
+            'quad': [[round(px, 2), round(py, 2)] for px, py in quad]
+        }
+        entry.update(extra)
+        self.fields.append(entry)
+
+    def next_page(self):
+        self.page += 1
+
+    def to_dict(self):
+        return {
+            'file': self.file_name,
+            'customer_id': self.customer_id,
+            'page_size': [round(self.page_size[0], 2), round(self.page_size[1], 2)],
+            'pages': self.page,
+            'skew': round(self.skew, 4),
+            'has_errors': self.has_errors,
+            'fields': self.fields
+        }
+
+def draw_text(canvas, x, y, text, field=None, annotations=None, **extra):
+    """drawString that also records the string when annotations are being collected."""
+    canvas.drawString(x, y, text)
+    if annotations is not None and field is not None:
+        annotations.record(canvas, field, x, y, text, **extra)
+
+class AnnotationWriter:
+    """Writes one JSON line per invoice, in batches.
+
+    With keep_previous, the lines of an existing file are kept in memory by file
+    name so invoices skipped by an incremental build can carry them over.
+    """
+
+    def __init__(self, path, batch_size=256, keep_previous=False):
+        self.path = path
+        self.batch_size = batch_size
+        self.pending = []
+        self.count = 0
+        self.previous = {}
+        if keep_previous and os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        self.previous[json.loads(line)['file']] = line.rstrip('\n')
+        self.file = open(path, 'w')
+
+    def write(self, annotations):
+        self.pending.append(json.dumps(annotations.to_dict(), separators=(',', ':')))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def carry_over(self, file_name):
+        """Write the previous run's line for file_name; False if there is none."""
+        line = self.previous.get(file_name)
+        if line is None:
+            return False
+        self.pending.append(line)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        return True
+
+    def flush(self):
+        if self.pending:
+            self.file.write('\n'.join(self.pending) + '\n')
+            self.count += len(self.pending)
+            self.pending = []
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,48 @@
+import os
+import json
+import hashlib
+
+# Content-addressed build cache for invoices.
+#
+# Each invoice gets a digest over everything that affects its PDF (rendered customer
+# fields, line items, style options, seed and distortion decision). The manifest maps
+# PDF file names to the digest they were built from, so a re-run skips every invoice
+# whose digest matches and whose file still exists.
+
+def digest(*parts):
+    """Return a stable SHA-256 hex digest over JSON-serializable parts."""
+    data = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+class BuildCache:
+    """Manifest of built files and their input digests, stored as 'name<TAB>digest' lines."""
+
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self.entries = {}
+        self.skipped = 0
+        self.built = 0
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r') as f:
+                for line in f:
+                    name, _, value = line.rstrip('\n').partition('\t')
+                    if value:
+                        self.entries[name] = value
+
+    def is_current(self, name, value, path):
+        """True if name was built from the same digest and its output still exists."""
+        current = self.entries.get(name) == value and os.path.exists(path)
+        if current:
+            self.skipped += 1
+        return current
+
+    def record(self, name, value):
+        self.entries[name] = value
+        self.built += 1
+
+    def save(self):
+        """Write the manifest atomically."""
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.writelines(f"{name}\t{value}\n" for name, value in self.entries.items())
+        os.replace(tmp_path, self.manifest_path)
@@ -0,0 +1,63 @@
+import core as c
+import helpers as h
+
+# Column-plugin registry for the people table.
+#
+# Every column name maps to the handler that produces it. Bundle handlers (the identity
+# and geolocation bundles in core.py) produce several columns from one call, so they are
+# registered once for all of their columns. Handlers are resolved when a column list is
+# compiled, not on every cell, and only the handlers the chosen columns need are called.
+
+# column name -> (handler, position in the handler's result or None for a scalar handler)
+COLUMN_PLUGINS = {}
+
+IDENTITY_COLUMNS = ('gender', 'name_prefix', 'name_first', 'name_last', 'email', 'employment')
+GEOLOCATION_COLUMNS = ('address', 'city', 'county', 'state', 'postal_code')
+
+def register_column(name, handler):
+    """Register a handler returning the value of a single column."""
+    COLUMN_PLUGINS[name] = (handler, None)
+
+def register_bundle(names, handler):
+    """Register a handler returning a sequence of values, one per name."""
+    for position, name in enumerate(names):
+        COLUMN_PLUGINS[name] = (handler, position)
+
+def available_columns():
+    """Return the names of all registered columns."""
+    return list(COLUMN_PLUGINS)
+
+def compile_row_builder(columns):
+    """Resolve a column list into a function that generates one row tuple.
+
+    Raises ValueError for unknown column names.
+    """
+    unknown = [name for name in columns if name not in COLUMN_PLUGINS]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+
+    handlers = []
+    slots = []
+    for name in columns:
+        handler, position = COLUMN_PLUGINS[name]
+        if handler not in handlers:
+            handlers.append(handler)
+        slots.append((handlers.index(handler), position))
+    handlers = tuple(handlers)
+    slots = tuple(slots)
+
+    def build_row():
+        values = [handler() for handler in handlers]
+        return tuple(values[index] if position is None else values[index][position] for index, position in slots)
+
+    return build_row
+
+# Core handlers (see core.handlers)
+register_column('customer_id', c.nextId)
+register_bundle(IDENTITY_COLUMNS, c.coreIdentityBundle)
+register_bundle(GEOLOCATION_COLUMNS, c.coreGeolocationBundle)
+register_column('birth_dt', c.birthDateHandler)
+
+# Extra handlers (see helpers.extrahandlers)
+for _name, _handler in h.extrahandlers.items():
+    register_column(_name, getattr(h, _handler))
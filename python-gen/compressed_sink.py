@@ -0,0 +1,172 @@
+import zlib
+import queue
+import threading
+
+# Compressed output streams for the CSV tables.
+#
+# Text is buffered into blocks on the generating thread and handed to a background
+# thread that compresses and writes them, so compression overlaps generation.
+# gzip uses the standard library; zstd and lz4 need the zstandard / lz4 packages.
+#
+# In splittable mode every block is compressed as an independent gzip member / zstd
+# frame / lz4 frame that starts on a line boundary, and a "<path>.idx" sidecar lists
+# "compressed_offset,uncompressed_offset" for each block so readers can split the
+# file and decompress blocks in parallel.
+
+CODECS = {
+    'gzip': '.gz',
+    'zstd': '.zst',
+    'lz4': '.lz4'
+}
+
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024
+
+def compressed_path(path, codec):
+    """Return the output path with the codec's file extension appended."""
+    return path + CODECS[codec] if codec in CODECS else path
+
+def make_stream_compressor(codec, level=None):
+    """Return a (compress, flush) pair for one continuous compressed stream."""
+    if codec == 'gzip':
+        compressor = zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 31)
+        return compressor.compress, compressor.flush
+    if codec == 'zstd':
+        zstandard = _require('zstandard', 'zstd')
+        compressor = zstandard.ZstdCompressor(level=3 if level is None else level).compressobj()
+        return compressor.compress, compressor.flush
+    if codec == 'lz4':
+        lz4_frame = _require('lz4.frame', 'lz4')
+        compressor = lz4_frame.LZ4FrameCompressor(compression_level=0 if level is None else level)
+        header = [compressor.begin()]
+
+        def compress(data):
+            return (header.pop() if header else b'') + compressor.compress(data)
+
+        def flush():
+            return (header.pop() if header else b'') + compressor.flush()
+        return compress, flush
+    raise ValueError(f"Unknown codec: {codec}")
+
+def make_block_compressor(codec, level=None):
+    """Return a function compressing one block into a self-contained member/frame."""
+    if codec == 'gzip':
+        import gzip
+        return lambda data: gzip.compress(data, 6 if level is None else level, mtime=0)
+    if codec == 'zstd':
+        zstandard = _require('zstandard', 'zstd')
+        return zstandard.ZstdCompressor(level=3 if level is None else level).compress
+    if codec == 'lz4':
+        lz4_frame = _require('lz4.frame', 'lz4')
+        return lambda data: lz4_frame.compress(data, compression_level=0 if level is None else level)
+    raise ValueError(f"Unknown codec: {codec}")
+
+def _require(module, codec):
+    """Import an optional compression module or explain how to install it."""
+    import importlib
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        package = module.split('.')[0]
+        raise RuntimeError(f"The {codec} codec requires the {package} package (pip install {package})")
+
+class CompressedWriter:
+    """File-like text sink that compresses on a background thread."""
+
+    def __init__(self, path, codec='gzip', splittable=False, block_size=DEFAULT_BLOCK_SIZE, level=None, max_pending=4):
+        if codec not in CODECS:
+            raise ValueError(f"codec must be one of {tuple(CODECS)}")
+        self.path = path
+        self.codec = codec
+        self.splittable = splittable
+        self.block_size = block_size
+        if splittable:
+            self.compress_block = make_block_compressor(codec, level)
+        else:
+            self.compress, self.compress_flush = make_stream_compressor(codec, level)
+        self.pending = []
+        self.pending_size = 0
+        self.index = []
+        self.error = None
+        self.file = open(path, 'wb')
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.thread = threading.Thread(target=self._run, name=f"compress-{codec}", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        """Background loop: compress queued blocks and write them in order."""
+        compressed_offset = 0
+        uncompressed_offset = 0
+        while True:
+            block = self.queue.get()
+            if block is None:
+                if not self.splittable and self.error is None:
+                    self.file.write(self.compress_flush())
+                return
+            if self.error is not None:
+                continue
+            try:
+                if self.splittable:
+                    data = self.compress_block(block)
+                    self.index.append((compressed_offset, uncompressed_offset))
+                    compressed_offset += len(data)
+                    uncompressed_offset += len(block)
+                else:
+                    data = self.compress(block)
+                self.file.write(data)
+            except Exception as exc:
+                self.error = exc
+
+    def _submit(self, block):
+        if self.error is not None:
+            raise self.error
+        self.queue.put(block)
+
+    def write(self, text):
+        """Buffer text, handing full blocks to the compression thread."""
+        data = text.encode('utf-8')
+        self.pending.append(data)
+        self.pending_size += len(data)
+        if self.pending_size >= self.block_size:
+            buffered = b''.join(self.pending)
+            # Blocks always end on a line boundary so each split holds whole rows
+            cut = buffered.rfind(b'\n') + 1
+            if cut == 0:
+                cut = len(buffered)
+            self._submit(buffered[:cut])
+            rest = buffered[cut:]
+            self.pending = [rest] if rest else []
+            self.pending_size = len(rest)
+        return len(text)
+
+    def close(self):
+        """Flush remaining text, wait for the compression thread and write the index."""
+        if self.file.closed:
+            return
+        if self.pending_size:
+            self._submit(b''.join(self.pending))
+            self.pending = []
+            self.pending_size = 0
+        self.queue.put(None)
+        self.thread.join()
+        self.file.close()
+        if self.error is not None:
+            raise self.error
+        if self.splittable:
+            with open(self.path + '.idx', 'w') as f:
+                f.write("compressed_offset,uncompressed_offset\n")
+                f.writelines(f"{c},{u}\n" for c, u in self.index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def open_output(path, codec=None, splittable=False, block_size=DEFAULT_BLOCK_SIZE, writer=None):
+    """Open a CSV output path, compressed when a codec is given.
+
+    Uncompressed output goes through the OutputWriter's I/O threads when one is given.
+    """
+    if not codec or codec == 'none':
+        return writer.open(path) if writer is not None else open(path, 'w')
+    return CompressedWriter(compressed_path(path, codec), codec, splittable, block_size)
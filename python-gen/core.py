@@ -5,6 +5,7 @@ import string
 import os
 
 import inputs as i
+import ids
 
 # this file does a few things
 # 1. creates an identity bundle, 
@@ -63,8 +64,10 @@ earliest_possible_birthday = datetime.date.today() - datetime.timedelta(days=273
 #time_between_dates = birthday_end_date - birthday_start_date
 #birthday_days_between_dates = time_between_dates.days
 
-# generates a 16 char random key
+# generates a 16 char random key, from the bulk id service for the default shape
 def nextId(size=16, chars=string.ascii_lowercase + string.digits):
+	if size == 16 and chars == string.ascii_lowercase + string.digits:
+		return ids.customer_id()
 	uniqueid = ''.join(random.choice(chars) for _ in range(size))
 	return uniqueid
 
@@ -77,23 +80,23 @@ def coreIdentityBundle():
 	gender = "F" if randomlySelected(6, 11) else "M"
 	identity.append(gender)
 
-	prefix = random.choice(i.df_prefix_female) if gender == "F" else random.choice(i.df_prefix_male)
+	prefix = i.ws_prefix_female.choice() if gender == "F" else i.ws_prefix_male.choice()
 	identity.append(prefix)
 
-	firstname = random.choice(i.df_firstnames_female) if gender == "F" else random.choice(i.df_firstnames_male)
+	firstname = i.ws_firstnames_female.choice() if gender == "F" else i.ws_firstnames_male.choice()
 	identity.append(firstname)
 
-	lastname = random.choice(i.df_lastnames)
+	lastname = i.ws_lastnames.choice()
 	identity.append(lastname)
 	
-	employment = random.choice(i.df_companies)
-	temptld = random.choice(i.df_tld)
+	employment = i.ws_companies.choice()
+	temptld = i.ws_tld.choice()
 
 	# out of 100, what are we going to do for a variety of emails?
 	dice = random.randint(1,100)
 	if dice >= 75:
 		# email gen random word plus first name
-		email = ''.join(random.choice(i.df_randowords)) + "_" + firstname.lower() + "@" + ''.join(e for e in employment if e.isalnum()).lower() + '.' + temptld
+		email = i.ws_randowords.choice() + "_" + firstname.lower() + "@" + ''.join(e for e in employment if e.isalnum()).lower() + '.' + temptld
 	elif dice >= 50:
 		# FIRST AND LAST NAME
 		email = firstname.lower() + lastname.lower() + "@" + ''.join(e for e in employment if e.isalnum()).lower() + '.' + temptld
@@ -112,12 +115,12 @@ def coreIdentityBundle():
 #  generates an geolocation bundle, defined as: "address, city, state, postalcode"
 def coreGeolocationBundle():
 	geolocation = []
-	geolocation.append( str(random.randint(100,9999)) + " " + random.choice(i.df_streetnames))
-	citystatecombo = random.choice(i.df_city_county_state).split(',')
+	geolocation.append( str(random.randint(100,9999)) + " " + i.ws_streetnames.choice())
+	citystatecombo = i.ws_city_county_state.choice().split(',')
 	geolocation.append(citystatecombo[0])
 	geolocation.append(citystatecombo[1])
 	geolocation.append(citystatecombo[2])
-	geolocation.append(random.choice(i.df_postalcodes))
+	geolocation.append(i.ws_postalcodes.choice())
 	return geolocation
 
 # picks a random birthday
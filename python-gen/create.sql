@@ -29,7 +29,8 @@ CREATE TABLE transactions (
     numberofitems int,
     productcode varchar(255),
     productcategory varchar(255),
-    cc_number varchar(30)
+    cc_number varchar(30),
+    price_per_unit decimal
     )
 
 CREATE TABLE social (
@@ -42,3 +43,10 @@ CREATE TABLE social (
     social_uuid4 varchar(255)
     )
 
+CREATE TABLE social_interactions (
+    interaction_id varchar(255),
+    person1_id varchar(255),
+    person2_id varchar(255),
+    interaction_type varchar(50),
+    interaction_date timestamp
+    )
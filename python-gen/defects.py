@@ -0,0 +1,202 @@
+import random
+import string
+
+import numpy as np
+
+import ids
+from records import ColumnTable
+
+# Data-quality defect injection for the people table.
+#
+# DefectInjector dirties a batch of generated people rows in place: typos in names
+# and addresses, missing fields, malformed emails and phone numbers, and duplicated
+# customers with small variations. For each batch every decision - which rows get
+# which defect, which column, which edit, at which character position - is drawn up
+# front as NumPy arrays (one row of masks per defect kind), so Python code only runs
+# for the cells that are actually changed.
+#
+# Every change is recorded in a defect log with the customer, column, defect, the
+# value before and the value after it. Entries are in the order they were applied,
+# so replaying them over the clean table gives the dirty one, and undoing them in
+# reverse restores it. Duplicates get the ID of index num_customers + the original's
+# index (ids.customer_id_for), so shards and workers assign them without coordinating.
+#
+# The decisions come from a NumPy generator seeded from the random module, so seeded
+# runs (and each chunk of a parallel run) inject the same defects every time.
+
+DEFECT_KINDS = ('duplicate', 'typo', 'email', 'phone', 'missing')
+DEFECT_COLUMNS = ('customer_id', 'column', 'defect', 'original', 'value')
+# Columns that get typos, and columns that can go missing (never the customer_id key)
+TYPO_COLUMNS = ('name_first', 'name_last', 'address', 'city')
+KEY_COLUMN = 'customer_id'
+# What a missing field looks like
+MISSING_VALUES = ('', '', 'N/A', 'null')
+# Typo edits: swap two neighbouring characters, drop one, double one or replace one
+TYPO_EDITS = ('swap', 'drop', 'double', 'replace')
+# Email breakages: no '@', two '@'s, no top-level domain, a space, a comma for the dot
+EMAIL_EDITS = ('no_at', 'double_at', 'no_tld', 'space', 'comma')
+# Phone breakages: drop a digit, a letter for a digit, extra digits, cut in half
+PHONE_EDITS = ('drop_digit', 'letter', 'extra_digits', 'truncate')
+# Letters that get mistaken for digits
+DIGIT_LOOKALIKES = 'OlIZSB'
+# Variations that tell a duplicate apart from its original
+DUPLICATE_VARIATIONS = ('typo', 'case', 'whitespace', 'missing')
+
+def typo(value, edit, fraction, letter):
+    """Apply one typo edit at the character position given as a fraction of the length."""
+    if not value:
+        return value
+    position = min(int(fraction * len(value)), len(value) - 1)
+    if edit == 'swap' and len(value) > 1:
+        position = min(position, len(value) - 2)
+        return value[:position] + value[position + 1] + value[position] + value[position + 2:]
+    if edit == 'drop' and len(value) > 1:
+        return value[:position] + value[position + 1:]
+    if edit == 'double':
+        return value[:position + 1] + value[position:]
+    replacement = letter.upper() if value[position].isupper() else letter
+    if replacement == value[position]:
+        replacement = 'x' if letter != 'x' else 'q'
+    return value[:position] + replacement + value[position + 1:]
+
+def break_email(value, edit, fraction):
+    """Make an email address malformed."""
+    user, at, domain = value.partition('@')
+    if not at:
+        return value + '@'
+    if edit == 'no_at':
+        return user + domain
+    if edit == 'double_at':
+        return user + '@@' + domain
+    if edit == 'no_tld' and '.' in domain:
+        return user + '@' + domain.rsplit('.', 1)[0]
+    if edit == 'comma' and '.' in domain:
+        return user + '@' + domain.replace('.', ',', 1)
+    position = min(int(fraction * len(value)), len(value) - 1)
+    return value[:position] + ' ' + value[position:]
+
+def break_phone(value, edit, fraction, digits):
+    """Make a phone number malformed."""
+    positions = [position for position, char in enumerate(value) if char.isdigit()]
+    if not positions:
+        return value + digits
+    position = positions[min(int(fraction * len(positions)), len(positions) - 1)]
+    if edit == 'drop_digit':
+        return value[:position] + value[position + 1:]
+    if edit == 'letter':
+        return value[:position] + DIGIT_LOOKALIKES[int(value[position]) % len(DIGIT_LOOKALIKES)] + value[position + 1:]
+    if edit == 'extra_digits':
+        return value + digits
+    return value[:len(value) // 2]
+
+def new_defect_log():
+    """Return an empty compact table for defect log entries."""
+    return ColumnTable(DEFECT_COLUMNS, categorical=('column', 'defect'))
+
+class DefectInjector:
+    """Injects defects into people row batches at a rate per defect kind, logging each change."""
+
+    def __init__(self, rate, kinds=DEFECT_KINDS, num_customers=0):
+        """rate is the percentage (0-100) of rows that get each kind of defect."""
+        unknown = [kind for kind in kinds if kind not in DEFECT_KINDS]
+        if unknown:
+            raise ValueError(f"Unknown defect kind(s): {', '.join(unknown)}")
+        self.rate = rate / 100.0
+        self.kinds = tuple(kinds)
+        self.num_customers = num_customers
+
+    def inject(self, people_rows, first_customer=0):
+        """Dirty a batch of people rows whose first row is customer index first_customer.
+
+        Duplicates are appended to the batch. Returns the batch's defect log.
+        """
+        log = new_defect_log()
+        count = len(people_rows)
+        if not count or not self.rate:
+            return log
+        rng = np.random.default_rng(random.getrandbits(64))
+        # Masks for every kind, drawn even for kinds that are off so the others stay the same
+        hits = rng.random((len(DEFECT_KINDS), count)) < self.rate
+        columns = people_rows.columns
+        self.table = people_rows
+        self.log = log
+        if 'duplicate' in self.kinds:
+            self._duplicate(rng, np.flatnonzero(hits[DEFECT_KINDS.index('duplicate')]), first_customer)
+        if 'typo' in self.kinds:
+            self._typos(rng, np.flatnonzero(hits[DEFECT_KINDS.index('typo')]))
+        if 'email' in self.kinds and 'email' in columns:
+            rows = np.flatnonzero(hits[DEFECT_KINDS.index('email')])
+            edits = rng.integers(0, len(EMAIL_EDITS), rows.size)
+            fractions = rng.random(rows.size)
+            for row, edit, fraction in zip(rows.tolist(), edits.tolist(), fractions.tolist()):
+                self._change(row, 'email', 'email', lambda value: break_email(value, EMAIL_EDITS[edit], fraction))
+        if 'phone' in self.kinds and 'phone_number' in columns:
+            rows = np.flatnonzero(hits[DEFECT_KINDS.index('phone')])
+            edits = rng.integers(0, len(PHONE_EDITS), rows.size)
+            fractions = rng.random(rows.size)
+            extra = rng.integers(10, 1000, rows.size)
+            for row, edit, fraction, digits in zip(rows.tolist(), edits.tolist(), fractions.tolist(), extra.tolist()):
+                self._change(row, 'phone_number', 'phone',
+                             lambda value: break_phone(value, PHONE_EDITS[edit], fraction, str(digits)))
+        if 'missing' in self.kinds:
+            self._missing(rng, np.flatnonzero(hits[DEFECT_KINDS.index('missing')]))
+        self.table = self.log = None
+        return log
+
+    def _change(self, row, column, defect, edit):
+        """Apply an edit to one cell and log it if the value changed."""
+        position = self.table.positions[column]
+        original = self.table.value(position, row)
+        value = edit(original)
+        if value != original:
+            self.table.set(position, row, value)
+            self.log.append((self.table.value(self.table.positions[KEY_COLUMN], row), column, defect, original, value))
+
+    def _typos(self, rng, rows, defect='typo'):
+        columns = [column for column in TYPO_COLUMNS if column in self.table.positions]
+        if not columns:
+            return
+        choices = rng.integers(0, len(columns), rows.size)
+        edits = rng.integers(0, len(TYPO_EDITS), rows.size)
+        fractions = rng.random(rows.size)
+        letters = rng.integers(0, 26, rows.size)
+        for row, choice, edit, fraction, letter in zip(rows.tolist(), choices.tolist(), edits.tolist(),
+                                                       fractions.tolist(), letters.tolist()):
+            self._change(row, columns[choice], defect,
+                         lambda value: typo(value, TYPO_EDITS[edit], fraction, string.ascii_lowercase[letter]))
+
+    def _missing(self, rng, rows, defect='missing'):
+        columns = [column for column in self.table.columns if column != KEY_COLUMN]
+        if not columns:
+            return
+        choices = rng.integers(0, len(columns), rows.size)
+        values = rng.integers(0, len(MISSING_VALUES), rows.size)
+        for row, choice, value in zip(rows.tolist(), choices.tolist(), values.tolist()):
+            self._change(row, columns[choice], defect, lambda _: MISSING_VALUES[value])
+
+    def _duplicate(self, rng, rows, first_customer):
+        """Append a copy of each row under a new customer ID, with one variation each."""
+        key = self.table.positions[KEY_COLUMN]
+        variations = rng.integers(0, len(DUPLICATE_VARIATIONS), rows.size)
+        copies = []
+        for row in rows.tolist():
+            record = list(self.table[row])
+            original_id = record[key]
+            record[key] = ids.customer_id_for(self.num_customers + first_customer + row)
+            self.table.append(record)
+            copies.append(len(self.table) - 1)
+            self.log.append((record[key], KEY_COLUMN, 'duplicate', original_id, record[key]))
+        copies = np.array(copies, dtype=np.int64)
+        for index, variation in enumerate(DUPLICATE_VARIATIONS):
+            selected = copies[variations == index]
+            if variation == 'typo':
+                self._typos(rng, selected)
+            elif variation == 'missing':
+                self._missing(rng, selected)
+            else:
+                name = 'name_last' if 'name_last' in self.table.positions else None
+                for row in selected.tolist() if name else ():
+                    if variation == 'case':
+                        self._change(row, name, 'case', str.upper)
+                    else:
+                        self._change(row, name, 'whitespace', lambda value: ' ' + value + ' ')
@@ -0,0 +1,229 @@
+import zlib
+
+# Direct PDF writer for the fixed invoice layout.
+#
+# DirectCanvas implements the small part of the ReportLab canvas API that the invoice
+# layout functions use (fonts, fill/stroke colours, strings, lines, rectangles,
+# circles, simple paths, save/restore/translate and forms) and emits the PDF content
+# operators itself. The document skeleton - header, catalog, font dictionaries and the
+# object layout - is precompiled bytes; getpdfdata() only splices in the content
+# streams, the page list and a freshly computed xref table. Only the standard Type 1
+# fonts are available (with WinAnsiEncoding, as ReportLab uses them); TrueType fonts,
+# distortions and annotations stay on the ReportLab canvas.
+
+# Invoice renderers: the ReportLab canvas, or this writer for clean invoices
+ENGINES = ('canvas', 'direct')
+
+# Standard fonts drawn with WinAnsiEncoding
+STANDARD_FONTS = (
+    'Helvetica', 'Helvetica-Bold', 'Helvetica-Oblique', 'Helvetica-BoldOblique',
+    'Times-Roman', 'Times-Bold', 'Times-Italic', 'Times-BoldItalic',
+    'Courier', 'Courier-Bold', 'Courier-Oblique', 'Courier-BoldOblique'
+)
+
+HEADER = b'%PDF-1.4\n%\x93\x8c\x8b\x9e\n'
+CATALOG = b'<< /Type /Catalog /Pages 2 0 R /PageMode /UseNone >>'
+FONT_OBJECTS = {name: b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>' % name.encode('ascii')
+                for name in STANDARD_FONTS}
+PROCSET = b'/ProcSet [ /PDF /Text ]'
+
+# Bezier control distance for a quarter circle
+KAPPA = 0.5522847498
+
+# Characters that must be escaped inside a PDF string
+_ESCAPES = str.maketrans({'\\': '\\\\', '(': '\\(', ')': '\\)', '\r': '\\r', '\n': '\\n'})
+
+def supports_font(font_name):
+    return font_name in FONT_OBJECTS
+
+def number(value):
+    """Format a number the way content streams want it: short, no exponent."""
+    if value == int(value):
+        return str(int(value))
+    return ('%.4f' % value).rstrip('0').rstrip('.')
+
+def pdf_string(text):
+    """Encode text as a WinAnsi PDF string literal (kept as a latin-1 str)."""
+    return '(' + text.encode('cp1252', 'replace').decode('latin-1').translate(_ESCAPES) + ')'
+
+def color_operands(color):
+    """RGB operands for a ReportLab Color or an (r, g, b) tuple."""
+    if hasattr(color, 'red'):
+        color = (color.red, color.green, color.blue)
+    return '%s %s %s' % tuple(number(component) for component in color[:3])
+
+class DirectPath:
+    """Minimal path builder compatible with canvas.beginPath() for straight segments."""
+
+    def __init__(self):
+        self.ops = []
+
+    def moveTo(self, x, y):
+        self.ops.append(f'{number(x)} {number(y)} m')
+
+    def lineTo(self, x, y):
+        self.ops.append(f'{number(x)} {number(y)} l')
+
+    def close(self):
+        self.ops.append('h')
+
+def _paint(stroke, fill):
+    if fill and stroke:
+        return 'B'
+    if fill:
+        return 'f'
+    return 'S' if stroke else 'n'
+
+class DirectCanvas:
+    """Canvas-compatible writer for the invoice layout that builds the PDF bytes directly."""
+
+    def __init__(self, filename, pagesize=(612, 792), compress=True):
+        self.filename = filename
+        self.pagesize = pagesize
+        self.compress = compress
+        self.code = []
+        self.pages = []
+        self.font_names = {}
+        self.forms = {}
+        self.form_names = {}
+        self.form_stack = []
+        self.font = None
+        self.font_size = None
+        self.state_stack = []
+        self._fontname = None
+        self._fontsize = None
+
+    def _font_key(self, name):
+        if name not in FONT_OBJECTS:
+            raise ValueError(f"DirectCanvas only supports the standard fonts, not {name}")
+        key = self.font_names.get(name)
+        if key is None:
+            key = self.font_names[name] = f'F{len(self.font_names) + 1}'
+        return key
+
+    def setFont(self, name, size):
+        self.font = self._font_key(name)
+        self.font_size = number(size)
+        self._fontname, self._fontsize = name, size
+
+    def setFillColor(self, color):
+        self.code.append(color_operands(color) + ' rg')
+
+    def setStrokeColor(self, color):
+        self.code.append(color_operands(color) + ' RG')
+
+    def setLineWidth(self, width):
+        self.code.append(number(width) + ' w')
+
+    def drawString(self, x, y, text):
+        self.code.append(f'BT /{self.font} {self.font_size} Tf 1 0 0 1 {number(x)} {number(y)} Tm '
+                         f'{pdf_string(text)} Tj ET')
+
+    def line(self, x1, y1, x2, y2):
+        self.code.append(f'n {number(x1)} {number(y1)} m {number(x2)} {number(y2)} l S')
+
+    def rect(self, x, y, width, height, stroke=1, fill=0):
+        self.code.append(f'n {number(x)} {number(y)} {number(width)} {number(height)} re {_paint(stroke, fill)}')
+
+    def circle(self, x, y, r, stroke=1, fill=0):
+        k = r * KAPPA
+        n = number
+        self.code.append(
+            f'n {n(x + r)} {n(y)} m '
+            f'{n(x + r)} {n(y + k)} {n(x + k)} {n(y + r)} {n(x)} {n(y + r)} c '
+            f'{n(x - k)} {n(y + r)} {n(x - r)} {n(y + k)} {n(x - r)} {n(y)} c '
+            f'{n(x - r)} {n(y - k)} {n(x - k)} {n(y - r)} {n(x)} {n(y - r)} c '
+            f'{n(x + k)} {n(y - r)} {n(x + r)} {n(y - k)} {n(x + r)} {n(y)} c h {_paint(stroke, fill)}')
+
+    def beginPath(self):
+        return DirectPath()
+
+    def drawPath(self, path, stroke=1, fill=0):
+        self.code.append('n ' + ' '.join(path.ops) + ' ' + _paint(stroke, fill))
+
+    def saveState(self):
+        self.state_stack.append((self.font, self.font_size, self._fontname, self._fontsize))
+        self.code.append('q')
+
+    def restoreState(self):
+        self.font, self.font_size, self._fontname, self._fontsize = self.state_stack.pop()
+        self.code.append('Q')
+
+    def translate(self, dx, dy):
+        self.code.append(f'1 0 0 1 {number(dx)} {number(dy)} cm')
+
+    def beginForm(self, name, lowerx=0, lowery=0, upperx=None, uppery=None):
+        width, height = self.pagesize
+        bbox = (lowerx, lowery, width if upperx is None else upperx, height if uppery is None else uppery)
+        self.form_stack.append((name, bbox, self.code))
+        self.code = []
+
+    def endForm(self):
+        name, bbox, page_code = self.form_stack.pop()
+        self.forms[name] = (bbox, self.code)
+        self.form_names.setdefault(name, f'X{len(self.form_names) + 1}')
+        self.code = page_code
+
+    def doForm(self, name):
+        key = self.form_names.setdefault(name, f'X{len(self.form_names) + 1}')
+        self.code.append(f'/{key} Do')
+
+    def showPage(self):
+        self.pages.append(self.code)
+        self.code = []
+        self.state_stack = []
+
+    def _stream(self, code, entries=b''):
+        data = '\n'.join(code).encode('latin-1')
+        if self.compress:
+            data = zlib.compress(data)
+            entries += b' /Filter /FlateDecode'
+        return b'<< /Length %d%s >>\nstream\n%s\nendstream' % (len(data), entries, data)
+
+    def getpdfdata(self):
+        """Assemble the document: fixed objects, then forms, pages and their content streams."""
+        if self.code:
+            self.showPage()
+        width, height = self.pagesize
+        media_box = b'[ 0 0 %s %s ]' % (number(width).encode(), number(height).encode())
+        # 1 catalog, 2 pages, 3 shared resources, then fonts, forms and one page + stream per page
+        objects = [CATALOG, None, None]
+        fonts = []
+        for name, key in self.font_names.items():
+            objects.append(FONT_OBJECTS[name])
+            fonts.append(b'/%s %d 0 R' % (key.encode(), len(objects)))
+        xobjects = []
+        for name, key in self.form_names.items():
+            bbox, code = self.forms[name]
+            entries = (b' /Type /XObject /Subtype /Form /BBox [ %s ] /Resources 3 0 R'
+                       % ' '.join(number(v) for v in bbox).encode())
+            objects.append(self._stream(code, entries))
+            xobjects.append(b'/%s %d 0 R' % (key.encode(), len(objects)))
+        objects[2] = (b'<< /Font << ' + b' '.join(fonts) + b' >> /XObject << ' + b' '.join(xobjects)
+                      + b' >> ' + PROCSET + b' >>')
+        kids = []
+        for code in self.pages:
+            objects.append(self._stream(code))
+            objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox %s /Resources 3 0 R /Contents %d 0 R >>'
+                           % (media_box, len(objects)))
+            kids.append(b'%d 0 R' % len(objects))
+        objects[1] = b'<< /Type /Pages /Count %d /Kids [ %s ] >>' % (len(kids), b' '.join(kids))
+
+        chunks = [HEADER]
+        offsets = []
+        position = len(HEADER)
+        for number_, body in enumerate(objects, start=1):
+            chunk = b'%d 0 obj\n%s\nendobj\n' % (number_, body)
+            offsets.append(position)
+            position += len(chunk)
+            chunks.append(chunk)
+        xref = [b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)]
+        xref.extend(b'%010d 00000 n \n' % offset for offset in offsets)
+        chunks.append(b''.join(xref))
+        chunks.append(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, position))
+        return b''.join(chunks)
+
+    def save(self):
+        data = self.getpdfdata()
+        with open(self.filename, 'wb') as f:
+            f.write(data)
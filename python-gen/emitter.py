@@ -0,0 +1,420 @@
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+from array import array
+from datetime import datetime
+
+import ids
+import people
+import transactions
+
+# Real-time event emitter for load testing ingestion services.
+#
+# Transactions and social interactions are streamed as NDJSON (one JSON object per
+# line, or per datagram over UDP) to stdout, a TCP or UDP address or a Unix socket.
+# A token bucket paces the stream at the target events/sec: tokens refill at the
+# rate given by a profile (steady, or ramps, waves and spikes around the target) up
+# to the burst size, and each wake-up sends as many events as there are tokens, in
+# one write. Customers are picked by index and referenced through
+# ids.customer_id_for, so events match the people table of a run with the same seed.
+#
+# Every event carries its sequence number and the wall-clock time it was built
+# ('ts'), so a listener can measure end-to-end latency and spot gaps; run
+# `python emitter.py --listen tcp://127.0.0.1:9000` as a local listener.
+# Progress and reports go to stderr, which keeps stdout clean for the events.
+
+EVENT_TYPES = ('transactions', 'social')
+# Period of the rate profiles, in seconds
+PROFILE_PERIOD = 10.0
+# Rate multiplier over time since the start for each burst profile
+PROFILES = {
+    'steady': lambda t: 1.0,
+    # From a tenth of the rate up to the full rate over one period
+    'ramp': lambda t: min(1.0, 0.1 + 0.9 * t / PROFILE_PERIOD),
+    # Half a rate above and below the target, once per period
+    'sine': lambda t: 1.0 + 0.5 * math.sin(2 * math.pi * t / PROFILE_PERIOD),
+    # Five times the rate for the first second of every period
+    'spike': lambda t: 5.0 if t % PROFILE_PERIOD < 1.0 else 1.0
+}
+# Most events sent in one write
+MAX_BATCH = 1000
+# Seconds between progress lines
+REPORT_INTERVAL = 5.0
+
+def parse_target(target):
+    """Split a target into (scheme, address): '-' or 'stdout', tcp://host:port, udp://host:port, unix:///path."""
+    if target in ('-', 'stdout'):
+        return 'stdout', None
+    scheme, separator, rest = target.partition('://')
+    if separator and scheme == 'unix' and rest:
+        return 'unix', rest
+    if separator and scheme in ('tcp', 'udp'):
+        host, colon, port = rest.rpartition(':')
+        if colon and host and port.isdigit():
+            return scheme, (host.strip('[]'), int(port))
+    raise ValueError(f"Invalid target {target!r} (use -, tcp://host:port, udp://host:port or unix:///path)")
+
+def percentiles(values, points=(50, 95, 99)):
+    """Nearest-rank percentiles and the maximum of a sequence, in its own units."""
+    ordered = sorted(values)
+    if not ordered:
+        return {}
+    result = {f'p{point}': ordered[min(len(ordered) - 1, math.ceil(point / 100 * len(ordered)) - 1)] for point in points}
+    result['max'] = ordered[-1]
+    return result
+
+def format_latencies(values):
+    return '  '.join(f"{name} {value * 1000:.2f}ms" for name, value in percentiles(values).items()) or 'n/a'
+
+class TokenBucket:
+    """Token bucket whose refill rate follows a profile; take() waits for tokens."""
+
+    def __init__(self, rate, burst, profile=PROFILES['steady'], clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.profile = profile
+        self.clock = clock
+        self.start = self.updated = clock()
+        # Start empty so the first moments are paced like the rest
+        self.tokens = 0.0
+        # Tokens the profile has offered since the start, i.e. the target event count
+        self.offered = 0.0
+
+    def current_rate(self, now):
+        return self.rate * self.profile(now - self.start)
+
+    def _refill(self, now):
+        added = (now - self.updated) * self.current_rate(now)
+        self.offered += added
+        self.tokens = min(self.burst, self.tokens + added)
+        self.updated = now
+
+    async def take(self, limit):
+        """Wait for at least one token and take up to limit of them.
+
+        Returns the number taken and how late the last wake-up was (0 if there was no wait).
+        """
+        lateness = 0.0
+        self._refill(self.clock())
+        while self.tokens < 1:
+            wait = (1 - self.tokens) / max(self.current_rate(self.updated), 1e-9)
+            due = self.updated + wait
+            await asyncio.sleep(wait)
+            now = self.clock()
+            lateness = max(0.0, now - due)
+            self._refill(now)
+        count = min(limit, int(self.tokens))
+        self.tokens -= count
+        return count, lateness
+
+class EventSource:
+    """Builds NDJSON-encoded transaction and social events for customers 0 to num_customers - 1."""
+
+    def __init__(self, num_customers, event_types=EVENT_TYPES, error_rate=0.0):
+        if num_customers < 2:
+            raise ValueError("The emitter needs at least two customers")
+        self.num_customers = num_customers
+        self.event_types = tuple(event_types)
+        self.error_rate = error_rate / 100.0
+
+    def transaction(self, purchase_date):
+        customer_id = ids.customer_id_for(random.randrange(self.num_customers))
+        row = transactions.generate_transaction_row(customer_id, random.random() < self.error_rate, purchase_date)
+        return dict(zip(transactions.TRANSACTION_COLUMNS, row))
+
+    def social(self, rows):
+        return dict(zip(people.SOCIAL_COLUMNS, next(rows)))
+
+    def batch(self, first_seq, count):
+        """Encode count events numbered from first_seq, one line each."""
+        purchase_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        # One social row generator per batch, so its date strings are formatted once
+        social_rows = people.iter_social_rows(self.num_customers, count)
+        lines = []
+        for seq in range(first_seq, first_seq + count):
+            event_type = random.choice(self.event_types)
+            fields = self.transaction(purchase_date) if event_type == 'transactions' else self.social(social_rows)
+            event = {'event': event_type, 'seq': seq, 'ts': time.time()}
+            event.update(fields)
+            lines.append(json.dumps(event, separators=(',', ':')).encode('utf-8') + b'\n')
+        return lines
+
+class StdoutSink:
+    async def open(self):
+        self.stream = sys.stdout.buffer
+
+    async def send(self, lines):
+        self.stream.write(b''.join(lines))
+        self.stream.flush()
+
+    async def close(self):
+        self.stream.flush()
+
+class StreamSink:
+    """TCP or Unix socket connection; send() returns once the kernel has taken the data."""
+
+    def __init__(self, scheme, address):
+        self.scheme = scheme
+        self.address = address
+
+    async def open(self):
+        if self.scheme == 'unix':
+            _, self.writer = await asyncio.open_unix_connection(self.address)
+        else:
+            _, self.writer = await asyncio.open_connection(*self.address)
+
+    async def send(self, lines):
+        self.writer.write(b''.join(lines))
+        await self.writer.drain()
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.errors = 0
+
+    def error_received(self, exc):
+        self.errors += 1
+
+class DatagramSink:
+    """UDP socket sending one event per datagram."""
+
+    def __init__(self, address):
+        self.address = address
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        self.transport, self.protocol = await loop.create_datagram_endpoint(_DatagramProtocol,
+                                                                            remote_addr=self.address)
+
+    async def send(self, lines):
+        for line in lines:
+            self.transport.sendto(line)
+
+    async def close(self):
+        self.transport.close()
+
+    @property
+    def errors(self):
+        return self.protocol.errors
+
+def open_sink(target):
+    scheme, address = parse_target(target)
+    if scheme == 'stdout':
+        return StdoutSink()
+    if scheme == 'udp':
+        return DatagramSink(address)
+    return StreamSink(scheme, address)
+
+class EmitterStats:
+    """Throughput and latency of an emitter run."""
+
+    def __init__(self):
+        self.events = 0
+        self.bytes = 0
+        self.started = None
+        self.finished = None
+        self.bucket = None
+        # Seconds per write (until drained) and how late each paced wake-up was
+        self.send_latencies = array('d')
+        self.wake_lateness = array('d')
+        self.errors = 0
+
+    def record(self, count, size, latency, lateness):
+        self.events += count
+        self.bytes += size
+        self.send_latencies.append(latency)
+        if lateness:
+            self.wake_lateness.append(lateness)
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def progress(self):
+        elapsed = self.elapsed()
+        return f"{elapsed:7.1f}s {self.events:>10} events {self.events / max(elapsed, 1e-9):>10.1f}/s"
+
+    def report(self):
+        elapsed = self.elapsed()
+        target = self.bucket.offered if self.bucket is not None else 0
+        lines = [
+            f"Sent {self.events} events ({self.bytes} bytes) in {elapsed:.2f}s",
+            f"Throughput: {self.events / max(elapsed, 1e-9):.1f} events/s, {self.bytes / max(elapsed, 1e-9) / 1024 / 1024:.2f} MiB/s "
+            f"({self.events / max(target, 1) * 100:.1f}% of the {target:.0f} events the profile offered)",
+            f"Write latency over {len(self.send_latencies)} writes: {format_latencies(self.send_latencies)}",
+            f"Pacing wake-up lateness: {format_latencies(self.wake_lateness)}"
+        ]
+        if self.errors:
+            lines.append(f"Send errors: {self.errors}")
+        return '\n'.join(lines)
+
+async def emit(target, source, rate, burst=None, profile='steady', duration=None, max_events=None, stats=None,
+               report_interval=REPORT_INTERVAL):
+    """Stream events from source to target until duration seconds or max_events have passed."""
+    stats = stats if stats is not None else EmitterStats()
+    sink = open_sink(target)
+    await sink.open()
+    bucket = TokenBucket(rate, burst or max(1, int(rate / 20)), PROFILES[profile])
+    stats.bucket = bucket
+    stats.started = next_report = time.monotonic()
+    next_report += report_interval
+    try:
+        while max_events is None or stats.events < max_events:
+            if duration is not None and time.monotonic() - stats.started >= duration:
+                break
+            limit = MAX_BATCH if max_events is None else min(MAX_BATCH, max_events - stats.events)
+            count, lateness = await bucket.take(limit)
+            lines = source.batch(stats.events, count)
+            started = time.perf_counter()
+            await sink.send(lines)
+            stats.record(count, sum(len(line) for line in lines), time.perf_counter() - started, lateness)
+            if report_interval and time.monotonic() >= next_report:
+                next_report += report_interval
+                print(stats.progress(), file=sys.stderr)
+    finally:
+        stats.finished = time.monotonic()
+        await sink.close()
+        stats.errors = getattr(sink, 'errors', 0)
+    return stats
+
+def run(args):
+    """Emitter mode of gendata.py: stream events as described by parsed arguments."""
+    source = EventSource(args.num_customers, args.event_types, args.error_rate)
+    stats = EmitterStats()
+    print(f"Emitting {', '.join(source.event_types)} events to {args.emit} at {args.rate:g}/s "
+          f"({args.profile} profile)...", file=sys.stderr)
+    error = None
+    try:
+        asyncio.run(emit(args.emit, source, args.rate, args.burst, args.profile, args.duration, args.max_events, stats))
+    except KeyboardInterrupt:
+        pass
+    except OSError as exc:
+        error = exc
+    if stats.started is not None:
+        print(stats.report(), file=sys.stderr)
+    if error is not None:
+        raise SystemExit(f"Cannot emit to {args.emit}: {error}")
+    return stats
+
+class ListenerStats:
+    """Events received by a listener, with end-to-end latency from each event's 'ts'."""
+
+    def __init__(self):
+        self.events = 0
+        self.bytes = 0
+        self.invalid = 0
+        self.first = None
+        self.last = None
+        self.latencies = array('d')
+        # Set by listen() once max_events have arrived
+        self.done = None
+        self.max_events = None
+
+    def receive(self, line):
+        now = time.time()
+        self.bytes += len(line)
+        try:
+            event = json.loads(line)
+            sent = float(event['ts'])
+        except (ValueError, KeyError, TypeError):
+            self.invalid += 1
+            return
+        if self.first is None:
+            self.first = now
+        self.last = now
+        self.events += 1
+        self.latencies.append(now - sent)
+        if self.max_events is not None and self.events >= self.max_events and self.done is not None:
+            self.done.set()
+
+    def report(self):
+        elapsed = (self.last - self.first) if self.events > 1 else 0.0
+        lines = [
+            f"Received {self.events} events ({self.bytes} bytes, {self.invalid} invalid lines)",
+            f"Throughput: {self.events / elapsed:.1f} events/s" if elapsed else "Throughput: n/a",
+            f"End-to-end latency: {format_latencies(self.latencies)}"
+        ]
+        return '\n'.join(lines)
+
+class _ListenerDatagrams(asyncio.DatagramProtocol):
+    def __init__(self, stats):
+        self.stats = stats
+
+    def datagram_received(self, data, addr):
+        for line in data.splitlines():
+            if line:
+                self.stats.receive(line)
+
+async def listen(target, duration=None, max_events=None, stats=None):
+    """Receive NDJSON events on target until duration seconds or max_events, returning ListenerStats."""
+    stats = stats if stats is not None else ListenerStats()
+    stats.max_events = max_events
+    stats.done = asyncio.Event()
+    scheme, address = parse_target(target)
+
+    # Open connections, closed when the listener stops so their handlers finish
+    connections = {}
+
+    async def handle(reader, writer):
+        connections[asyncio.current_task()] = writer
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                stats.receive(line)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            connections.pop(asyncio.current_task(), None)
+
+    if scheme == 'tcp':
+        server = await asyncio.start_server(handle, *address)
+    elif scheme == 'unix':
+        server = await asyncio.start_unix_server(handle, address)
+    elif scheme == 'udp':
+        loop = asyncio.get_running_loop()
+        server, _ = await loop.create_datagram_endpoint(lambda: _ListenerDatagrams(stats), local_addr=address)
+    else:
+        raise ValueError("The listener needs a tcp://, udp:// or unix:// address")
+    print(f"Listening on {target}...", file=sys.stderr)
+    try:
+        await asyncio.wait_for(stats.done.wait(), duration)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        server.close()
+        for writer in list(connections.values()):
+            writer.close()
+        await asyncio.gather(*connections, return_exceptions=True)
+    return stats
+
+def main(argv=None):
+    """Local listener for testing the emitter."""
+    parser = argparse.ArgumentParser(description='Receive NDJSON events from gendata.py --emit and report latency.')
+    parser.add_argument('--listen', required=True, help='Address to listen on: tcp://host:port, udp://host:port or unix:///path')
+    parser.add_argument('--duration', type=float, default=None, help='Stop after this many seconds')
+    parser.add_argument('--max-events', type=int, default=None, help='Stop after this many events')
+    args = parser.parse_args(argv)
+    try:
+        parse_target(args.listen)
+    except ValueError as exc:
+        parser.error(str(exc))
+    stats = ListenerStats()
+    try:
+        asyncio.run(listen(args.listen, args.duration, args.max_events, stats))
+    except KeyboardInterrupt:
+        pass
+    print(stats.report(), file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
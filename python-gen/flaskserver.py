@@ -21,13 +21,13 @@ import people
 
 app = Flask(__name__)
 
-static = people.createData(headers=True, rows=1000, buildtransactions=False)
+static = people.createData(include_headers=True, num_customers=1000, generate_transactions=False)
 
 # this next route generates a var each time the route is called
 @app.route('/dynamic')
 def randomPayload():
 
-	payload = people.createData(headers=True, rows=1000, buildtransactions=False)
+	payload = people.createData(include_headers=True, num_customers=1000, generate_transactions=False)
 	return payload[0]
 
 
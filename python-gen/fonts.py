@@ -0,0 +1,69 @@
+import os
+import string
+import hashlib
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+# TrueType fonts for invoices.
+#
+# Each TTF file is parsed and registered once per process. ReportLab embeds a
+# glyph subset of every TrueType font per PDF; priming each document with the
+# fixed invoice character set gives every invoice the same subset, so the subset
+# font program is built once per font and reused from the cache afterwards.
+
+# Characters invoices draw: names, addresses, amounts and labels
+INVOICE_CHARSET = string.ascii_letters + string.digits + string.punctuation + ' '
+
+# filename -> registered font name
+_registered = {}
+_truetype_names = set()
+# font name -> content hash of its TTF file
+_fingerprints = {}
+
+def _cache_subsets(font):
+    """Memoize the font's subset builder by subset contents."""
+    face = font.face
+    build_subset = face.makeSubset
+    cache = {}
+
+    def make_subset(subset):
+        key = tuple(subset)
+        data = cache.get(key)
+        if data is None:
+            data = cache[key] = build_subset(subset)
+        return data
+
+    face.makeSubset = make_subset
+
+def register_font(path):
+    """Register one TTF file (once per process) and return its font name."""
+    path = os.path.abspath(path)
+    name = _registered.get(path)
+    if name is None:
+        name = 'TTF-' + os.path.splitext(os.path.basename(path))[0]
+        font = TTFont(name, path)
+        _cache_subsets(font)
+        pdfmetrics.registerFont(font)
+        _registered[path] = name
+        _truetype_names.add(name)
+        with open(path, 'rb') as f:
+            _fingerprints[name] = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+    return name
+
+def load_font_directory(directory):
+    """Register every .ttf file in a directory and return their font names."""
+    return [register_font(os.path.join(directory, filename))
+            for filename in sorted(os.listdir(directory)) if filename.lower().endswith('.ttf')]
+
+def is_truetype(font_name):
+    return font_name in _truetype_names
+
+def fingerprint(font_name):
+    """Content hash of a TrueType font's file (None for built-in fonts), for build digests."""
+    return _fingerprints.get(font_name)
+
+def prime_font(canvas, font_name):
+    """Assign the invoice character set to a TrueType font's first subset in this document."""
+    if is_truetype(font_name):
+        pdfmetrics.getFont(font_name).splitString(INVOICE_CHARSET, canvas._doc)
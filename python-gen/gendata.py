@@ -1,14 +1,20 @@
+import sys
 import time
 import os
-import csv
 import json
 import random
 import argparse
+import itertools
+import contextlib
 
 import people
-from invoice_generator import generate_invoice
+import ids
+import columns
+import transactions
+import pipeline
+import direct_pdf
 
-def parse_arguments():
+def parse_arguments(argv=None):
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Generate synthetic customer data and invoices with optional errors.')
     
@@ -39,7 +45,101 @@ def parse_arguments():
         default=0,
         help='Percentage of visual distortions to apply to PDFs (0-100). Adds realistic imperfections like misalignments, ink issues, and stains.'
     )
+
+    parser.add_argument(
+        '--distortion-budget',
+        default=None,
+        help='Bytes the distortions may add to each dirty PDF, e.g. 16K; effects that do not fit are left out (default: 8K)'
+    )
     
+    parser.add_argument(
+        '--no-pdf',
+        action='store_false',
+        dest='pdf',
+        default=True,
+        help='Only write the tabular data; skip invoice rendering and the PDF libraries'
+    )
+
+    parser.add_argument(
+        '--engine',
+        choices=direct_pdf.ENGINES,
+        default='canvas',
+        help='Invoice renderer: the ReportLab canvas, or direct PDF writing for clean invoices in the standard fonts (default: canvas)'
+    )
+
+    parser.add_argument(
+        '--font-dir',
+        default=None,
+        help='Directory of TTF fonts to pick from at random for each invoice, alongside the built-in fonts'
+    )
+
+    parser.add_argument(
+        '--annotations',
+        action='store_true',
+        default=False,
+        help='Write ground-truth field text and boxes for every invoice to pdf_output/annotations.jsonl'
+    )
+
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        help='Seed for all random choices; the same seed and options reproduce the same data and invoices'
+    )
+
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        default=False,
+        help='Only render invoices whose inputs changed since the last run with the same --seed (uses pdf_output.manifest)'
+    )
+
+    parser.add_argument(
+        '--output-dir',
+        default=os.path.dirname(os.path.abspath(__file__)),
+        help='Directory for the CSV files and pdf_output/ (default: next to this script)'
+    )
+
+    parser.add_argument(
+        '--batch',
+        default=None,
+        help='YAML or JSON file listing scenarios to run in this process, each into its own directory under --output-dir'
+    )
+
+    parser.add_argument(
+        '--io-threads',
+        type=int,
+        default=2,
+        help='Background threads writing CSV blocks and PDFs while generation continues; 0 writes inline (default: 2)'
+    )
+
+    parser.add_argument(
+        '--fsync',
+        action='store_true',
+        default=False,
+        help='fsync written files in batches on the I/O threads'
+    )
+
+    parser.add_argument(
+        '--fadvise',
+        action='store_true',
+        default=False,
+        help='Drop written files from the page cache (fdatasync, then posix_fadvise DONTNEED) on the I/O threads'
+    )
+
+    parser.add_argument(
+        '--memory-budget',
+        default=None,
+        help='Run generation, writing and rendering as overlapping stages whose queues stay within this size (e.g. 512M)'
+    )
+
+    parser.add_argument(
+        '--overflow',
+        choices=['block', 'shed'],
+        default='block',
+        help='With --memory-budget, wait for rendering to catch up (block) or skip invoices that do not fit (shed)'
+    )
+
     parser.add_argument(
         '--include-headers',
         action='store_true',
@@ -68,7 +168,141 @@ def parse_arguments():
         help='Do not generate transaction data'
     )
     
-    args = parser.parse_args()
+    parser.add_argument(
+        '--time-ordered',
+        action='store_true',
+        default=False,
+        help='Spread transactions over the full 1800-day range with seasonal purchase rates and write them sorted by time'
+    )
+
+    parser.add_argument(
+        '--seasonality',
+        type=float,
+        default=0.3,
+        help='Strength of the yearly purchase-rate cycle for --time-ordered, 0-1 (default: 0.3)'
+    )
+
+    parser.add_argument(
+        '--defect-rate',
+        type=float,
+        default=0,
+        help='Percentage of people rows that get each kind of data-quality defect (0-100); changes are logged to output_defects.csv'
+    )
+
+    parser.add_argument(
+        '--defects',
+        default=None,
+        help='Comma-separated defect kinds for --defect-rate: duplicate, typo, email, phone, missing (default: all)'
+    )
+
+    parser.add_argument(
+        '--unique-ids',
+        action='store_true',
+        default=False,
+        help='Guarantee unique customer, order and interaction IDs within a run'
+    )
+
+    parser.add_argument(
+        '--id-key',
+        default=None,
+        help='Key for the unique-ID permutation; the same key and counts reproduce the same IDs (default: random)'
+    )
+
+    parser.add_argument(
+        '--columns',
+        default=None,
+        help='Comma-separated people columns to generate (default: the people table in create.sql)'
+    )
+
+    parser.add_argument(
+        '--pg-dsn',
+        default=None,
+        help='Stream rows into PostgreSQL with COPY instead of writing CSV files (e.g. "dbname=staging user=me")'
+    )
+
+    parser.add_argument(
+        '--pg-batch-size',
+        type=int,
+        default=10000,
+        help='Number of rows sent per COPY batch (default: 10000)'
+    )
+
+    parser.add_argument(
+        '--pg-format',
+        choices=['text', 'binary'],
+        default='text',
+        help='COPY framing to use (default: text)'
+    )
+
+    parser.add_argument(
+        '--compress',
+        choices=['none', 'gzip', 'zstd', 'lz4'],
+        default='none',
+        help='Compress the output CSV files (default: none)'
+    )
+
+    parser.add_argument(
+        '--compress-splittable',
+        action='store_true',
+        default=False,
+        help='Compress in independent blocks with a .idx sidecar so the output can be read in parallel'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=0,
+        help='Generate the tables in this many worker processes (with --no-pdf; default: 0, in this process)'
+    )
+
+    parser.add_argument(
+        '--emit',
+        default=None,
+        help='Stream live events as NDJSON to -, tcp://host:port, udp://host:port or unix:///path instead of writing files'
+    )
+
+    parser.add_argument(
+        '--rate',
+        type=float,
+        default=1000,
+        help='Target events per second for --emit (default: 1000)'
+    )
+
+    parser.add_argument(
+        '--burst',
+        type=int,
+        default=None,
+        help='Token bucket size for --emit: most events sent at once after an idle spell (default: rate/20)'
+    )
+
+    parser.add_argument(
+        '--profile',
+        choices=['steady', 'ramp', 'sine', 'spike'],
+        default='steady',
+        help='Rate profile for --emit (default: steady)'
+    )
+
+    parser.add_argument(
+        '--duration',
+        type=float,
+        default=None,
+        help='Stop --emit after this many seconds (default: until interrupted)'
+    )
+
+    parser.add_argument(
+        '--max-events',
+        type=int,
+        default=None,
+        help='Stop --emit after this many events'
+    )
+
+    parser.add_argument(
+        '--event-types',
+        default='transactions,social',
+        help='Comma-separated event types for --emit: transactions, social (default: both)'
+    )
+    
+    args = parser.parse_args(argv)
     
     # Validate numeric parameters
     if args.num_customers <= 0:
@@ -77,104 +311,560 @@ def parse_arguments():
     if args.transactions_per_customer <= 0:
         parser.error("Number of transactions per customer must be greater than 0")
     
-    if args.transactions_per_customer > 15:
-        parser.error("Maximum number of transactions per customer is 15")
-    
     if not 0 <= args.error_rate <= 100:
         parser.error("Error rate must be between 0 and 100")
+
+    if not 0 <= args.seasonality <= 1:
+        parser.error("Seasonality must be between 0 and 1")
+
+    if not 0 <= args.defect_rate <= 100:
+        parser.error("Defect rate must be between 0 and 100")
+
+    if args.defect_rate:
+        import defects
+        args.defects = (tuple(name.strip() for name in args.defects.split(',') if name.strip())
+                        if args.defects else defects.DEFECT_KINDS)
+        unknown = [name for name in args.defects if name not in defects.DEFECT_KINDS]
+        if unknown or not args.defects:
+            parser.error(f"Unknown defect kind(s): {', '.join(unknown)}. Available: {', '.join(defects.DEFECT_KINDS)}")
+        # Missing fields are not valid values for typed columns such as birth_dt
+        for option, value in (('--pg-dsn', args.pg_dsn), ('--emit', args.emit)):
+            if value:
+                parser.error(f"{option} cannot be combined with --defect-rate")
+    elif args.defects:
+        parser.error("--defects has no effect without --defect-rate")
+
+    if args.font_dir and not os.path.isdir(args.font_dir):
+        parser.error(f"Font directory not found: {args.font_dir}")
+
+    if args.columns:
+        args.columns = tuple(name.strip() for name in args.columns.split(',') if name.strip())
+        unknown = [name for name in args.columns if name not in columns.available_columns()]
+        if unknown:
+            parser.error(f"Unknown column(s): {', '.join(unknown)}. Available: {', '.join(columns.available_columns())}")
+        try:
+            people.resolve_columns(args.columns)
+        except ValueError as exc:
+            parser.error(str(exc))
+
+    if args.emit:
+        pass
+    elif args.pdf:
+        from invoice_generator import CUSTOMER_COLUMNS
+        missing = [name for name in CUSTOMER_COLUMNS if name not in (args.columns or CUSTOMER_COLUMNS)]
+        if missing:
+            parser.error(f"Invoices need the column(s): {', '.join(missing)}")
+    else:
+        for option, value in (('--annotations', args.annotations), ('--incremental', args.incremental),
+                              ('--font-dir', args.font_dir), ('--dirty-rate', args.dirty_rate),
+                              ('--distortion-budget', args.distortion_budget)):
+            if value:
+                parser.error(f"{option} has no effect with --no-pdf")
+
+    if args.distortion_budget is not None:
+        try:
+            args.distortion_budget = pipeline.parse_size(args.distortion_budget)
+        except ValueError as exc:
+            parser.error(str(exc))
+
+    if args.incremental and args.seed is None:
+        parser.error("--incremental needs --seed so unchanged invoices are generated identically")
+
+    if args.io_threads < 0:
+        parser.error("Number of I/O threads cannot be negative")
+
+    if (args.fsync or args.fadvise) and not args.io_threads:
+        parser.error("--fsync and --fadvise need --io-threads of at least 1")
+
+    if args.memory_budget:
+        try:
+            args.memory_budget = pipeline.parse_size(args.memory_budget)
+        except ValueError as exc:
+            parser.error(str(exc))
+        if args.memory_budget <= 0:
+            parser.error("Memory budget must be greater than 0")
+        # Stages share the random module across threads and generate customers in chunks
+        for option, value in (('--seed', args.seed is not None), ('--incremental', args.incremental),
+                              ('--time-ordered', args.time_ordered)):
+            if value:
+                parser.error(f"{option} cannot be combined with --memory-budget")
+
+    if args.pg_batch_size <= 0:
+        parser.error("Postgres batch size must be greater than 0")
+
+    if args.workers < 0:
+        parser.error("Number of workers cannot be negative")
+
+    if args.workers:
+        if args.pdf:
+            parser.error("--workers only generates the tables; add --no-pdf")
+        for option, value in (('--memory-budget', args.memory_budget), ('--time-ordered', args.time_ordered),
+                              ('--emit', args.emit)):
+            if value:
+                parser.error(f"{option} cannot be combined with --workers")
+
+    if args.emit:
+        import emitter
+        try:
+            emitter.parse_target(args.emit)
+        except ValueError as exc:
+            parser.error(str(exc))
+        args.event_types = tuple(name.strip() for name in args.event_types.split(',') if name.strip())
+        unknown = [name for name in args.event_types if name not in emitter.EVENT_TYPES]
+        if unknown or not args.event_types:
+            parser.error(f"Unknown event type(s): {', '.join(unknown)}. Available: {', '.join(emitter.EVENT_TYPES)}")
+        if args.rate <= 0:
+            parser.error("Event rate must be greater than 0")
+        if args.burst is not None and args.burst <= 0:
+            parser.error("Burst size must be greater than 0")
+        if args.num_customers < 2:
+            parser.error("--emit needs at least two customers")
+        for option, value in (('--batch', args.batch), ('--memory-budget', args.memory_budget),
+                              ('--pg-dsn', args.pg_dsn), ('--incremental', args.incremental)):
+            if value:
+                parser.error(f"{option} cannot be combined with --emit")
     
     return args
 
-# Start timing the data generation
-t_start = time.time()
-
-# Parse command line arguments
-args = parse_arguments()
-
-# Data generation configuration
-INCLUDE_CSV_HEADERS = args.include_headers
-NUM_CUSTOMERS = args.num_customers
-GENERATE_TRANSACTIONS = args.generate_transactions
-TRANSACTIONS_PER_CUSTOMER = args.transactions_per_customer
-
-# Print configuration
-print("\nData Generation Configuration:")
-print(f"Number of customers: {NUM_CUSTOMERS}")
-print(f"Include CSV headers: {INCLUDE_CSV_HEADERS}")
-print(f"Generate transactions: {GENERATE_TRANSACTIONS}")
-if GENERATE_TRANSACTIONS:
-    print(f"Transactions per customer: {TRANSACTIONS_PER_CUSTOMER}")
-print(f"Invoice error rate: {args.error_rate}%")
-print(f"PDF distortion rate: {args.dirty_rate}%\n")
-
-# Generate the data
-newdata = people.createData(
-    INCLUDE_CSV_HEADERS,
-    NUM_CUSTOMERS,
-    GENERATE_TRANSACTIONS,
-    TRANSACTIONS_PER_CUSTOMER,
-    args.error_rate  # Pass the error rate percentage
-)
-
-# Create output directories if they don't exist
-output_dir = os.path.dirname(__file__)
-pdf_dir = os.path.join(output_dir, 'pdf_output')
-os.makedirs(pdf_dir, exist_ok=True)
-
-# Write people data
-output_people_path = os.path.join(output_dir, 'output_people.csv')
-with open(output_people_path, 'w') as f:
-    f.write(newdata[0])
-    print("Finished writing people data")
-
-# Write and process transactions
-output_transactions_path = os.path.join(output_dir, 'output_transactions.csv')
-with open(output_transactions_path, 'w') as f:
-    f.write(newdata[1])
-    print("Finished writing transaction data")
-
-output_social_path = os.path.join(output_dir, 'output_social.csv')
-with open(output_social_path, 'w') as f:
-    f.write(newdata[2])
-    print("Finished writing social interaction data")
-
-# Now generate invoices for each person
-print(f"\nGenerating {NUM_CUSTOMERS} invoices with {args.error_rate}% error rate...")
-
-# Read people data
-people_data = []
-with open(output_people_path, 'r') as f:
-    reader = csv.DictReader(f)
-    people_data = list(reader)
-
-# Read transactions data
-transactions_data = []
-with open(output_transactions_path, 'r') as f:
-    reader = csv.DictReader(f)
-    transactions_data = list(reader)
-
-# Group transactions by customer_id
-transactions_by_customer = {}
-for trans in transactions_data:
-    customer_id = trans['customer_id']
-    if customer_id not in transactions_by_customer:
-        transactions_by_customer[customer_id] = []
-    transactions_by_customer[customer_id].append(trans)
-
-# Track number of invoices with errors
-error_count = 0
-total_invoices = 0
-
-# Generate an invoice for each person
-for person in people_data:
-    customer_id = person['customer_id']
-    if customer_id in transactions_by_customer:
-        total_invoices += 1
-        if generate_invoice(person, transactions_by_customer[customer_id], error_rate=args.error_rate, dirty_rate=args.dirty_rate):
-            error_count += 1
-
-print(f"\nGenerated {total_invoices} invoices, {error_count} ({(error_count/total_invoices)*100:.1f}%) contain calculation errors.")
-
-t_end = time.time()
-total_time = t_end - t_start
-print(f"\nTotal execution time: {total_time:.2f} seconds") 
\ No newline at end of file
+def configure_ids(args):
+    """Seed the random module and set up the ID generators for one run."""
+    # Start every data set from the default ID generators, even after earlier batch scenarios
+    ids.use_random_ids()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+        ids.use_seeded_source(args.seed)
+
+    if args.unique_ids:
+        ids.use_unique_ids(args.id_key)
+
+def generate(args):
+    """Generate one data set (tables and invoices) as described by parsed arguments."""
+    if args.emit:
+        # Events may go to stdout, so nothing else is printed there
+        import emitter
+        configure_ids(args)
+        emitter.run(args)
+        return
+
+    # Start timing the data generation
+    t_start = time.time()
+
+    # Data generation configuration
+    include_csv_headers = args.include_headers
+    num_customers = args.num_customers
+    generate_transactions = args.generate_transactions
+    transactions_per_customer = args.transactions_per_customer
+    people_columns = people.resolve_columns(args.columns)
+
+    # Print configuration
+    print("\nData Generation Configuration:")
+    print(f"Number of customers: {num_customers}")
+    print(f"Include CSV headers: {include_csv_headers}")
+    print(f"Generate transactions: {generate_transactions}")
+    if generate_transactions:
+        print(f"Transactions per customer: {transactions_per_customer}")
+    print(f"Invoice error rate: {args.error_rate}%")
+    print(f"PDF distortion rate: {args.dirty_rate}%")
+    print(f"Data defect rate: {args.defect_rate}%\n")
+
+    configure_ids(args)
+
+    if args.pdf:
+        from invoice_generator import use_font_directory, use_distortion_budget
+        use_font_directory(args.font_dir)
+        use_distortion_budget(args.distortion_budget)
+
+    # Create output directories if they don't exist
+    output_dir = args.output_dir
+    os.makedirs(output_dir, exist_ok=True)
+    pdf_dir = os.path.join(output_dir, 'pdf_output')
+
+    if args.memory_budget:
+        run_pipeline(args, people_columns, output_dir, pdf_dir)
+        print(f"\nTotal execution time: {time.time() - t_start:.2f} seconds")
+        return
+
+    if args.workers:
+        import parallel
+        print(f"Generating tables with {args.workers} worker processes...")
+        counts = parallel.generate_tables(args, people_columns, output_dir)
+        for table, label in (('people', 'people'), ('transactions', 'transaction'), ('social', 'social interaction')):
+            print(f"Finished writing {counts[table]} {label} rows")
+        if args.defect_rate:
+            print(f"Logged {counts['defects']} injected defects")
+        print(f"\nTotal execution time: {time.time() - t_start:.2f} seconds")
+        return
+
+    # Generate the data
+    first_customer = ids.next_customer_index()
+    people_rows, transaction_rows, social_rows = people.generateRows(
+        num_customers,
+        generate_transactions,
+        transactions_per_customer,
+        args.error_rate,  # Pass the error rate percentage
+        people_columns,
+        time_ordered=args.time_ordered,
+        seasonality=args.seasonality
+    )
+
+    # Defects go in after transactions, so duplicated customers have none
+    defect_log = None
+    if args.defect_rate:
+        import defects
+        injector = defects.DefectInjector(args.defect_rate, args.defects, num_customers)
+        defect_log = injector.inject(people_rows, first_customer)
+
+    # CSV blocks and PDFs are written by background I/O threads while generation continues
+    writer = None
+    if args.io_threads:
+        from output_writer import OutputWriter
+        writer = OutputWriter(args.io_threads, sync=args.fsync, fadvise=args.fadvise)
+
+    if args.pg_dsn:
+        # Stream straight into Postgres, skipping the intermediate CSV files
+        import pg_sink
+        tables = [
+            ('people', people_columns, people_rows),
+            ('transactions', transactions.TRANSACTION_COLUMNS, transaction_rows),
+            ('social_interactions', people.SOCIAL_COLUMNS, social_rows)
+        ]
+        for table, column_names, rows in tables:
+            with pg_sink.PostgresCopySink(table, column_names, dsn=args.pg_dsn, batch_size=args.pg_batch_size,
+                                          copy_format=args.pg_format) as sink:
+                sink.write_rows(rows)
+            print(f"Finished copying {sink.rows_committed} rows into {table}")
+        pg_sink.close_connections()
+    else:
+        import compressed_sink
+        outputs = [
+            ('output_people.csv', people_columns, people_rows, "people", True),
+            ('output_transactions.csv', transactions.TRANSACTION_COLUMNS, transaction_rows, "transaction", generate_transactions),
+            ('output_social.csv', people.SOCIAL_COLUMNS, social_rows, "social interaction", True)
+        ]
+        if defect_log is not None:
+            outputs.append(('output_defects.csv', defects.DEFECT_COLUMNS, defect_log, "defect log", True))
+        # Outputs stay open until every table is written, so a table's compression
+        # thread keeps working while the next tables are formatted
+        with contextlib.ExitStack() as open_outputs:
+            for filename, column_names, rows, label, enabled in outputs:
+                output_path = os.path.join(output_dir, filename)
+                f = open_outputs.enter_context(compressed_sink.open_output(
+                    output_path, args.compress, args.compress_splittable, writer=writer))
+                if enabled:
+                    people.write_csv(f, rows, column_names if include_csv_headers else None)
+                print(f"Finished writing {label} data")
+        if defect_log is not None:
+            print(f"Logged {len(defect_log)} injected defects")
+
+    if args.pdf:
+        # Now generate invoices for each person
+        from invoice_generator import generate_invoice
+        os.makedirs(pdf_dir, exist_ok=True)
+        print(f"\nGenerating {num_customers} invoices with {args.error_rate}% error rate...")
+
+        # Track number of invoices with errors
+        error_count = 0
+        total_invoices = 0
+
+        annotation_writer = None
+        if args.annotations:
+            from annotations import AnnotationWriter
+            annotation_writer = AnnotationWriter(os.path.join(pdf_dir, 'annotations.jsonl'), keep_previous=args.incremental)
+
+        # The manifest sits next to pdf_output/ and maps each PDF to the digest of its inputs
+        cache = None
+        if args.incremental:
+            from build_cache import BuildCache
+            cache = BuildCache(os.path.join(output_dir, 'pdf_output.manifest'))
+
+        # Generate an invoice for each person with transactions
+        for person, items in invoice_jobs(people_rows, transaction_rows, args.time_ordered):
+            total_invoices += 1
+            if generate_invoice(person, items, dirty_rate=args.dirty_rate,
+                                annotation_writer=annotation_writer, seed=args.seed, cache=cache,
+                                output_dir=pdf_dir, writer=writer, engine=args.engine):
+                error_count += 1
+
+        # Every PDF is on disk before the manifest records it
+        if writer is not None:
+            writer.close()
+
+        if cache is not None:
+            cache.save()
+            print(f"Rendered {cache.built} invoices, {cache.skipped} unchanged since the last run")
+
+        if annotation_writer is not None:
+            annotation_writer.close()
+            print(f"Wrote annotations for {annotation_writer.count} invoices")
+
+        print(f"\nGenerated {total_invoices} invoices, {error_count} ({(error_count/total_invoices)*100:.1f}%) contain calculation errors.")
+
+    if writer is not None:
+        writer.close()
+
+    t_end = time.time()
+    total_time = t_end - t_start
+    print(f"\nTotal execution time: {total_time:.2f} seconds") 
+
+def group_line_items(transaction_rows):
+    """Group transactions by customer_id, parsed once into typed line items."""
+    from line_items import LineItem
+    customer_index = transactions.TRANSACTION_COLUMNS.index('customer_id')
+    transactions_by_customer = {}
+    for row in transaction_rows:
+        item = LineItem.from_transaction(dict(zip(transactions.TRANSACTION_COLUMNS, row)))
+        transactions_by_customer.setdefault(row[customer_index], []).append(item)
+    return transactions_by_customer
+
+def invoice_jobs(people_rows, transaction_rows, time_ordered=False):
+    """Yield (person, line items) for every person with transactions, in people order.
+
+    Transactions are generated customer by customer, so each customer's rows form one
+    run in people order and are paired up as they stream past; only time-ordered
+    tables need grouping by customer_id first.
+    """
+    if time_ordered:
+        transactions_by_customer = group_line_items(transaction_rows)
+        for person in people_rows.records():
+            items = transactions_by_customer.get(person['customer_id'])
+            if items:
+                yield person, items
+        return
+    from line_items import LineItem
+    customer_index = transactions.TRANSACTION_COLUMNS.index('customer_id')
+    runs = itertools.groupby(transaction_rows, key=lambda row: row[customer_index])
+    customer_id, rows = next(runs, (None, None))
+    for person in people_rows.records():
+        if person['customer_id'] != customer_id:
+            continue
+        yield person, [LineItem.from_transaction(dict(zip(transactions.TRANSACTION_COLUMNS, row))) for row in rows]
+        customer_id, rows = next(runs, (None, None))
+
+class CsvTableSink:
+    """Appends row chunks to one CSV output, writing the header before the first chunk."""
+
+    def __init__(self, f, header=None):
+        self.file = f
+        self.header = header
+
+    def write_rows(self, rows):
+        people.write_csv(self.file, rows, self.header)
+        self.header = None
+
+    def close(self):
+        self.file.close()
+
+# Customers generated per chunk by the pipeline's generate stage
+PIPELINE_CHUNK = 500
+# Share of --memory-budget given to each pipeline queue
+QUEUE_SHARES = {'rows': 0.25, 'invoices': 0.25, 'write': 0.5}
+# Rough size of a queued invoice: the customer's fields plus each parsed line item
+INVOICE_JOB_BYTES = 1024
+LINE_ITEM_BYTES = 200
+
+def run_pipeline(args, people_columns, output_dir, pdf_dir):
+    """Generate, write and render in overlapping stages bounded by --memory-budget.
+
+    generate -> [rows] -> sink -> [invoices] -> render -> [write] -> I/O threads.
+    The generate stage makes customers and their transactions in chunks, then the
+    social rows in chunks (partner IDs come from customer indexes), the sink stage writes each chunk to
+    the CSV files or Postgres and queues its invoices, and the render stage hands PDFs
+    to the OutputWriter. Full queues block their producer, or with --overflow shed
+    make the sink stage skip invoices.
+    """
+    from output_writer import OutputWriter
+    budget = args.memory_budget
+    flow = pipeline.Pipeline()
+    rows_queue = flow.queue('rows', int(budget * QUEUE_SHARES['rows']))
+    invoice_queue = flow.queue('invoices', int(budget * QUEUE_SHARES['invoices']), shed=args.overflow == 'shed')
+    writer = OutputWriter(max(args.io_threads, 1), int(budget * QUEUE_SHARES['write']), sync=args.fsync,
+                          fadvise=args.fadvise)
+    flow.add_queue(writer.queue)
+
+    injector = None
+    if args.defect_rate:
+        import defects
+        injector = defects.DefectInjector(args.defect_rate, args.defects, args.num_customers)
+
+    def generate_stage():
+        first_customer = ids.next_customer_index()
+        try:
+            for start in range(0, args.num_customers, PIPELINE_CHUNK):
+                people_rows = people.generate_people_rows(min(PIPELINE_CHUNK, args.num_customers - start), people_columns)
+                chunk_ids = people_rows.column('customer_id')
+                if args.generate_transactions:
+                    transaction_rows = people.generate_transaction_rows(chunk_ids, args.transactions_per_customer,
+                                                                        args.error_rate)
+                else:
+                    transaction_rows = transactions.new_transaction_table()
+                defect_log = injector.inject(people_rows, first_customer + start) if injector else None
+                rows_queue.put(('people', people_rows, transaction_rows), people_rows.nbytes() + transaction_rows.nbytes())
+                if defect_log is not None:
+                    counts['defects'] += len(defect_log)
+                    rows_queue.put(('defects', defect_log, None), defect_log.nbytes())
+            # Generate twice as many interactions as people; partner IDs are derived from
+            # customer indexes, so no customer list is kept
+            social = people.iter_social_rows(args.num_customers, args.num_customers * 2, first_customer)
+            while True:
+                social_rows = people.new_social_table()
+                social_rows.extend(itertools.islice(social, PIPELINE_CHUNK * 2))
+                if not len(social_rows):
+                    break
+                rows_queue.put(('social', social_rows, None), social_rows.nbytes())
+        finally:
+            rows_queue.close()
+
+    def sink_stage():
+        if args.pg_dsn:
+            import pg_sink
+            def open_sink(table, column_names, filename):
+                return pg_sink.PostgresCopySink(table, column_names, dsn=args.pg_dsn, batch_size=args.pg_batch_size,
+                                                copy_format=args.pg_format)
+        else:
+            import compressed_sink
+            def open_sink(table, column_names, filename):
+                f = compressed_sink.open_output(os.path.join(output_dir, filename), args.compress,
+                                                args.compress_splittable, writer=writer)
+                return CsvTableSink(f, column_names if args.include_headers else None)
+        sinks = {
+            'people': open_sink('people', people_columns, 'output_people.csv'),
+            'transactions': open_sink('transactions', transactions.TRANSACTION_COLUMNS, 'output_transactions.csv'),
+            'social': open_sink('social_interactions', people.SOCIAL_COLUMNS, 'output_social.csv')
+        }
+        if injector:
+            sinks['defects'] = open_sink('defects', defects.DEFECT_COLUMNS, 'output_defects.csv')
+        failed = True
+        try:
+            for kind, rows, transaction_rows in rows_queue:
+                sinks[kind].write_rows(rows)
+                if kind != 'people':
+                    continue
+                if args.generate_transactions:
+                    sinks['transactions'].write_rows(transaction_rows)
+                if args.pdf:
+                    for person, items in invoice_jobs(rows, transaction_rows):
+                        invoice_queue.put((person, items), INVOICE_JOB_BYTES + LINE_ITEM_BYTES * len(items))
+            failed = False
+        finally:
+            invoice_queue.close()
+            for sink in sinks.values():
+                # Postgres sinks roll back their table when the run fails
+                if failed and hasattr(sink, 'abort'):
+                    sink.abort()
+                else:
+                    sink.close()
+
+    counts = {'invoices': 0, 'errors': 0, 'defects': 0}
+    annotation_writer = None
+
+    def render_stage():
+        for person, items in invoice_queue:
+            counts['invoices'] += 1
+            if generate_invoice(person, items, dirty_rate=args.dirty_rate,
+                                annotation_writer=annotation_writer, output_dir=pdf_dir, writer=writer, engine=args.engine):
+                counts['errors'] += 1
+
+    flow.stage('generate', generate_stage)
+    flow.stage('sink', sink_stage)
+    if args.pdf:
+        from invoice_generator import generate_invoice
+        os.makedirs(pdf_dir, exist_ok=True)
+        if args.annotations:
+            from annotations import AnnotationWriter
+            annotation_writer = AnnotationWriter(os.path.join(pdf_dir, 'annotations.jsonl'))
+        flow.stage('render', render_stage)
+
+    print(f"Running pipelined with a {pipeline.format_size(budget)} memory budget...")
+    try:
+        flow.run()
+    finally:
+        writer.close()
+        if annotation_writer is not None:
+            annotation_writer.close()
+
+    print(f"Finished writing {args.num_customers} customers")
+    if injector:
+        print(f"Logged {counts['defects']} injected defects")
+    if args.pdf:
+        print(f"Generated {counts['invoices']} invoices, {counts['errors']} contain calculation errors")
+        if invoice_queue.shed_items:
+            print(f"Shed {invoice_queue.shed_items} invoices to stay within the memory budget")
+    print("\nPipeline queues:")
+    print(flow.report())
+
+def load_scenarios(path):
+    """Read a batch file: a list of scenarios, or a mapping with 'scenarios' and optional 'defaults'."""
+    with open(path, 'r') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError("YAML batch files require PyYAML: pip install pyyaml")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    defaults = {}
+    if isinstance(data, dict):
+        defaults = data.get('defaults') or {}
+        data = data.get('scenarios')
+    if not isinstance(data, list) or not all(isinstance(scenario, dict) for scenario in data):
+        raise ValueError(f"{path} must contain a list of scenarios (mappings of option names to values)")
+    return [dict(defaults, **scenario) for scenario in data]
+
+def scenario_arguments(scenario):
+    """Turn a scenario mapping into command line arguments.
+
+    Keys are long option names without the leading dashes (e.g. error-rate or
+    error_rate). Flags are enabled with true; false or null leaves them out.
+    """
+    argv = []
+    for key, value in scenario.items():
+        option = '--' + key.replace('_', '-')
+        if value is True:
+            argv.append(option)
+        elif value is False or value is None:
+            continue
+        elif isinstance(value, (list, tuple)):
+            argv += [option, ','.join(str(item) for item in value)]
+        else:
+            argv += [option, str(value)]
+    return argv
+
+def run_batch(args, argv):
+    """Run every scenario of a batch file in this process.
+
+    Seed lists, fonts and effect libraries are loaded once and shared by all
+    scenarios. Options given next to --batch apply to every scenario, and each
+    scenario writes to --output-dir/<name> (scenario_<n> when it has no name).
+    """
+    base_argv = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg == '--batch':
+            skip = True
+        elif not arg.startswith('--batch='):
+            base_argv.append(arg)
+
+    scenarios = load_scenarios(args.batch)
+    t_start = time.time()
+    for number, scenario in enumerate(scenarios, start=1):
+        scenario = dict(scenario)
+        name = str(scenario.pop('name', f'scenario_{number}'))
+        scenario_argv = base_argv + ['--output-dir', os.path.join(args.output_dir, name)] + scenario_arguments(scenario)
+        print(f"\n=== Scenario {number}/{len(scenarios)}: {name} ===")
+        generate(parse_arguments(scenario_argv))
+    print(f"\nRan {len(scenarios)} scenarios in {time.time() - t_start:.2f} seconds")
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_arguments(argv)
+    if args.batch:
+        run_batch(args, argv)
+    else:
+        generate(args)
+
+if __name__ == '__main__':
+    main()
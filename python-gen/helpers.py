@@ -23,41 +23,45 @@ extrahandlers = {
 }
 
 def AccountHandler():
-	return random.choice(i.df_account_types)
+	return i.ws_account_types.choice()
 
 def PhoneHandler():
-	return random.choice(i.df_phones)
+	return i.ws_phones.choice()
 
 def JobTypeHandler():
-	return random.choice(i.df_jobs)
+	return i.ws_jobs.choice()
+
+def CCNumberHandler():
+	prefix = random.choice(['4', '5', '3'])
+	return prefix + ''.join(random.choice(string.digits) for _ in range(14 if prefix == '3' else 15))
 
 def SsnHandler():
 	return str(random.randint(100,999)) + "-" + str(random.randint(1,99)) + "-" + str(random.randint(1000,9999))
 
 def AllergyHandler():
-	return random.choice(i.df_allergies)
+	return i.ws_allergies.choice()
 
 def BloodTypeHandler():
-	return random.choice(i.df_bloodtypes)
+	return i.ws_bloodtypes.choice()
 
 def IPAddressHandler():
-	return random.choice(i.df_ip_addresses)
+	return i.ws_ip_addresses.choice()
 
 def SocialLastUriHandler():
-	return random.choice(i.df_uris)
+	return i.ws_uris.choice()
 
 def SocialTimestampHandler():
 	random_datetime = c.trans_start_date + datetime.timedelta(seconds=random.randint(1,c.max_seconds))	
 	return str(random_datetime.replace(microsecond=0))
 
 def SocialIPAddressHandler():
-	return random.choice(i.df_ip_addresses)
+	return i.ws_ip_addresses.choice()
 
 def SocialShaHandler():
-	return random.choice(i.df_sha256)
+	return i.ws_sha256.choice()
 
 def SocialUuid4Handler():
-	return random.choice(i.df_ip_addresses)
+	return i.ws_ip_addresses.choice()
 
 
 # our handler map
@@ -0,0 +1,309 @@
+import os
+import random
+import string
+import hashlib
+
+# ID service for customer, order and interaction IDs.
+#
+# RandomIds draws IDs in bulk from os.urandom: one urandom call fills a buffer that
+# bytes.translate maps onto the alphabet in C, dropping the few byte values that
+# would bias the result, so an ID costs a slice instead of a random.choice per character.
+#
+# UniqueIds guarantees uniqueness without remembering issued IDs: it encodes a counter
+# through a keyed permutation of the whole ID space (a Feistel network with cycle
+# walking), so distinct counter values always give distinct, random-looking IDs.
+#
+# Customer IDs are a keyed function of the customer's index (IndexedIds, or UniqueIds
+# in unique mode): the people generator takes indexes 0, 1, 2, ... in order, and any
+# other stage or shard gets the ID of customer i from customer_id_for(i) without
+# storing or looking up the people table. Seeded runs key the function from the seed.
+
+LOWER36 = string.digits + string.ascii_lowercase
+UPPER36 = string.digits + string.ascii_uppercase
+
+FEISTEL_ROUNDS = 4
+# Customer IDs computed per ids_for call when iterating a CustomerIdRange
+ID_BATCH = 1024
+
+# Source of random bytes for IDs and keys; use_seeded_source() swaps in the random module
+_randbytes = os.urandom
+
+def _translation(alphabet):
+    """Build a bytes.translate table and the byte values to delete for an alphabet."""
+    usable = 256 - 256 % len(alphabet)
+    table = bytes(ord(alphabet[b % len(alphabet)]) if b < usable else 0 for b in range(256))
+    return table, bytes(range(usable, 256))
+
+def encode(value, size, alphabet=LOWER36):
+    """Encode a non-negative integer as a fixed-width string in the alphabet's base."""
+    base = len(alphabet)
+    chars = []
+    for _ in range(size):
+        value, digit = divmod(value, base)
+        chars.append(alphabet[digit])
+    return ''.join(reversed(chars))
+
+class RandomIds:
+    """Random fixed-width IDs drawn from os.urandom in bulk."""
+
+    def __init__(self, size=16, alphabet=LOWER36, batch=4096):
+        self.size = size
+        self.alphabet = alphabet
+        self.batch = batch
+        self.table, self.delete = _translation(alphabet)
+        self.buffer = ''
+        self.offset = 0
+
+    def _refill(self, count):
+        needed = count * self.size
+        chunks = [self.buffer[self.offset:]]
+        have = len(chunks[0])
+        while have < needed:
+            # Oversample a little so one urandom call usually covers the rejected bytes
+            raw = _randbytes((needed - have) * 9 // 8 + 16)
+            chunk = raw.translate(self.table, self.delete).decode('ascii')
+            chunks.append(chunk)
+            have += len(chunk)
+        self.buffer = ''.join(chunks)
+        self.offset = 0
+
+    def take(self, count):
+        """Return a list of count IDs."""
+        if len(self.buffer) - self.offset < count * self.size:
+            self._refill(max(count, self.batch))
+        size = self.size
+        start = self.offset
+        self.offset += count * size
+        buffer = self.buffer
+        return [buffer[i:i + size] for i in range(start, self.offset, size)]
+
+    def next(self):
+        """Return one ID."""
+        if len(self.buffer) - self.offset < self.size:
+            self._refill(self.batch)
+        start = self.offset
+        self.offset += self.size
+        return self.buffer[start:self.offset]
+
+class IndexedIds:
+    """IDs computed from a counter with a keyed hash, so any index's ID can be recomputed."""
+
+    def __init__(self, size=16, alphabet=LOWER36, key=None, start=0):
+        self.size = size
+        self.alphabet = alphabet
+        self.key = key if key is not None else _randbytes(16)
+        self.counter = start
+        self.space = len(alphabet) ** size
+        self.table, self.delete = _translation(alphabet)
+        # Keyed hash state, copied for each index instead of re-keying. The digest has 50%
+        # more bytes than the ID needs, so after translate drops the byte values that would
+        # bias the alphabet there are rarely too few left (id_for falls back to encode then)
+        self.hasher = hashlib.blake2b(key=self.key, digest_size=min(64, size * 3 // 2))
+
+    def id_for(self, index):
+        """Return the ID for a given counter value."""
+        hasher = self.hasher.copy()
+        hasher.update(index.to_bytes(8, 'big'))
+        digest = hasher.digest()
+        chars = digest.translate(self.table, self.delete)
+        if len(chars) >= self.size:
+            return chars[:self.size].decode('ascii')
+        return encode(int.from_bytes(digest, 'big') % self.space, self.size, self.alphabet)
+
+    def ids_for(self, indexes):
+        """Return the IDs for a sequence of counter values."""
+        return [self.id_for(index) for index in indexes]
+
+    def take(self, count):
+        """Return a list of count IDs."""
+        start = self.counter
+        self.counter += count
+        return self.ids_for(range(start, self.counter))
+
+    def next(self):
+        """Return one ID."""
+        index = self.counter
+        self.counter += 1
+        return self.id_for(index)
+
+class UniqueIds:
+    """Guaranteed-unique IDs: a counter mixed through a keyed permutation of the ID space."""
+
+    def __init__(self, size=16, alphabet=LOWER36, key=None, start=0):
+        self.size = size
+        self.alphabet = alphabet
+        self.key = key if key is not None else _randbytes(16)
+        self.counter = start
+        self.space = len(alphabet) ** size
+        # Balanced Feistel halves covering the ID space
+        self.half_bits = ((self.space - 1).bit_length() + 1) // 2
+        self.mask = (1 << self.half_bits) - 1
+        self.half_bytes = (self.half_bits + 7) // 8
+        # Keyed round-function state, copied for each round instead of re-keying
+        self.hasher = hashlib.blake2b(key=self.key, digest_size=8)
+        self.round_bytes = [bytes((round_number,)) for round_number in range(FEISTEL_ROUNDS)]
+
+    def _round(self, value, round_number):
+        hasher = self.hasher.copy()
+        hasher.update(value.to_bytes(self.half_bytes, 'big') + self.round_bytes[round_number])
+        return int.from_bytes(hasher.digest(), 'big') & self.mask
+
+    def _feistel(self, value):
+        left, right = value >> self.half_bits, value & self.mask
+        for round_number in range(FEISTEL_ROUNDS):
+            left, right = right, left ^ self._round(right, round_number)
+        return (left << self.half_bits) | right
+
+    def permute(self, index):
+        """Map an index in [0, space) to a unique position in [0, space)."""
+        if not 0 <= index < self.space:
+            raise ValueError(f"Index {index} is outside the ID space of {self.space}")
+        value = self._feistel(index)
+        # Cycle walking keeps the permutation inside the ID space
+        while value >= self.space:
+            value = self._feistel(value)
+        return value
+
+    def id_for(self, index):
+        """Return the ID for a given counter value."""
+        return encode(self.permute(index), self.size, self.alphabet)
+
+    def ids_for(self, indexes):
+        """Return the IDs for a sequence of counter values, the same as id_for for each.
+
+        Every ID still costs 4 hashes per Feistel pass (about 2.4 passes for 16-character
+        base-36 IDs, because of cycle walking), so this runs at roughly 70k IDs/s against
+        about 1M for IndexedIds; the batch saves the per-call lookups and encodes two
+        characters per divmod.
+        """
+        copy, round_bytes, from_bytes = self.hasher.copy, self.round_bytes, int.from_bytes
+        half_bits, half_bytes, mask, space = self.half_bits, self.half_bytes, self.mask, self.space
+        pairs = [first + second for first in self.alphabet for second in self.alphabet]
+        pair_base, pair_count, odd = len(pairs), self.size // 2, self.size % 2
+        result = []
+        for index in indexes:
+            if not 0 <= index < space:
+                raise ValueError(f"Index {index} is outside the ID space of {space}")
+            value = index
+            while True:
+                left, right = value >> half_bits, value & mask
+                for suffix in round_bytes:
+                    hasher = copy()
+                    hasher.update(right.to_bytes(half_bytes, 'big') + suffix)
+                    left, right = right, left ^ (from_bytes(hasher.digest(), 'big') & mask)
+                value = (left << half_bits) | right
+                # Cycle walking keeps the permutation inside the ID space
+                if value < space:
+                    break
+            chars = []
+            for _ in range(pair_count):
+                value, pair = divmod(value, pair_base)
+                chars.append(pairs[pair])
+            if odd:
+                chars.append(self.alphabet[value % len(self.alphabet)])
+            result.append(''.join(reversed(chars)))
+        return result
+
+    def take(self, count):
+        """Return a list of count IDs."""
+        start = self.counter
+        self.counter += count
+        return self.ids_for(range(start, self.counter))
+
+    def next(self):
+        """Return one ID."""
+        index = self.counter
+        self.counter += 1
+        return self.id_for(index)
+
+# Default generators used by core.nextId, people.generate_id and the transaction order IDs
+customer_ids = IndexedIds(16, LOWER36)
+interaction_ids = RandomIds(16, LOWER36)
+order_ids = RandomIds(8, UPPER36)
+
+def use_random_ids():
+    """Restore the default generators and byte source, dropping any buffered IDs.
+
+    Customer IDs get a fresh random key.
+    """
+    global customer_ids, interaction_ids, order_ids, _randbytes
+    _randbytes = os.urandom
+    customer_ids = IndexedIds(16, LOWER36)
+    interaction_ids = RandomIds(16, LOWER36)
+    order_ids = RandomIds(8, UPPER36)
+
+def derive_key(key, name):
+    """Derive an independent 16-byte key for one ID stream."""
+    return hashlib.blake2b(name, key=key[:64], digest_size=16).digest()
+
+def use_unique_ids(key=None):
+    """Switch the default generators to guaranteed-unique mode.
+
+    Each generator derives its own key from `key` (random when omitted).
+    """
+    global customer_ids, interaction_ids, order_ids
+    key = key if key is not None else _randbytes(16)
+    if isinstance(key, str):
+        key = key.encode('utf-8')
+    customer_ids = UniqueIds(16, LOWER36, derive_key(key, b'customer'))
+    interaction_ids = UniqueIds(16, LOWER36, derive_key(key, b'interaction'))
+    order_ids = UniqueIds(8, UPPER36, derive_key(key, b'order'))
+
+def seed_key(seed):
+    """Derive a 16-byte key from a run's seed."""
+    return hashlib.blake2b(str(seed).encode('utf-8'), digest_size=16).digest()
+
+def use_seeded_source(seed):
+    """Draw ID bytes from the (seeded) random module so runs with the same seed repeat their IDs.
+
+    Customer IDs are keyed from the seed itself, so they do not depend on how much
+    randomness was drawn before.
+    """
+    global _randbytes, customer_ids
+    _randbytes = random.randbytes
+    customer_ids = IndexedIds(16, LOWER36, derive_key(seed_key(seed), b'customer'))
+
+def customer_id():
+    """Return a new 16-character customer ID."""
+    return customer_ids.next()
+
+def customer_id_for(index):
+    """Return the 16-character ID of the customer at a given index."""
+    return customer_ids.id_for(index)
+
+class CustomerIdRange:
+    """Lazy sequence of the customer IDs for a range of customer indexes."""
+
+    def __init__(self, start, stop):
+        self.indexes = range(start, stop)
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            indexes = self.indexes[position]
+            if indexes.step != 1:
+                raise ValueError("CustomerIdRange slices cannot have a step")
+            return CustomerIdRange(indexes.start, indexes.stop)
+        return customer_id_for(self.indexes[position])
+
+    def __iter__(self):
+        for start in range(0, len(self.indexes), ID_BATCH):
+            yield from customer_ids.ids_for(self.indexes[start:start + ID_BATCH])
+
+def next_customer_index():
+    """Index of the customer whose ID the next customer_id() returns."""
+    return customer_ids.counter
+
+def seek_customer(index):
+    """Make the next customer_id() the ID of the customer at a given index."""
+    customer_ids.counter = index
+
+def interaction_id():
+    """Return a new 16-character interaction ID."""
+    return interaction_ids.next()
+
+def order_id():
+    """Return a new 8-character order ID."""
+    return order_ids.next()
@@ -1,7 +1,9 @@
 import os
 
+import weighted
+
 # for any csv or txt file found in the ./inputs directory, we load the data into memory for use by this program
-# e.g. cities.csv becomes df_cities()
+# e.g. cities.csv becomes df_cities (the raw list) and ws_cities (a weighted sampler, see weighted.py)
 
 for filename in os.listdir("inputs"):
 	#first, if we want current dates, regen this file prior to loading into memory
@@ -9,7 +11,10 @@ for filename in os.listdir("inputs"):
 		arrayname = os.path.join(filename[:-4])
 		globals()["df_"+arrayname] = 0
 		with open("inputs/" + filename, "r") as file:
-			globals()["df_"+arrayname] = file.read().split('\n')
+			lines = file.read().split('\n')
 			file.close()
+		seeds = weighted.WeightedSeeds.from_lines(lines)
+		globals()["ws_"+arrayname] = seeds
+		globals()["df_"+arrayname] = seeds.values if weighted.has_weight_header(lines) else lines
 	else:
 		continue
\ No newline at end of file
@@ -1,26 +1,24 @@
 import os
+import random
+import csv
 from datetime import datetime
-from decimal import Decimal
 from reportlab.lib.units import mm
-from reportlab.lib.styles import ParagraphStyle
-from reportlab.platypus import Paragraph, Frame, KeepInFrame
 from reportlab.lib import colors
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.graphics import renderPDF
-from reportlab.graphics.shapes import Drawing, Rect, Circle, Line, Polygon
-import random
-import csv
-import io
-import math
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
-from PIL import Image
-from pdf_distortions import PDFDistorter
-import tempfile
+from line_items import to_line_items, format_cents
+import fonts
+from annotations import InvoiceAnnotations, draw_text
+import build_cache
+import direct_pdf
+import weighted
+
+# Only import this module when invoices are rendered: it pulls in ReportLab and loads
+# the invoice seed lists. Distortions (NumPy) are imported for dirty invoices only.
 
 # Define available fonts and colors
-FONTS = ['Helvetica', 'Times-Roman', 'Courier', 'Helvetica-Bold', 'Times-Bold']
+BUILTIN_FONTS = ('Helvetica', 'Times-Roman', 'Courier', 'Helvetica-Bold', 'Times-Bold')
+FONTS = list(BUILTIN_FONTS)
 TEXT_COLORS = {
     'black': colors.black,
     'dark grey': colors.Color(0.2, 0.2, 0.2),
@@ -29,11 +27,35 @@ TEXT_COLORS = {
 }
 FONT_SIZES = [9, 10, 11, 12]
 
+def use_font_directory(directory):
+    """Pick invoice fonts from the built-in fonts plus every TTF font in a directory (None for built-ins only)."""
+    FONTS[:] = BUILTIN_FONTS
+    if not directory:
+        return
+    for name in fonts.load_font_directory(directory):
+        if name not in FONTS:
+            FONTS.append(name)
+
 LOGO_TYPES = ['geometric', 'abstract', 'initials']
 
-def generate_random_logo(width=30, height=30):
-    """Generate a random logo as a ReportLab Drawing object."""
-    drawing = Drawing(width, height)
+# Bytes distortions may add to a dirty invoice (None for the pdf_distortions default)
+DISTORTION_BUDGET = None
+
+def use_distortion_budget(budget):
+    """Set the per-PDF distortion budget in bytes (None for the default)."""
+    global DISTORTION_BUDGET
+    DISTORTION_BUDGET = budget
+
+# People columns an invoice needs to draw the "Bill To" block
+CUSTOMER_COLUMNS = ('customer_id', 'name_first', 'name_last', 'address', 'city', 'state', 'postal_code')
+
+def random_logo_shapes(width=30, height=30):
+    """Pick a random logo design as a list of shapes.
+
+    Each shape is ('circle', cx, cy, r, fill), ('rect', x, y, w, h, fill),
+    ('polygon', points, fill) or ('line', x1, y1, x2, y2, color, width). Filled
+    shapes have the default 1pt black outline of ReportLab shapes.
+    """
     logo_type = random.choice(LOGO_TYPES)
     
     # Choose two contrasting colors
@@ -52,46 +74,79 @@ def generate_random_logo(width=30, height=30):
     
     if logo_type == 'geometric':
         # Create a geometric pattern
-        shapes = []
-        # Background shape
-        shapes.append(Circle(width/2, height/2, width/2.5, fillColor=main_color))
-        # Overlay shape
-        shapes.append(Polygon(
-            points=[
-                width/2, height,
-                0, height/3,
-                width/2, 0,
-                width, height/3
-            ],
-            fillColor=accent_color
-        ))
+        return [
+            # Background shape
+            ('circle', width/2, height/2, width/2.5, main_color),
+            # Overlay shape
+            ('polygon', [(width/2, height), (0, height/3), (width/2, 0), (width, height/3)], accent_color)
+        ]
         
     elif logo_type == 'abstract':
         # Create abstract lines
-        shapes = []
-        # Background
-        shapes.append(Rect(0, 0, width, height, fillColor=main_color))
+        shapes = [('rect', 0, 0, width, height, main_color)]
         # Random lines
         for _ in range(5):
             x1, y1 = random.randint(0, width), random.randint(0, height)
             x2, y2 = random.randint(0, width), random.randint(0, height)
-            shapes.append(Line(x1, y1, x2, y2, strokeColor=accent_color, strokeWidth=2))
+            shapes.append(('line', x1, y1, x2, y2, accent_color, 2))
+        return shapes
             
     else:  # initials
         # Create abstract letter-like shapes
-        shapes = []
-        # Background
-        shapes.append(Circle(width/2, height/2, width/2, fillColor=main_color))
-        # Vertical line
-        shapes.append(Rect(width/3, height/4, width/6, height/2, fillColor=accent_color))
-        # Horizontal line
-        shapes.append(Rect(width/4, height/2.2, width/2, height/6, fillColor=accent_color))
-    
-    for shape in shapes:
-        drawing.add(shape)
-    
+        return [
+            # Background
+            ('circle', width/2, height/2, width/2, main_color),
+            # Vertical line
+            ('rect', width/3, height/4, width/6, height/2, accent_color),
+            # Horizontal line
+            ('rect', width/4, height/2.2, width/2, height/6, accent_color)
+        ]
+
+def generate_random_logo(width=30, height=30):
+    """Generate a random logo as a ReportLab Drawing object (for the legacy CustomInvoice)."""
+    from reportlab.graphics.shapes import Drawing, Rect, Circle, Line, Polygon
+    drawing = Drawing(width, height)
+    for shape in random_logo_shapes(width, height):
+        kind = shape[0]
+        if kind == 'circle':
+            drawing.add(Circle(*shape[1:4], fillColor=shape[4]))
+        elif kind == 'rect':
+            drawing.add(Rect(*shape[1:5], fillColor=shape[5]))
+        elif kind == 'polygon':
+            drawing.add(Polygon(points=[value for point in shape[1] for value in point], fillColor=shape[2]))
+        else:
+            drawing.add(Line(*shape[1:5], strokeColor=shape[5], strokeWidth=shape[6]))
     return drawing
 
+def draw_random_logo(canvas, x, y, width=30, height=30):
+    """Draw a random logo at (x, y) with plain canvas operations."""
+    canvas.saveState()
+    canvas.translate(x, y)
+    canvas.setStrokeColor(colors.black)
+    canvas.setLineWidth(1)
+    for shape in random_logo_shapes(width, height):
+        kind = shape[0]
+        if kind == 'line':
+            canvas.saveState()
+            canvas.setStrokeColor(shape[5])
+            canvas.setLineWidth(shape[6])
+            canvas.line(*shape[1:5])
+            canvas.restoreState()
+            continue
+        canvas.setFillColor(shape[-1])
+        if kind == 'circle':
+            canvas.circle(*shape[1:4], stroke=1, fill=1)
+        elif kind == 'rect':
+            canvas.rect(*shape[1:5], stroke=1, fill=1)
+        else:
+            path = canvas.beginPath()
+            path.moveTo(*shape[1][0])
+            for point in shape[1][1:]:
+                path.lineTo(*point)
+            path.close()
+            canvas.drawPath(path, stroke=1, fill=1)
+    canvas.restoreState()
+
 def get_random_style():
     """Get random font, color, and size for the invoice."""
     base_size = random.choice(FONT_SIZES)
@@ -113,7 +168,8 @@ def load_data_from_csv(filename):
 # Cache the data to avoid reading files multiple times
 COMPANIES = load_data_from_csv('companies.csv')
 STREETS = load_data_from_csv('streetnames.csv')
-CITIES = load_data_from_csv('cities.csv')
+# Company cities are weighted like city sizes (Zipfian)
+CITIES = weighted.load_seeds('./inputs/cities.csv')
 STATES = load_data_from_csv('states.csv')
 POSTAL_CODES = load_data_from_csv('postalcodes.csv')
 
@@ -125,7 +181,7 @@ def get_random_address():
     """Get a random address."""
     return {
         'street': f"{random.randint(100, 9999)} {random.choice(STREETS)}",
-        'city': random.choice(CITIES),
+        'city': CITIES.choice(),
         'state': random.choice(STATES),
         'postal_code': random.choice(POSTAL_CODES)
     }
@@ -139,7 +195,7 @@ class CustomInvoice:
 
     def __init__(self, customer, transactions, error_rate=0.04):
         self.customer = customer
-        self.transactions = transactions
+        self.transactions = to_line_items(transactions)
         self.error_rate = error_rate
         self.style = get_random_style()
         self.logo = generate_random_logo()
@@ -150,6 +206,7 @@ class CustomInvoice:
         """Generate the invoice PDF."""
         self.pdf = canvas.Canvas(output_path)
         self.pdf.setPageSize((210 * mm, 297 * mm))  # A4 size
+        fonts.prime_font(self.pdf, self.style['font'])
         
         # Draw content
         self._draw_logo()
@@ -169,6 +226,7 @@ class CustomInvoice:
 
     def _draw_logo(self):
         """Draw the random logo in the upper left corner."""
+        from reportlab.graphics import renderPDF
         renderPDF.draw(self.logo, self.pdf, self.LEFT * mm, (self.TOP - 15) * mm)
 
     def _draw_header(self):
@@ -184,11 +242,11 @@ class CustomInvoice:
         y = self.TOP - 50
         self.pdf.drawString(self.LEFT * mm, y * mm, "Bill To:")
         y -= 15
-        self.pdf.drawString(self.LEFT * mm, y * mm, f"{self.customer['first_name']} {self.customer['last_name']}")
+        self.pdf.drawString(self.LEFT * mm, y * mm, f"{self.customer['name_first']} {self.customer['name_last']}")
         y -= 15
-        self.pdf.drawString(self.LEFT * mm, y * mm, self.customer['street'])
+        self.pdf.drawString(self.LEFT * mm, y * mm, self.customer['address'])
         y -= 15
-        self.pdf.drawString(self.LEFT * mm, y * mm, f"{self.customer['city']}, {self.customer['state']} {self.customer['zip']}")
+        self.pdf.drawString(self.LEFT * mm, y * mm, f"{self.customer['city']}, {self.customer['state']} {self.customer['postal_code']}")
 
     def _draw_company_info(self):
         """Draw the company information."""
@@ -220,147 +278,192 @@ class CustomInvoice:
         # Draw items
         y -= 15
         
-        for trans in self.transactions:
-            units = int(trans['numberofitems'])
-            price_per_unit = float(trans['price_per_unit'])
-            total = float(trans['transactiontotal'])  # Use the pre-calculated total that includes errors
-            
-            # Calculate the correct total for error tracking
-            correct_total = units * price_per_unit
-            if abs(total - correct_total) > 0.01:  # Check if there's a math error
-                self.errors.append(f"Item total should be ${correct_total:.2f}, but shows ${total:.2f}")
+        for item in self.transactions:
+            # The stated total may include an injected error
+            if item.has_error:
+                self.errors.append(f"Item total should be {format_cents(item.correct_total_cents)}, but shows {format_cents(item.total_cents)}")
             
-            self.pdf.drawString(self.LEFT * mm, y * mm, trans['productcategory'])
-            self.pdf.drawString((self.LEFT + 80) * mm, y * mm, str(units))
-            self.pdf.drawString((self.LEFT + 110) * mm, y * mm, f"${price_per_unit:.2f}")
-            self.pdf.drawString((self.LEFT + 150) * mm, y * mm, f"${total:.2f}")
+            self.pdf.drawString(self.LEFT * mm, y * mm, item.description)
+            self.pdf.drawString((self.LEFT + 80) * mm, y * mm, str(item.units))
+            self.pdf.drawString((self.LEFT + 110) * mm, y * mm, format_cents(item.price_cents))
+            self.pdf.drawString((self.LEFT + 150) * mm, y * mm, format_cents(item.total_cents))
             
             y -= 15
 
     def _draw_total(self):
         """Draw the total amount."""
         # Use the sum of the pre-calculated totals that include errors
-        total = sum(float(t['transactiontotal']) for t in self.transactions)
+        total = sum(item.total_cents for item in self.transactions)
         y = self.pdf._y - 30
         
         self.pdf.setFont(self.style['font'], self.style['size']['base'])
         self.pdf.drawString((self.LEFT + 110) * mm, y * mm, "Total:")
-        self.pdf.drawString((self.LEFT + 150) * mm, y * mm, f"${total:.2f}")
+        self.pdf.drawString((self.LEFT + 150) * mm, y * mm, format_cents(total))
 
-def draw_header(canvas, person, style):
+def draw_header(canvas, person, style, annotations=None):
     """Draw the invoice header."""
     # Draw company logo
-    logo = generate_random_logo()
-    renderPDF.draw(logo, canvas, 20 * mm, 260 * mm)
+    draw_random_logo(canvas, 20 * mm, 260 * mm)
     
     # Draw INVOICE text
     canvas.setFont(style['font'], style['size']['header'])
     canvas.setFillColor(style['color'])
-    canvas.drawString(20 * mm, 240 * mm, "INVOICE")
+    draw_text(canvas, 20 * mm, 240 * mm, "INVOICE", 'title', annotations)
     
     # Draw invoice date
     canvas.setFont(style['font'], style['size']['base'])
-    canvas.drawString(120 * mm, 240 * mm, f"Date: {datetime.now().strftime('%Y-%m-%d')}")
+    draw_text(canvas, 120 * mm, 240 * mm, f"Date: {datetime.now().strftime('%Y-%m-%d')}", 'invoice_date', annotations)
     
     # Draw customer info
     canvas.setFont(style['font'], style['size']['base'])
-    canvas.drawString(20 * mm, 220 * mm, "Bill To:")
-    canvas.drawString(20 * mm, 205 * mm, f"{person['first_name']} {person['last_name']}")
-    canvas.drawString(20 * mm, 190 * mm, person['street'])
-    canvas.drawString(20 * mm, 175 * mm, f"{person['city']}, {person['state']} {person['zip']}")
+    draw_text(canvas, 20 * mm, 220 * mm, "Bill To:", 'bill_to_label', annotations)
+    draw_text(canvas, 20 * mm, 205 * mm, f"{person['name_first']} {person['name_last']}", 'customer_name', annotations)
+    draw_text(canvas, 20 * mm, 190 * mm, person['address'], 'customer_address', annotations)
+    draw_text(canvas, 20 * mm, 175 * mm, f"{person['city']}, {person['state']} {person['postal_code']}",
+              'customer_city_state_zip', annotations)
 
-def draw_company_info(canvas, style):
+def draw_company_info(canvas, style, annotations=None):
     """Draw the company information."""
     company = get_random_company()
     address = get_random_address()
     
     canvas.setFont(style['font'], style['size']['base'])
     canvas.setFillColor(style['color'])
-    canvas.drawString(120 * mm, 220 * mm, company)
-    canvas.drawString(120 * mm, 205 * mm, address['street'])
-    canvas.drawString(120 * mm, 190 * mm, f"{address['city']}, {address['state']} {address['postal_code']}")
+    draw_text(canvas, 120 * mm, 220 * mm, company, 'company_name', annotations)
+    draw_text(canvas, 120 * mm, 205 * mm, address['street'], 'company_address', annotations)
+    draw_text(canvas, 120 * mm, 190 * mm, f"{address['city']}, {address['state']} {address['postal_code']}",
+              'company_city_state_zip', annotations)
 
-def draw_invoice_details(canvas, customer_id, style):
+def draw_invoice_details(canvas, customer_id, style, annotations=None):
     """Draw invoice details."""
     canvas.setFont(style['font'], style['size']['base'])
     canvas.setFillColor(style['color'])
-    canvas.drawString(20 * mm, 150 * mm, "Invoice Details")
-    canvas.drawString(20 * mm, 135 * mm, f"Invoice #: INV-{customer_id[:8]}")
-    canvas.drawString(120 * mm, 135 * mm, f"Customer ID: {customer_id}")
-
-def draw_transactions(canvas, transactions, should_have_errors, style):
-    """Draw transaction items and calculate totals."""
-    # Draw header
-    y = 110
+    draw_text(canvas, 20 * mm, 150 * mm, "Invoice Details", 'details_label', annotations)
+    draw_text(canvas, 20 * mm, 135 * mm, f"Invoice #: INV-{customer_id[:8]}", 'invoice_number', annotations)
+    draw_text(canvas, 120 * mm, 135 * mm, f"Customer ID: {customer_id}", 'customer_id', annotations)
+
+# Line-item table layout (mm). The first page starts the table below the invoice
+# details; continuation pages start it below a short "continued" banner.
+TABLE_TOP = 110
+CONTINUATION_BANNER_Y = 275
+CONTINUATION_TABLE_TOP = 260
+PAGE_BOTTOM = 15
+ROW_HEIGHT = 10
+TABLE_HEADER_FORM = 'transactions_table_header'
+# (x in mm, label) for the line-item table header
+TABLE_HEADER_LABELS = ((20, "Description"), (80, "Units"), (110, "Price/Unit"), (150, "Total"))
+
+def paginate_transactions(count, first_top=TABLE_TOP, next_top=CONTINUATION_TABLE_TOP,
+                          bottom=PAGE_BOTTOM, row_height=ROW_HEIGHT):
+    """Compute every line-item position in one pass.
+
+    Returns a list of pages; each page is a dict with the table header 'top', the
+    'rows' as (transaction index, y) pairs, and 'line_y'/'total_y' for the page that
+    carries the grand total (None elsewhere). All values are in mm. Raises ValueError
+    if rows are left over for continuation pages that cannot fit a single row.
+    """
+    pages = []
+    index = 0
+    top = first_top
+    while True:
+        first_y = top - 15
+        capacity = max(int((first_y - bottom) // row_height) + 1, 0)
+        take = min(capacity, count - index)
+        if not take and index < count and top == next_top:
+            raise ValueError(f"A continuation page at top={next_top} with bottom={bottom} has no room "
+                             f"for a {row_height} mm row")
+        rows = [(index + k, first_y - k * row_height) for k in range(take)]
+        index += take
+        page = {'top': top, 'rows': rows, 'line_y': None, 'total_y': None}
+        pages.append(page)
+        if index == count:
+            last_y = rows[-1][1] if rows else first_y + row_height
+            line_y = last_y - 2 * row_height
+            total_y = line_y - row_height
+            if total_y >= bottom:
+                page['line_y'], page['total_y'] = line_y, total_y
+            else:
+                # The total block gets its own continuation page
+                pages.append({'top': next_top, 'rows': [], 'line_y': next_top - 15 - row_height,
+                              'total_y': next_top - 15 - 2 * row_height})
+            return pages
+        top = next_top
+
+def define_table_header(canvas, style):
+    """Record the line-item table header once as a form, reused on every page."""
+    canvas.beginForm(TABLE_HEADER_FORM)
     canvas.setFont(style['font'], style['size']['base'])
     canvas.setFillColor(style['color'])
-    canvas.drawString(20 * mm, y * mm, "Description")
-    canvas.drawString(80 * mm, y * mm, "Units")
-    canvas.drawString(110 * mm, y * mm, "Price/Unit")
-    canvas.drawString(150 * mm, y * mm, "Total")
-    
-    # Draw separator line
-    y -= 5
-    canvas.line(20 * mm, y * mm, 190 * mm, y * mm)
+    for x, label in TABLE_HEADER_LABELS:
+        canvas.drawString(x * mm, 0, label)
+    canvas.line(20 * mm, -5 * mm, 190 * mm, -5 * mm)
+    canvas.endForm()
+
+def draw_table_header(canvas, top, style=None, annotations=None):
+    """Place the table header form with its baseline at top (mm)."""
+    canvas.saveState()
+    canvas.translate(0, top * mm)
+    canvas.doForm(TABLE_HEADER_FORM)
+    if annotations is not None:
+        # The form's text is not drawn through draw_text, so record its labels here
+        canvas.setFont(style['font'], style['size']['base'])
+        for x, label in TABLE_HEADER_LABELS:
+            annotations.record(canvas, 'table_header', x * mm, 0, label)
+    canvas.restoreState()
+
+def draw_continuation_banner(canvas, customer_id, page_number, page_count, style, annotations=None):
+    """Draw the short header at the top of a continuation page."""
+    canvas.setFont(style['font'], style['size']['base'])
+    canvas.setFillColor(style['color'])
+    draw_text(canvas, 20 * mm, CONTINUATION_BANNER_Y * mm, f"INVOICE (continued) - Invoice #: INV-{customer_id[:8]}",
+              'continuation_banner', annotations)
+    draw_text(canvas, 150 * mm, CONTINUATION_BANNER_Y * mm, f"Page {page_number} of {page_count}",
+              'page_number', annotations)
+
+def draw_transactions(canvas, transactions, style, page=None, annotations=None):
+    """Draw transaction items and calculate totals.
+
+    transactions is a list of LineItems. With a page from paginate_transactions, only
+    that page's rows (and the grand total, if it falls on that page) are drawn.
+    """
+    if page is None:
+        # One page whose bottom leaves room for every row and the total block
+        count = len(transactions)
+        page = paginate_transactions(count, bottom=TABLE_TOP - 15 - (count + 2) * ROW_HEIGHT)[0]
+    draw_table_header(canvas, page['top'], style, annotations)
     
     # Draw items
-    y -= 10
     canvas.setFont(style['font'], style['size']['base'])
-    grand_total = 0
+    canvas.setFillColor(style['color'])
     has_errors = False
     
-    for trans in transactions:
-        units = int(trans['numberofitems'])
-        price_per_unit = float(trans['price_per_unit'])
-        total = float(trans['transactiontotal'])
-        
-        # Check if this transaction has a math error
-        correct_total = units * price_per_unit
-        if abs(total - correct_total) > 0.01:
-            has_errors = True
-        
-        grand_total += total
-        
-        canvas.drawString(20 * mm, y * mm, trans['productcategory'])
-        canvas.drawString(80 * mm, y * mm, str(units))
-        canvas.drawString(110 * mm, y * mm, f"${price_per_unit:.2f}")
-        canvas.drawString(150 * mm, y * mm, f"${total:.2f}")
+    for index, y in page['rows']:
+        item = transactions[index]
+        has_errors = has_errors or item.has_error
         
-        y -= 10
+        draw_text(canvas, 20 * mm, y * mm, item.description, 'line_description', annotations, item=index)
+        draw_text(canvas, 80 * mm, y * mm, str(item.units), 'line_units', annotations, item=index)
+        draw_text(canvas, 110 * mm, y * mm, format_cents(item.price_cents), 'line_price', annotations, item=index)
+        if item.has_error:
+            # Ground truth for the injected calculation error
+            draw_text(canvas, 150 * mm, y * mm, format_cents(item.total_cents), 'line_total', annotations, item=index,
+                      error=True, correct_text=format_cents(item.correct_total_cents))
+        else:
+            draw_text(canvas, 150 * mm, y * mm, format_cents(item.total_cents), 'line_total', annotations, item=index)
     
     # Draw total
-    y -= 10
-    canvas.line(20 * mm, y * mm, 190 * mm, y * mm)
-    y -= 10
-    canvas.setFont(style['font'], style['size']['header'])
-    canvas.setFillColor(style['color'])
-    canvas.drawString(110 * mm, y * mm, "Total:")
-    canvas.drawString(150 * mm, y * mm, f"${grand_total:.2f}")
+    if page['total_y'] is not None:
+        grand_total = sum(item.total_cents for item in transactions)
+        canvas.line(20 * mm, page['line_y'] * mm, 190 * mm, page['line_y'] * mm)
+        canvas.setFont(style['font'], style['size']['header'])
+        canvas.setFillColor(style['color'])
+        draw_text(canvas, 110 * mm, page['total_y'] * mm, "Total:", 'grand_total_label', annotations)
+        draw_text(canvas, 150 * mm, page['total_y'] * mm, format_cents(grand_total), 'grand_total', annotations)
     
     return has_errors
 
-def generate_invoice(person, transactions, error_rate=0.0, dirty_rate=0.0):
-    """Generate a PDF invoice for the given customer and transactions."""
-    customer_id = person['customer_id']
-    output_dir = os.path.join('pdf_output')
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, f'invoice_{customer_id}.pdf')
-    
-    # Create the PDF document
-    width, height = letter
-    c = canvas.Canvas(output_path, pagesize=letter)
-    
-    # Get random style for this invoice
-    style = get_random_style()
-    c.setFont(style['font'], style['size']['base'])
-    c.setFillColor(style['color'])
-    
-    # Initialize PDF distorter if dirty_rate > 0
-    distorter = None
-    if dirty_rate > 0 and random.random() < dirty_rate/100:
-        distorter = PDFDistorter(100)  # If we're applying distortions, apply them fully
-    
-    # Create a separate layer for distortions
+def start_page(c, width, height, distorter, skew_angle):
+    """Apply the page background distortions and the invoice's skew to a new page."""
     if distorter:
         # Save state before distortions
         c.saveState()
@@ -370,35 +473,135 @@ def generate_invoice(person, transactions, error_rate=0.0, dirty_rate=0.0):
         c.restoreState()
         
         # Apply rotation after background effects
-        skew_angle = distorter.get_page_skew()
         c.translate(width/2, height/2)
         c.rotate(skew_angle)
         c.translate(-width/2, -height/2)
+
+# Bump when the layout code changes so cached invoices are rebuilt
+LAYOUT_VERSION = 6
+
+def invoice_digest(person, items, seed, is_dirty, annotated, engine='canvas'):
+    """Digest over everything that determines an invoice's PDF, for the build cache."""
+    return build_cache.digest(
+        LAYOUT_VERSION,
+        [person[column] for column in CUSTOMER_COLUMNS],
+        [(item.description, item.units, item.price_cents, item.total_cents) for item in items],
+        # TTF files are hashed, so replacing a font file of the same name re-renders
+        [(font, fonts.fingerprint(font)) for font in FONTS], FONT_SIZES, list(TEXT_COLORS), LOGO_TYPES,
+        datetime.now().strftime('%Y-%m-%d'),
+        seed, is_dirty, DISTORTION_BUDGET if is_dirty else None, annotated, engine
+    )
+
+def generate_invoice(person, transactions, error_rate=None, dirty_rate=0.0, *, annotation_writer=None, seed=None,
+                     cache=None, output_dir='pdf_output', writer=None, engine='canvas'):
+    """Generate a PDF invoice for the given customer and transactions.
+
+    The PDF is written to output_dir. transactions may be LineItems or transaction
+    dicts; dicts are parsed once here.
+    With an annotation_writer, the text and boxes of every drawn field are written
+    to it as ground truth. With a seed, the invoice's random choices (style, company,
+    distortions) come from its own stream derived from the seed and customer ID, and
+    with a BuildCache an invoice whose inputs are unchanged is not rendered again.
+    engine picks the renderer (see render_invoice).
+    Returns True if any line item carries a calculation error (errors are injected
+    into the transactions, see transactions.generate_transaction). error_rate is
+    accepted for existing positional callers and ignored.
+    """
+    customer_id = person['customer_id']
+    items = to_line_items(transactions)
+    os.makedirs(output_dir, exist_ok=True)
+    file_name = f'invoice_{customer_id}.pdf'
+    output_path = os.path.join(output_dir, file_name)
+    has_errors = any(item.has_error for item in items)
+    
+    state = None
+    if seed is not None:
+        state = random.getstate()
+        random.seed(f"{seed}:{customer_id}")
+    try:
+        is_dirty = random.random() < dirty_rate/100
+        value = None
+        if cache is not None:
+            value = invoice_digest(person, items, seed, is_dirty, annotation_writer is not None, engine)
+            if cache.is_current(file_name, value, output_path):
+                if annotation_writer is None or annotation_writer.carry_over(file_name):
+                    return has_errors
+        render_invoice(person, items, output_path, is_dirty, annotation_writer, writer, engine)
+        if cache is not None:
+            cache.record(file_name, value)
+    finally:
+        if state is not None:
+            random.setstate(state)
+    return has_errors
+
+def render_invoice(person, items, output_path, is_dirty=False, annotation_writer=None, writer=None, engine='canvas'):
+    """Draw and save one invoice PDF, handing the bytes to an OutputWriter when given.
+
+    The 'direct' engine writes clean, unannotated invoices in the standard fonts
+    straight to PDF operators; everything else is drawn on a ReportLab canvas.
+    """
+    if engine not in direct_pdf.ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; use one of {', '.join(direct_pdf.ENGINES)}")
+    customer_id = person['customer_id']
+    
+    # Get random style for this invoice
+    style = get_random_style()
+    
+    # Create the PDF document
+    width, height = letter
+    if (engine == 'direct' and not is_dirty and annotation_writer is None
+            and direct_pdf.supports_font(style['font'])):
+        c = direct_pdf.DirectCanvas(output_path, pagesize=letter)
+    else:
+        c = canvas.Canvas(output_path, pagesize=letter)
+    fonts.prime_font(c, style['font'])
+    c.setFont(style['font'], style['size']['base'])
+    c.setFillColor(style['color'])
+    
+    # Initialize PDF distorter for dirty invoices
+    distorter = None
+    skew_angle = 0
+    if is_dirty:
+        from pdf_distortions import PDFDistorter
+        distorter = PDFDistorter(100, DISTORTION_BUDGET)  # If we're applying distortions, apply them fully
+        skew_angle = distorter.get_page_skew()
+    
+    annotations = None
+    if annotation_writer is not None:
+        annotations = InvoiceAnnotations(os.path.basename(output_path), customer_id, (width, height))
+        annotations.skew = skew_angle
+    
+    # Lay out every page up front, then record the shared table header once
+    pages = paginate_transactions(len(items))
+    define_table_header(c, style)
+    start_page(c, width, height, distorter, skew_angle)
     
     # Draw invoice content with consistent style
     c.setFont(style['font'], style['size']['header'])  # Larger size for header
     c.setFillColor(style['color'])
-    draw_header(c, person, style)
+    draw_header(c, person, style, annotations)
     
     c.setFont(style['font'], style['size']['base'])  # Base size for rest
     c.setFillColor(style['color'])
-    draw_company_info(c, style)
-    draw_invoice_details(c, customer_id, style)
+    draw_company_info(c, style, annotations)
+    draw_invoice_details(c, customer_id, style, annotations)
     
-    # Check for math errors in any transaction
     has_errors = False
-    for trans in transactions:
-        units = int(trans['numberofitems'])
-        price_per_unit = float(trans['price_per_unit'])
-        total = float(trans['transactiontotal'])
-        correct_total = round(units * price_per_unit, 2)
-        if abs(total - correct_total) > 0.01:
-            has_errors = True
-            break
-    
-    draw_transactions(c, transactions, error_rate > 0, style)
+    for page_number, page in enumerate(pages, start=1):
+        if page_number > 1:
+            c.showPage()
+            if annotations is not None:
+                annotations.next_page()
+            start_page(c, width, height, distorter, skew_angle)
+            draw_continuation_banner(c, customer_id, page_number, len(pages), style, annotations)
+        has_errors = draw_transactions(c, items, style, page, annotations) or has_errors
     
     # Finalize the PDF
     c.showPage()
-    c.save()
-    return has_errors 
\ No newline at end of file
+    if writer is not None:
+        writer.write_file(output_path, c.getpdfdata())
+    else:
+        c.save()
+    if annotations is not None:
+        annotations.has_errors = has_errors
+        annotation_writer.write(annotations)
@@ -0,0 +1,51 @@
+from decimal import Decimal
+
+# Pre-parsed invoice line items.
+#
+# Transactions are turned into LineItems once, when the invoice inputs are built;
+# rendering and error accounting then work on integer cents instead of re-parsing
+# the CSV strings and comparing floats with a tolerance.
+
+CENT = Decimal('0.01')
+
+def to_cents(value):
+    """Convert a price given as str, float, int or Decimal to integer cents."""
+    if isinstance(value, float):
+        value = repr(value)
+    return int((Decimal(value) / CENT).to_integral_value())
+
+def format_cents(cents):
+    """Format integer cents as a dollar amount, e.g. 12543 -> '$125.43'."""
+    sign = '-' if cents < 0 else ''
+    dollars, cents = divmod(abs(cents), 100)
+    return f"{sign}${dollars}.{cents:02d}"
+
+class LineItem:
+    """One invoice line: units, unit price and the (possibly wrong) stated total."""
+
+    __slots__ = ('description', 'units', 'price_cents', 'total_cents')
+
+    def __init__(self, description, units, price_cents, total_cents):
+        self.description = description
+        self.units = units
+        self.price_cents = price_cents
+        self.total_cents = total_cents
+
+    @classmethod
+    def from_transaction(cls, trans):
+        """Build a line item from a transaction dict (CSV strings or generated values)."""
+        return cls(trans['productcategory'], int(trans['numberofitems']),
+                   to_cents(trans['price_per_unit']), to_cents(trans['transactiontotal']))
+
+    @property
+    def correct_total_cents(self):
+        return self.units * self.price_cents
+
+    @property
+    def has_error(self):
+        """True if the stated total does not equal units times unit price."""
+        return self.total_cents != self.units * self.price_cents
+
+def to_line_items(transactions):
+    """Return transactions as LineItems, converting only those that are not already."""
+    return [t if isinstance(t, LineItem) else LineItem.from_transaction(t) for t in transactions]
@@ -0,0 +1,240 @@
+import os
+import queue
+import threading
+
+from pipeline import BudgetQueue, PipelineAborted
+
+# Background output writer.
+#
+# Generation is CPU-bound and runs on the main thread; an OutputWriter owns a few
+# I/O threads that do the disk writes. Whole files (rendered PDFs) are queued as
+# bytes, and streamed outputs (the CSV tables) go through a BufferedFileWriter that
+# fills one large block while the previous one is being written (double buffering).
+# Blocks are written with os.pwrite at their own offsets, so any I/O thread can take
+# any block. Every block but the last has a size and offset that are multiples of
+# ALIGNMENT (the page size), so each pwrite covers whole pages of the page cache.
+# Files are written through the page cache as usual; O_DIRECT is not used.
+#
+# Queued writes are bounded by max_bytes; producers block once that much data is
+# waiting for the disk. If the queue is aborted (a pipeline stage failed), blocks that
+# were not written yet hand their buffers straight back, so writers never wait for
+# jobs that will not run.
+#
+# With sync, written files are fsync'd in batches of sync_batch files on the I/O
+# threads instead of one by one. Files waiting for their batch stay open, so at most
+# sync_batch descriptors wait plus one batch per I/O thread being synced; sync_batch
+# is capped to a small share of the process's descriptor limit. With fadvise, written
+# pages are dropped from the page cache (POSIX_FADV_DONTNEED) where the platform
+# supports it. Only clean pages can be dropped, so a file that was not fsync'd is
+# fdatasync'd first.
+
+ALIGNMENT = 4096
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+DEFAULT_MAX_PENDING = 256 * 1024 * 1024
+DEFAULT_SYNC_BATCH = 16
+# Largest share of the open-file limit that files waiting for fsync may hold
+SYNC_DESCRIPTOR_SHARE = 8
+
+def aligned(size):
+    """Round a size up to a multiple of ALIGNMENT."""
+    return max(ALIGNMENT, -(-size // ALIGNMENT) * ALIGNMENT)
+
+def _drop_cache(fd, synced=False):
+    if hasattr(os, 'posix_fadvise'):
+        # DONTNEED skips dirty pages, so write them out first
+        if not synced:
+            os.fdatasync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+def _sync_batch_limit(sync_batch):
+    """Cap a sync batch to a share of the process's open-file limit."""
+    try:
+        import resource
+    except ImportError:
+        return sync_batch
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft == resource.RLIM_INFINITY:
+        return sync_batch
+    return max(1, min(sync_batch, soft // SYNC_DESCRIPTOR_SHARE))
+
+class OutputWriter:
+    """Pool of I/O threads for whole-file and block writes."""
+
+    def __init__(self, threads=2, max_bytes=DEFAULT_MAX_PENDING, sync=False, sync_batch=DEFAULT_SYNC_BATCH,
+                 fadvise=False):
+        if threads <= 0:
+            raise ValueError("OutputWriter needs at least one I/O thread")
+        if sync_batch <= 0:
+            raise ValueError("sync_batch must be at least 1")
+        self.sync = sync
+        self.sync_batch = _sync_batch_limit(sync_batch)
+        self.fadvise = fadvise
+        self.error = None
+        self.files_written = 0
+        self.bytes_written = 0
+        self.lock = threading.Lock()
+        # Open descriptors of files written since the last batched fsync
+        self.unsynced = []
+        self.closed = False
+        self.queue = BudgetQueue('write', max_bytes)
+        self.threads = [threading.Thread(target=self._run, name=f"output-writer-{n}", daemon=True)
+                        for n in range(threads)]
+        for thread in self.threads:
+            thread.start()
+
+    def _run(self):
+        for job in self.queue:
+            try:
+                job()
+            except Exception as exc:
+                self.error = self.error or exc
+
+    def _submit(self, job, size, on_drop=None):
+        if self.error is not None:
+            raise self.error
+        self.queue.put(job, size, on_drop)
+
+    def _finish_file(self, fd, size):
+        """Account for a completed file and close it, or hold it for the next batched fsync."""
+        batch = None
+        with self.lock:
+            self.files_written += 1
+            self.bytes_written += size
+            if self.sync:
+                self.unsynced.append(fd)
+                if len(self.unsynced) >= self.sync_batch:
+                    batch, self.unsynced = self.unsynced, []
+        if not self.sync:
+            if self.fadvise:
+                _drop_cache(fd)
+            os.close(fd)
+        elif batch:
+            self._sync(batch)
+
+    def _sync(self, fds):
+        for fd in fds:
+            os.fsync(fd)
+            if self.fadvise:
+                _drop_cache(fd, synced=True)
+            os.close(fd)
+
+    def write_file(self, path, data):
+        """Queue a whole file's bytes to be written in the background."""
+        def job():
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+            except Exception:
+                os.close(fd)
+                raise
+            self._finish_file(fd, len(data))
+        self._submit(job, len(data))
+
+    def open(self, path, block_size=DEFAULT_BLOCK_SIZE):
+        """Open a text sink whose blocks are written by the I/O threads."""
+        return BufferedFileWriter(self, path, block_size)
+
+    def close(self):
+        """Wait for all queued writes, fsync the last batch and re-raise any write error."""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.close()
+        for thread in self.threads:
+            thread.join()
+        with self.lock:
+            batch, self.unsynced = self.unsynced, []
+        self._sync(batch)
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class BufferedFileWriter:
+    """File-like text sink with two aligned buffers: one filling, one being written."""
+
+    def __init__(self, writer, path, block_size=DEFAULT_BLOCK_SIZE):
+        self.writer = writer
+        self.path = path
+        self.block_size = aligned(block_size)
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        self.offset = 0
+        self.free = queue.Queue()
+        self.free.put(bytearray())
+        self.buffer = bytearray()
+        self.closed = False
+
+    def _pwrite(self, block, offset):
+        view = memoryview(block)
+        while view:
+            written = os.pwrite(self.fd, view, offset)
+            view = view[written:]
+            offset += written
+
+    def _write_block(self, block, offset):
+        def job():
+            try:
+                # Views on the buffer are released when _pwrite returns, before it is reused
+                self._pwrite(block, offset)
+            finally:
+                # Hand the buffer back even on failure so close() cannot hang
+                self.free.put(block)
+        try:
+            # A job dropped by an abort never runs, so it returns the buffer here instead
+            self.writer._submit(job, len(block), lambda: self.free.put(block))
+        except Exception:
+            self.free.put(block)
+            raise
+
+    def write(self, text):
+        """Buffer text, handing each full block to the I/O threads."""
+        self.buffer += text.encode('utf-8')
+        while len(self.buffer) >= self.block_size:
+            full = self.buffer
+            # Waits here when the other buffer is still being written
+            self.buffer = self.free.get()
+            self.buffer.clear()
+            self.buffer += memoryview(full)[self.block_size:]
+            del full[self.block_size:]
+            self._write_block(full, self.offset)
+            self.offset += self.block_size
+        return len(text)
+
+    def close(self):
+        """Write the final partial block and wait until both buffers are back.
+
+        After the writer's queue was aborted the file is closed unfinished, without raising.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        size = self.offset + len(self.buffer)
+        aborted = False
+        try:
+            if self.buffer:
+                self._write_block(self.buffer, self.offset)
+            else:
+                self.free.put(self.buffer)
+        except PipelineAborted:
+            aborted = True
+        # Both buffers come back: written, failed, or dropped by an abort
+        self.free.get()
+        self.free.get()
+        if aborted or self.writer.queue.aborted:
+            os.close(self.fd)
+            return
+        self.writer._finish_file(self.fd, size)
+        if self.writer.error is not None:
+            raise self.writer.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,259 @@
+import os
+import errno
+import random
+import shutil
+import tempfile
+import multiprocessing
+
+import ids
+import people
+import transactions
+import compressed_sink
+
+# Multi-process generation of the people, transactions and social tables.
+#
+# Customers are split into fixed-size chunks of customer indexes. Worker processes
+# generate a chunk's people, their transactions and the chunk's share of the social
+# interactions, and write each table's rows to a part file (compressed as a complete
+# gzip member / zstd frame / lz4 frame when a codec is set, so parts concatenate into
+# a valid stream). The parent takes the chunks in index order and appends each part
+# to the final file inside the kernel (copy_file_range, or sendfile), so table data
+# never passes through the parent process.
+#
+# Every chunk seeds the random module from the run's seed and its chunk number, and
+# customer IDs come from the customer index (ids.customer_id_for), so output depends
+# on the seed but not on the number of workers, and social partners can be any
+# customer. In unique-ID mode each chunk's interaction and order counters start at
+# an offset derived from its first customer index, so the counter ranges are disjoint.
+# With a defect rate, each chunk's people rows are dirtied after its other tables are
+# generated, and its defect log is one more part. With a Postgres DSN there are no
+# part files: each worker copies its chunks into the tables over its own pooled
+# connection (pg_sink.get_connection keeps one per process).
+
+# Customers per chunk; fixed so seeded output is the same for any number of workers
+PARALLEL_CHUNK = 2000
+# Social interactions generated per customer, as in the sequential run
+INTERACTIONS_PER_CUSTOMER = 2
+# Tables generated for every chunk, one part file each
+TABLES = ('people', 'transactions', 'social')
+# Postgres table for each generated table
+PG_TABLES = {'people': 'people', 'transactions': 'transactions', 'social': 'social_interactions'}
+
+def chunk_ranges(num_customers, chunk_size=PARALLEL_CHUNK):
+    """Split customer indexes into (chunk number, start, stop) ranges."""
+    return [(number, start, min(start + chunk_size, num_customers))
+            for number, start in enumerate(range(0, num_customers, chunk_size))]
+
+def append_file(fd, path):
+    """Append a whole file to an open descriptor without copying it through user space.
+
+    Uses os.copy_file_range where the platform and file systems support it, then
+    os.sendfile, then a plain read/write loop. Returns the number of bytes appended.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as src:
+        offset = 0
+        for method in ('copy_file_range', 'sendfile'):
+            if not hasattr(os, method):
+                continue
+            try:
+                while offset < size:
+                    if method == 'copy_file_range':
+                        sent = os.copy_file_range(src.fileno(), fd, size - offset, offset)
+                    else:
+                        sent = os.sendfile(fd, src.fileno(), offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                return offset
+            except OSError as exc:
+                # Not supported for these files (e.g. across file systems): try the next method
+                if exc.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF,
+                                     errno.ENOTSOCK):
+                    raise
+        src.seek(offset)
+        while True:
+            data = src.read(1024 * 1024)
+            if not data:
+                return offset
+            os.write(fd, data)
+            offset += len(data)
+
+# Run settings, set in each worker process by _init_worker
+_settings = None
+
+def _init_worker(settings):
+    global _settings
+    _settings = settings
+
+def configure_chunk(settings, number, start):
+    """Put the random module and ID generators in the state for one chunk."""
+    ids.use_random_ids()
+    random.seed(f"{settings['seed']}:{number}")
+    ids.use_seeded_source(settings['seed'])
+    if settings['unique_key'] is not None:
+        ids.use_unique_ids(settings['unique_key'])
+        ids.interaction_ids.counter = start * INTERACTIONS_PER_CUSTOMER
+        ids.order_ids.counter = start * settings['transactions_per_customer']
+    ids.seek_customer(start)
+
+def write_part(path, rows, settings):
+    """Write rows as a CSV part file, returning its path and uncompressed size."""
+    data = people.rows_to_csv(rows).encode('utf-8')
+    codec = settings['codec']
+    if not codec or codec == 'none':
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path, len(data)
+    with compressed_sink.open_output(path, codec, settings['splittable']) as f:
+        f.write(data.decode('utf-8'))
+    return compressed_sink.compressed_path(path, codec), len(data)
+
+def copy_rows(table, rows, settings):
+    """Copy rows into their Postgres table over this worker's pooled connection; returns the row count."""
+    import pg_sink
+    with pg_sink.PostgresCopySink(PG_TABLES[table], settings['headers'][table], dsn=settings['pg_dsn'],
+                                  batch_size=settings['pg_batch_size'], copy_format=settings['pg_format']) as sink:
+        sink.write_rows(rows)
+    return sink.rows_committed
+
+def generate_chunk(chunk):
+    """Worker: generate one chunk and write its part files; returns the chunk number and parts.
+
+    With a Postgres DSN the rows are copied instead, and parts maps tables to row counts.
+    """
+    settings = _settings
+    number, start, stop = chunk
+    configure_chunk(settings, number, start)
+    people_rows = people.generate_people_rows(stop - start, settings['people_columns'])
+    if settings['generate_transactions']:
+        transaction_rows = people.generate_transaction_rows(people_rows.column('customer_id'),
+                                                            settings['transactions_per_customer'],
+                                                            settings['error_rate'])
+    else:
+        transaction_rows = transactions.new_transaction_table()
+    social_rows = people.generate_social_rows(settings['num_customers'], INTERACTIONS_PER_CUSTOMER * (stop - start))
+    tables = {'people': people_rows, 'transactions': transaction_rows, 'social': social_rows}
+    if settings['defect_rate']:
+        import defects
+        injector = defects.DefectInjector(settings['defect_rate'], settings['defects'], settings['num_customers'])
+        tables['defects'] = injector.inject(people_rows, start)
+    parts = {}
+    for table, rows in tables.items():
+        if settings['pg_dsn']:
+            parts[table] = copy_rows(table, rows, settings)
+            continue
+        path = os.path.join(settings['parts_dir'], f'{table}.{number:06d}')
+        parts[table] = write_part(path, rows, settings) + (len(rows),)
+    return number, parts
+
+class MergedOutput:
+    """Final output file that part files are appended to, with its merged .idx in splittable mode."""
+
+    def __init__(self, path, codec=None, splittable=False, header=None, enabled=True):
+        self.codec = codec if codec != 'none' else None
+        self.path = compressed_sink.compressed_path(path, self.codec)
+        self.splittable = bool(self.codec) and splittable
+        self.enabled = enabled
+        self.fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        self.compressed_offset = 0
+        self.uncompressed_offset = 0
+        self.index = []
+        self.rows = 0
+        if header and enabled:
+            text = people.rows_to_csv([], header).encode('utf-8')
+            # The header is its own member/frame, like every part
+            data = compressed_sink.make_block_compressor(self.codec)(text) if self.codec else text
+            os.write(self.fd, data)
+            self.index.append((0, 0))
+            self.compressed_offset += len(data)
+            self.uncompressed_offset += len(text)
+
+    def append(self, path, uncompressed_size, rows):
+        """Append a part file (and its .idx entries), then delete it."""
+        if self.splittable:
+            with open(path + '.idx') as f:
+                next(f)
+                entries = [tuple(int(value) for value in line.split(',')) for line in f]
+            os.remove(path + '.idx')
+            if self.enabled:
+                self.index.extend((self.compressed_offset + compressed, self.uncompressed_offset + uncompressed)
+                                  for compressed, uncompressed in entries)
+        if self.enabled:
+            self.compressed_offset += append_file(self.fd, path)
+            self.uncompressed_offset += uncompressed_size
+            self.rows += rows
+        os.remove(path)
+
+    def close(self, sync=False):
+        if sync:
+            os.fsync(self.fd)
+        os.close(self.fd)
+        if self.splittable:
+            with open(self.path + '.idx', 'w') as f:
+                f.write("compressed_offset,uncompressed_offset\n")
+                f.writelines(f"{c},{u}\n" for c, u in self.index)
+
+def generate_tables(args, people_columns, output_dir):
+    """Generate the CSV tables with args.workers processes, merging chunks in index order."""
+    # Unseeded runs still need one base seed and unique-ID key shared by every worker
+    seed = args.seed if args.seed is not None else os.urandom(8).hex()
+    unique_key = None
+    if args.unique_ids:
+        unique_key = args.id_key if args.id_key is not None else os.urandom(16)
+    headers = {
+        'people': people_columns,
+        'transactions': transactions.TRANSACTION_COLUMNS,
+        'social': people.SOCIAL_COLUMNS
+    }
+    filenames = {'people': 'output_people.csv', 'transactions': 'output_transactions.csv', 'social': 'output_social.csv'}
+    tables = TABLES
+    if args.defect_rate:
+        import defects
+        tables += ('defects',)
+        headers['defects'] = defects.DEFECT_COLUMNS
+        filenames['defects'] = 'output_defects.csv'
+    parts_dir = None if args.pg_dsn else tempfile.mkdtemp(prefix='.parts-', dir=output_dir)
+    settings = {
+        'seed': seed,
+        'unique_key': unique_key,
+        'num_customers': args.num_customers,
+        'transactions_per_customer': args.transactions_per_customer,
+        'error_rate': args.error_rate,
+        'generate_transactions': args.generate_transactions,
+        'people_columns': people_columns,
+        'defect_rate': args.defect_rate,
+        'defects': args.defects,
+        'codec': args.compress,
+        'splittable': args.compress_splittable,
+        'parts_dir': parts_dir,
+        'headers': headers,
+        'pg_dsn': args.pg_dsn,
+        'pg_batch_size': args.pg_batch_size,
+        'pg_format': args.pg_format
+    }
+    if args.pg_dsn:
+        counts = dict.fromkeys(tables, 0)
+        with multiprocessing.Pool(args.workers, initializer=_init_worker, initargs=(settings,)) as pool:
+            # Rows go straight into the tables, so chunks are taken in the order they finish
+            for number, parts in pool.imap_unordered(generate_chunk, chunk_ranges(args.num_customers)):
+                for table, rows in parts.items():
+                    counts[table] += rows
+        return counts
+    outputs = {}
+    try:
+        for table in tables:
+            enabled = table != 'transactions' or args.generate_transactions
+            outputs[table] = MergedOutput(os.path.join(output_dir, filenames[table]), args.compress,
+                                          args.compress_splittable,
+                                          headers[table] if args.include_headers else None, enabled)
+        with multiprocessing.Pool(args.workers, initializer=_init_worker, initargs=(settings,)) as pool:
+            # imap hands back chunks in index order while later chunks are still being generated
+            for number, parts in pool.imap(generate_chunk, chunk_ranges(args.num_customers)):
+                for table in tables:
+                    outputs[table].append(*parts[table])
+    finally:
+        for output in outputs.values():
+            output.close(args.fsync)
+        shutil.rmtree(parts_dir, ignore_errors=True)
+    return {table: output.rows for table, output in outputs.items()}
@@ -1,16 +1,176 @@
 import random
-from PIL import Image, ImageDraw, ImageEnhance, ImageFilter
-import io
-import math
-from reportlab.graphics.shapes import Drawing
-from reportlab.graphics import renderPDF
+import zlib
 from reportlab.lib import colors
 import numpy as np
 
+# Pre-built effect primitives.
+#
+# Stains, splatters, ink bleeds, printer lines, crease shadows and paper textures are
+# generated once per process with NumPy and kept as ready-made PDF path operators.
+# Each document defines a primitive as a Form XObject the first time it is used and
+# then draws it with a random translate/rotate/scale, so a dirty page costs a handful
+# of operators instead of thousands of freshly computed path points. The forms hold
+# geometry (and paper colours) only; fill/stroke colour and alpha are set around each
+# use, so one form serves every layer of a stain.
+#
+# To keep dirty invoices close to the size of clean ones, alphas are snapped to a
+# small palette (ALPHA_LEVELS), so a page holds at most a few ExtGState resources, and
+# each PDFDistorter has a byte budget. Every form carries its estimated compressed
+# size; effects whose forms no longer fit are left out, and the paper texture - by far
+# the largest form - is built in several densities and the densest one that fits in
+# half of the budget is used.
+
+# Number of pre-built variants of each primitive
+EFFECT_VARIANTS = 8
+# Fixed seed so the library, and therefore seeded runs, are reproducible
+EFFECT_LIBRARY_SEED = 1729
+# Bounding box of the unit-sized primitives (stains reach 1.3, splatters 1.65)
+UNIT_BBOX = (-2, -2, 2, 2)
+# Bezier control distance for a quarter circle
+KAPPA = 0.5523
+# Fill and stroke alphas effects may use; each distinct value is one ExtGState
+ALPHA_LEVELS = (0.01, 0.02, 0.03, 0.04, 0.06, 0.08, 0.1, 0.12)
+# Fractions of the texture spots kept by each texture density, densest first
+TEXTURE_DENSITIES = (100, 50, 25, 10)
+# Paper texture spot diameters, in points
+TEXTURE_DOT_SIZES = (0.5, 1.0, 1.5)
+# Default distortion budget per PDF, in bytes
+DEFAULT_BUDGET = 8 * 1024
+# Estimated bytes for a form's object, dictionary and xref entry, and for one use of it
+# (with its transform, colour and graphics state)
+FORM_OVERHEAD = 260
+FORM_USE_COST = 70
+
+def quantize_alpha(alpha):
+    """Snap an alpha to the nearest value in ALPHA_LEVELS."""
+    return min(ALPHA_LEVELS, key=lambda level: abs(level - alpha))
+
+def _format_rows(template, rows, decimals=3):
+    """Format each row of a 2-D array through an operator template."""
+    return '\n'.join(template % tuple(row) for row in np.round(rows, decimals).tolist())
+
+def blob_ops(points):
+    """Closed irregular shape through points, with the midpoint curves used for stains."""
+    controls = (points[:-1] + points[1:]) / 2
+    curves = np.column_stack([controls, controls, points[1:]])
+    return '%.3f %.3f m\n' % tuple(points[0]) + _format_rows('%s %s %s %s %s %s c', curves) + '\nh f'
+
+def circles_ops(centers, radii):
+    """One filled path made of circles, built as four Bezier arcs each."""
+    x, y = centers[:, 0], centers[:, 1]
+    r, k = radii, radii * KAPPA
+    rows = np.column_stack([
+        x + r, y,
+        x + r, y + k, x + k, y + r, x, y + r,
+        x - k, y + r, x - r, y + k, x - r, y,
+        x - r, y - k, x - k, y - r, x, y - r,
+        x + k, y - r, x + r, y - k, x + r, y
+    ])
+    return _format_rows('%s %s m %s %s %s %s %s %s c %s %s %s %s %s %s c %s %s %s %s %s %s c %s %s %s %s %s %s c h',
+                        rows) + '\nf'
+
+def dots_ops(centers, sizes):
+    """Round dots drawn as zero-length strokes with round caps, one stroke per dot size."""
+    parts = ['1 J']
+    for size in np.unique(sizes):
+        selected = centers[sizes == size]
+        parts.append('%s w' % size)
+        parts.append(_format_rows('%s %s m %s %s l', np.column_stack([selected, selected]), 0) + '\nS')
+    return '\n'.join(parts)
+
+def random_blob(rng, min_points, max_points):
+    """Unit-radius irregular outline with radii jittered between 0.7 and 1.3."""
+    count = int(rng.integers(min_points, max_points + 1))
+    angles = np.arange(count) / count * 2 * np.pi
+    radii = rng.uniform(0.7, 1.3, count)
+    return np.column_stack([radii * np.cos(angles), radii * np.sin(angles)])
+
+class EffectLibrary:
+    """Pre-generated effect primitives, as PDF operators keyed by form name."""
+
+    def __init__(self, variants=EFFECT_VARIANTS, seed=EFFECT_LIBRARY_SEED):
+        self.variants = variants
+        self.rng = np.random.default_rng(seed)
+        rng = self.rng
+        self.forms = {}
+        # Estimated bytes each form adds to a PDF that defines it
+        self.costs = {}
+        for i in range(variants):
+            self.add(f'fx_stain_{i}', blob_ops(random_blob(rng, 12, 16)), UNIT_BBOX)
+            self.add(f'fx_bleed_{i}', blob_ops(random_blob(rng, 8, 12)), UNIT_BBOX)
+            # Splatters around a unit stain: 2-5pt drops 0.8-1.5 stain sizes out for a ~40pt stain
+            count = int(rng.integers(5, 9))
+            angles = rng.uniform(0, 2 * np.pi, count)
+            distances = rng.uniform(0.8, 1.5, count)
+            centers = np.column_stack([distances * np.cos(angles), distances * np.sin(angles)])
+            self.add(f'fx_splatter_{i}', circles_ops(centers, rng.uniform(2, 5, count) / 40), UNIT_BBOX)
+        self.page_sizes = set()
+
+    def add(self, name, ops, bbox):
+        """Store a form's operators and bounding box along with its size in a PDF."""
+        self.forms[name] = (ops, bbox)
+        # ReportLab writes streams compressed and then ASCII85-encoded (5 bytes per 4)
+        self.costs[name] = len(zlib.compress(ops.encode('latin-1'))) * 5 // 4 + FORM_OVERHEAD
+
+    def add_page_size(self, width, height, paper_colors):
+        """Build the page-sized primitives (textures, printer lines, creases) for one page size."""
+        if (width, height) in self.page_sizes:
+            return
+        rng = self.rng
+        bbox = (0, 0, width, height)
+        for i in range(self.variants):
+            # Paper texture: 1000-2000 faint spots, grouped by colour; the thinner
+            # densities keep a leading share of the same (randomly ordered) spots
+            count = int(rng.integers(1000, 2001))
+            centers = np.column_stack([rng.integers(0, width + 1, count), rng.integers(0, height + 1, count)])
+            sizes = rng.choice(TEXTURE_DOT_SIZES, count)
+            groups = rng.integers(0, len(paper_colors), count)
+            for density in TEXTURE_DENSITIES:
+                kept = count * density // 100
+                parts = []
+                for group, color in enumerate(paper_colors):
+                    selected = groups[:kept] == group
+                    parts.append('%.4f %.4f %.4f RG' % (color[0]/255, color[1]/255, color[2]/255))
+                    parts.append(dots_ops(centers[:kept][selected], sizes[:kept][selected]))
+                self.add(f'fx_texture{density}_{width}x{height}_{i}', '\n'.join(parts), bbox)
+            
+            # Printer line: a slightly wavy vertical line at x=0, drawn as 10-15 segments
+            segments = int(rng.integers(10, 16))
+            y = np.linspace(0, height, segments + 1)
+            offsets = rng.uniform(-0.5, 0.5, segments)
+            lines = np.column_stack([offsets, y[:-1], -offsets, y[1:]])
+            self.add(f'fx_printer_{width}x{height}_{i}', _format_rows('%s %s m %s %s l', lines) + '\nS',
+                     (-2, 0, 2, height))
+            
+            # Crease shadow: 3-5 lines within 2pt of a horizontal fold at y=0
+            offsets = rng.uniform(-2, 2, int(rng.integers(3, 6)))
+            lines = np.column_stack([np.zeros_like(offsets), offsets, np.full_like(offsets, width), offsets])
+            self.add(f'fx_crease_{width}x{height}_{i}', _format_rows('%s %s m %s %s l', lines) + '\nS',
+                     (0, -3, width, 3))
+        self.page_sizes.add((width, height))
+
+_library = None
+
+def get_effect_library():
+    """Return the process-wide effect library, building it on first use."""
+    global _library
+    if _library is None:
+        _library = EffectLibrary()
+    return _library
+
 class PDFDistorter:
-    def __init__(self, dirty_rate):
-        """Initialize the PDF distorter with a given dirty rate (0-100)."""
+    def __init__(self, dirty_rate, budget=None):
+        """Initialize the PDF distorter with a given dirty rate (0-100) and byte budget per PDF."""
         self.dirty_rate = dirty_rate / 100.0  # Convert to decimal
+        self.library = get_effect_library()
+        self.budget = DEFAULT_BUDGET if budget is None else budget
+        # Estimated bytes added to the current document so far, and effects left out
+        self.spent = 0
+        self.skipped = 0
+        # Effect forms already defined in the current document
+        self.defined_forms = set()
+        # Texture form used on every page of the current document
+        self.texture = None
         
         # Define color palettes for various effects
         self.coffee_colors = [
@@ -42,164 +202,188 @@ class PDFDistorter:
         direction = random.choice([-1, 1])
         return direction * random.uniform(0.1, 0.8)  # Reduced max angle for subtlety
 
+    def form_cost(self, name):
+        """Estimated bytes one more use of a form adds, including its definition on first use."""
+        if name in self.defined_forms:
+            return FORM_USE_COST
+        return FORM_USE_COST + self.library.costs[name]
+
+    @staticmethod
+    def append_operators(canvas, ops):
+        """Append raw content-stream operators to the canvas's current page or form.
+
+        ReportLab has no public call for this; its canvas keeps operators in the
+        private _code list (as of reportlab 4.0.4, pinned in requirements.txt).
+        DirectCanvas keeps them in code.
+        """
+        code = getattr(canvas, '_code', None)
+        if code is None:
+            code = getattr(canvas, 'code', None)
+        if not isinstance(code, list):
+            raise TypeError(f"Cannot append PDF operators to a {type(canvas).__name__}")
+        code.append(ops)
+
+    def fits(self, name):
+        return self.spent + self.form_cost(name) <= self.budget
+
+    def draw_form(self, canvas, name):
+        """Draw a library primitive if it fits the budget, defining its form in this document on first use."""
+        if not self.fits(name):
+            self.skipped += 1
+            return False
+        self.spent += self.form_cost(name)
+        if name not in self.defined_forms:
+            ops, bbox = self.library.forms[name]
+            canvas.beginForm(name, *bbox)
+            self.append_operators(canvas, ops)
+            canvas.endForm()
+            self.defined_forms.add(name)
+        canvas.doForm(name)
+        return True
+
+    def pick(self, kind, width=None, height=None):
+        """Name of a random variant of a primitive."""
+        size = f'{width}x{height}_' if width is not None else ''
+        return f'fx_{kind}_{size}{random.randrange(self.library.variants)}'
+
+    def pick_texture(self, width, height):
+        """The document's texture: the densest one that fits in half of the remaining budget."""
+        if self.texture is None:
+            variant = random.randrange(self.library.variants)
+            for density in TEXTURE_DENSITIES:
+                name = f'fx_texture{density}_{width}x{height}_{variant}'
+                if self.form_cost(name) <= (self.budget - self.spent) / 2:
+                    self.texture = name
+                    break
+        return self.texture
+
     def apply_paper_texture(self, canvas, width, height):
         """Apply subtle paper texture effect."""
         width = int(width)
         height = int(height)
-        num_spots = random.randint(1000, 2000)
-        canvas.setFillAlpha(0.02)  # Very subtle
-        
-        for _ in range(num_spots):
-            x = random.randint(0, width)
-            y = random.randint(0, height)
-            size = random.uniform(0.2, 0.8)
-            color = random.choice(self.paper_colors)
-            canvas.setFillColor(colors.Color(color[0]/255, color[1]/255, color[2]/255))
-            canvas.circle(x, y, size, fill=1)
+        self.library.add_page_size(width, height, self.paper_colors)
+        texture = self.pick_texture(width, height)
+        if texture is None:
+            self.skipped += 1
+            return
+        canvas.saveState()
+        canvas.setStrokeAlpha(0.02)  # Very subtle
+        # Mirror the texture at random so each variant gives four different pages
+        flip_x = random.random() < 0.5
+        flip_y = random.random() < 0.5
+        canvas.translate(width if flip_x else 0, height if flip_y else 0)
+        canvas.scale(-1 if flip_x else 1, -1 if flip_y else 1)
+        self.draw_form(canvas, texture)
+        canvas.restoreState()
 
     def apply_fold_crease(self, canvas, width, height):
         """Apply paper fold or crease effect."""
+        width = int(width)
+        height = int(height)
+        self.library.add_page_size(width, height, self.paper_colors)
         # Horizontal or vertical fold
         is_horizontal = random.random() < 0.5
+        shadow = self.pick('crease', width, height)
+        if not self.fits(shadow):
+            self.skipped += 1
+            return
         
+        canvas.saveState()
+        canvas.setStrokeColor(colors.Color(0.8, 0.8, 0.8))
+        canvas.setLineWidth(0.5)
         if is_horizontal:
-            y = height * random.uniform(0.3, 0.7)
-            # Main crease line
-            canvas.setStrokeColor(colors.Color(0.8, 0.8, 0.8))
-            canvas.setStrokeAlpha(0.1)
-            canvas.setLineWidth(0.5)
-            canvas.line(0, y, width, y)
-            
-            # Shadow effect
-            num_shadow_lines = random.randint(3, 5)
-            for i in range(num_shadow_lines):
-                offset = random.uniform(-2, 2)
-                canvas.setStrokeAlpha(0.05 - (abs(offset) * 0.01))
-                canvas.line(0, y + offset, width, y + offset)
+            canvas.translate(0, height * random.uniform(0.3, 0.7))
         else:
-            x = width * random.uniform(0.3, 0.7)
-            canvas.setStrokeColor(colors.Color(0.8, 0.8, 0.8))
-            canvas.setStrokeAlpha(0.1)
-            canvas.setLineWidth(0.5)
-            canvas.line(x, 0, x, height)
-            
-            num_shadow_lines = random.randint(3, 5)
-            for i in range(num_shadow_lines):
-                offset = random.uniform(-2, 2)
-                canvas.setStrokeAlpha(0.05 - (abs(offset) * 0.01))
-                canvas.line(x + offset, 0, x + offset, height)
+            # Turn the horizontal crease into a vertical one of the same length
+            canvas.translate(width * random.uniform(0.3, 0.7), 0)
+            canvas.rotate(90)
+            canvas.scale(height / width, 1)
+        # Main crease line
+        canvas.setStrokeAlpha(0.1)
+        canvas.line(0, 0, width, 0)
+        # Shadow effect
+        canvas.setStrokeAlpha(quantize_alpha(random.uniform(0.03, 0.05)))
+        self.draw_form(canvas, shadow)
+        canvas.restoreState()
 
     def apply_ink_bleeding(self, canvas, x, y, size):
         """Apply realistic ink bleeding effect."""
-        num_points = random.randint(8, 12)
-        bleed_points = []
-        
-        # Create irregular shape for bleeding
-        for i in range(num_points):
-            angle = (i / num_points) * 2 * math.pi
-            r = random.uniform(0.7, 1.3) * size
-            px = x + r * math.cos(angle)
-            py = y + r * math.sin(angle)
-            bleed_points.append((px, py))
+        name = self.pick('bleed')
+        if not self.fits(name):
+            self.skipped += 1
+            return
+        canvas.saveState()
+        canvas.translate(x, y)
+        canvas.rotate(random.uniform(0, 360))
+        canvas.scale(size, size)
         
         # Draw multiple layers with varying opacity
         for _ in range(3):
-            canvas.setFillColor(random.choice(self.ink_colors))
-            canvas.setFillAlpha(random.uniform(0.01, 0.03))
-            
-            path = canvas.beginPath()
-            path.moveTo(bleed_points[0][0], bleed_points[0][1])
-            
-            # Use quadratic curves for more natural bleeding
-            for i in range(1, len(bleed_points)):
-                cp_x = (bleed_points[i-1][0] + bleed_points[i][0]) / 2
-                cp_y = (bleed_points[i-1][1] + bleed_points[i][1]) / 2
-                path.curveTo(cp_x, cp_y, cp_x, cp_y, bleed_points[i][0], bleed_points[i][1])
-            
-            path.close()
-            canvas.drawPath(path, fill=1)
+            color = random.choice(self.ink_colors)
+            canvas.setFillColor(colors.Color(color[0]/255, color[1]/255, color[2]/255))
+            canvas.setFillAlpha(quantize_alpha(random.uniform(0.01, 0.03)))
+            self.draw_form(canvas, name)
+        canvas.restoreState()
 
     def apply_coffee_stain(self, canvas, width, height):
         """Apply realistic coffee/tea stain effect."""
         width = int(width)
         height = int(height)
-        # Create main stain
+        # Place, turn and size the main stain
         x = random.randint(width//4, 3*width//4)
         y = random.randint(height//4, 3*height//4)
         size = random.randint(30, 50)
+        stain = self.pick('stain')
+        if not self.fits(stain):
+            self.skipped += 1
+            return
         
-        # Create irregular shape for main stain
-        num_points = random.randint(12, 16)
-        points = []
-        
-        for i in range(num_points):
-            angle = (i / num_points) * 2 * math.pi
-            r = random.uniform(0.7, 1.3) * size
-            px = x + r * math.cos(angle)
-            py = y + r * math.sin(angle)
-            points.append((px, py))
+        canvas.saveState()
+        canvas.translate(x, y)
+        canvas.rotate(random.uniform(0, 360))
+        canvas.scale(size, size * random.uniform(0.85, 1.15))
         
         # Draw multiple layers with varying colors and opacity
         for color in self.coffee_colors:
             canvas.setFillColor(colors.Color(color[0]/255, color[1]/255, color[2]/255))
-            canvas.setFillAlpha(color[3]/255)
-            
-            path = canvas.beginPath()
-            path.moveTo(points[0][0], points[0][1])
-            
-            # Use quadratic curves for more natural stain edges
-            for i in range(1, len(points)):
-                cp_x = (points[i-1][0] + points[i][0]) / 2
-                cp_y = (points[i-1][1] + points[i][1]) / 2
-                path.curveTo(cp_x, cp_y, cp_x, cp_y, points[i][0], points[i][1])
-            
-            path.close()
-            canvas.drawPath(path, fill=1)
+            canvas.setFillAlpha(quantize_alpha(color[3]/255))
+            self.draw_form(canvas, stain)
         
         # Add splatter effects
-        num_splatters = random.randint(5, 8)
-        for _ in range(num_splatters):
-            angle = random.uniform(0, 2 * math.pi)
-            distance = random.uniform(size * 0.8, size * 1.5)
-            splat_x = x + distance * math.cos(angle)
-            splat_y = y + distance * math.sin(angle)
-            splat_size = random.uniform(2, 5)
-            
-            color = random.choice(self.coffee_colors)
-            canvas.setFillColor(colors.Color(color[0]/255, color[1]/255, color[2]/255))
-            canvas.setFillAlpha(color[3]/255 * 0.7)  # Slightly more transparent
-            canvas.circle(splat_x, splat_y, splat_size, fill=1)
+        color = random.choice(self.coffee_colors)
+        canvas.setFillColor(colors.Color(color[0]/255, color[1]/255, color[2]/255))
+        canvas.setFillAlpha(quantize_alpha(color[3]/255 * 0.7))  # Slightly more transparent
+        self.draw_form(canvas, self.pick('splatter'))
+        canvas.restoreState()
 
     def apply_printer_lines(self, canvas, width, height):
         """Apply enhanced printer line artifacts."""
         width = int(width)
         height = int(height)
+        self.library.add_page_size(width, height, self.paper_colors)
         num_lines = random.randint(1, 2)  # Reduced number for subtlety
         section_width = width / num_lines
         
         for i in range(num_lines):
             x = i * section_width + random.uniform(0, section_width/2)
-            line_width = random.uniform(0.3, 0.8)  # Thinner lines
+            name = self.pick('printer', width, height)
+            if not self.fits(name):
+                self.skipped += 1
+                continue
             
+            canvas.saveState()
+            canvas.translate(x, 0)
             # Main line with varying opacity
             canvas.setStrokeColor(colors.Color(0.2, 0.2, 0.2))
-            canvas.setStrokeAlpha(random.uniform(0.05, 0.1))
-            canvas.setLineWidth(line_width)
-            
-            # Create slight waviness
-            num_segments = random.randint(10, 15)
-            segment_height = height / num_segments
-            
-            for j in range(num_segments):
-                y1 = j * segment_height
-                y2 = (j + 1) * segment_height
-                offset = random.uniform(-0.5, 0.5)  # Subtle offset
-                canvas.line(x + offset, y1, x - offset, y2)
+            canvas.setStrokeAlpha(quantize_alpha(random.uniform(0.05, 0.1)))
+            canvas.setLineWidth(random.uniform(0.3, 0.8))  # Thinner lines
+            self.draw_form(canvas, name)
             
             # Add fading effect at ends
             canvas.setStrokeAlpha(0.03)
-            canvas.line(x, 0, x, height/10)  # Top fade
-            canvas.line(x, height*0.9, x, height)  # Bottom fade
+            canvas.line(0, 0, 0, height/10)  # Top fade
+            canvas.line(0, height*0.9, 0, height)  # Bottom fade
+            canvas.restoreState()
 
     def apply_distortions(self, canvas, width, height):
         """Apply enhanced distortions directly to the PDF canvas."""
@@ -1,118 +1,155 @@
-import random
-import string
+import io
 import csv
+import random
 from datetime import datetime, timedelta
-import os
-
-def load_data_from_csv(filename):
-    """Load data from a CSV file and return as a list."""
-    data = []
-    with open(os.path.join('inputs', filename), 'r') as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row:  # Skip empty rows
-                data.append(row[0])  # Assuming single column
-    return data
-
-# Load input data
-FIRST_NAMES_MALE = load_data_from_csv('firstnames_male.csv')
-FIRST_NAMES_FEMALE = load_data_from_csv('firstnames_female.csv')
-LAST_NAMES = load_data_from_csv('lastnames.csv')
-STREETS = load_data_from_csv('streetnames.csv')
-CITIES = load_data_from_csv('cities.csv')
-STATES = load_data_from_csv('states.csv')
-JOBS = load_data_from_csv('jobs.csv')
+
+import ids
+import columns
+from records import ColumnTable
+
+# The people table follows the schema in create.sql by default; any registered
+# column (see columns.py) can be chosen instead through configuration.
+PEOPLE_COLUMNS = ('customer_id', 'gender', 'name_prefix', 'name_first', 'name_last', 'email', 'employment',
+                  'address', 'city', 'county', 'state', 'postal_code', 'birth_dt', 'job_type', 'account_type',
+                  'phone_number', 'ssn', 'allergies', 'blood_type', 'last_ipaddress')
+REQUIRED_COLUMNS = ('customer_id',)
+# Columns drawn from small seed sets, dictionary-encoded in the generated tables
+CATEGORICAL_COLUMNS = ('gender', 'name_prefix', 'name_first', 'name_last', 'employment', 'city', 'county', 'state',
+                       'job_type', 'account_type', 'allergies', 'blood_type')
+SOCIAL_COLUMNS = ('interaction_id', 'person1_id', 'person2_id', 'interaction_type', 'interaction_date')
 
 def generate_id():
-    """Generate a random 16-character alphanumeric ID."""
-    return ''.join(random.choices(string.ascii_lowercase + string.digits, k=16))
-
-def generate_phone():
-    """Generate a random phone number in XXX-XXX-XXXX format."""
-    return f"{random.randint(100,999)}-{random.randint(100,999)}-{random.randint(1000,9999)}"
-
-def generate_email(first_name, last_name):
-    """Generate an email address from first and last name."""
-    domains = ['gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com', 'example.com']
-    separators = ['', '.', '_']
-    separator = random.choice(separators)
-    domain = random.choice(domains)
-    return f"{first_name.lower()}{separator}{last_name.lower()}@{domain}"
-
-def generate_zip():
-    """Generate a random 5-digit ZIP code."""
-    return f"{random.randint(10000,99999)}"
-
-def generate_person():
+    """Generate a 16-character alphanumeric ID."""
+    return ids.interaction_id()
+
+def resolve_columns(people_columns=None):
+    """Validate a people column list, returning it as a tuple."""
+    people_columns = tuple(people_columns or PEOPLE_COLUMNS)
+    missing = [name for name in REQUIRED_COLUMNS if name not in people_columns]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+    return people_columns
+
+def generate_person(people_columns=None):
     """Generate a single person's data."""
-    gender = random.choice(['M', 'F'])
-    first_name = random.choice(FIRST_NAMES_MALE if gender == 'M' else FIRST_NAMES_FEMALE)
-    last_name = random.choice(LAST_NAMES)
-    street = f"{random.randint(100,9999)} {random.choice(STREETS)}"
-    city = random.choice(CITIES)
-    state = random.choice(STATES)
-    zip_code = generate_zip()
-    phone = generate_phone()
-    email = generate_email(first_name, last_name)
-    job = random.choice(JOBS)
-    customer_id = generate_id()
-
-    return {
-        'customer_id': customer_id,
-        'first_name': first_name,
-        'last_name': last_name,
-        'street': street,
-        'city': city,
-        'state': state,
-        'zip': zip_code,
-        'phone': phone,
-        'email': email,
-        'job': job
-    }
-
-def createData(include_headers=True, num_customers=10, generate_transactions=True, transactions_per_customer=3, error_rate=0.0):
+    people_columns = resolve_columns(people_columns)
+    return dict(zip(people_columns, columns.compile_row_builder(people_columns)()))
+
+def rows_to_csv(rows, header=None):
+    """Join row tuples into CSV text, with an optional header line."""
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\n')
+    if header:
+        writer.writerow(header)
+    writer.writerows(rows)
+    return out.getvalue()
+
+def write_csv(f, rows, header=None, chunk_rows=10000):
+    """Write row tuples to a text sink in chunks, so streaming sinks can overlap their work."""
+    if header:
+        f.write(rows_to_csv([], header))
+    for start in range(0, len(rows), chunk_rows):
+        f.write(rows_to_csv(rows[start:start + chunk_rows]))
+
+def iter_social_rows(num_customers, num_interactions, first_customer=0):
+    """Yield random social interaction rows between num_customers customers from index first_customer.
+
+    Partner IDs come from ids.customer_id_for, so no customer list is needed.
+    """
+    if num_customers < 2:
+        return
+    interaction_types = ['email', 'phone', 'meeting', 'video_call']
+    # Dates are a random day in the last 30 days at the current time of day; format
+    # the 31 possible strings once instead of once per row
+    now = datetime.now()
+    dates = [(now - timedelta(days=days_ago)).strftime('%Y-%m-%d %H:%M:%S') for days_ago in range(31)]
+    # Look the generators up once; ids can be reconfigured between runs, not during one
+    randrange, choice, randint = random.randrange, random.choice, random.randint
+    interaction_id, customer_id = ids.interaction_ids.next, ids.customer_ids.id_for
+    for _ in range(num_interactions):
+        person1 = randrange(num_customers)
+        # Any other customer: draw from the other num_customers - 1 indexes
+        person2 = randrange(num_customers - 1)
+        if person2 >= person1:
+            person2 += 1
+        interaction_type = choice(interaction_types)
+        interaction_date = dates[randint(0, 30)]
+        yield (interaction_id(), customer_id(first_customer + person1), customer_id(first_customer + person2),
+               interaction_type, interaction_date)
+
+def new_social_table():
+    """Return an empty compact table for social interaction rows."""
+    return ColumnTable(SOCIAL_COLUMNS, categorical=('interaction_type',))
+
+def generate_social_rows(num_customers, num_interactions, first_customer=0):
+    """Generate random social interaction rows between num_customers customers from index first_customer."""
+    rows = new_social_table()
+    rows.extend(iter_social_rows(num_customers, num_interactions, first_customer))
+    return rows
+
+def generate_people_rows(num_customers, people_columns=None):
+    """Generate num_customers people rows as a ColumnTable ordered like people_columns."""
+    people_columns = resolve_columns(people_columns)
+    build_row = columns.compile_row_builder(people_columns)
+    people_rows = ColumnTable(people_columns, categorical=CATEGORICAL_COLUMNS)
+    for _ in range(num_customers):
+        people_rows.append(build_row())
+    return people_rows
+
+def iter_transaction_rows(customer_ids, transactions_per_customer=3, error_rate=0.0):
+    """Yield transaction rows customer by customer, e.g. for an ids.CustomerIdRange."""
+    # Import here to avoid circular import
+    from transactions import generateTransactionRows
+    for customer_id in customer_ids:
+        yield from generateTransactionRows(customer_id, transactions_per_customer, error_rate)
+
+def generate_transaction_rows(customer_ids, transactions_per_customer=3, error_rate=0.0, time_ordered=False,
+                              seasonality=0.3):
+    """Generate the transaction rows for a sequence of customer IDs as a ColumnTable."""
+    # Import here to avoid circular import
+    from transactions import new_transaction_table, generateTimeOrderedTransactionRows
+    if time_ordered:
+        return generateTimeOrderedTransactionRows(customer_ids, transactions_per_customer, error_rate, seasonality)
+    transaction_rows = new_transaction_table()
+    transaction_rows.extend(iter_transaction_rows(customer_ids, transactions_per_customer, error_rate))
+    return transaction_rows
+
+def generateRows(num_customers=10, generate_transactions=True, transactions_per_customer=3, error_rate=0.0,
+                 people_columns=None, time_ordered=False, seasonality=0.3):
+    """Generate people, transaction and social rows as compact ColumnTables.
+
+    This is the row source shared by the CSV output and the database sinks. People rows
+    are ordered like people_columns (default PEOPLE_COLUMNS). With time_ordered, transactions
+    span the full core.trans_start_date range and come back sorted by purchase time.
+    """
+    first_customer = ids.next_customer_index()
+    people_rows = generate_people_rows(num_customers, people_columns)
+    customer_ids = people_rows.column('customer_id')
+
+    if generate_transactions:
+        transaction_rows = generate_transaction_rows(customer_ids, transactions_per_customer, error_rate,
+                                                     time_ordered, seasonality)
+    else:
+        from transactions import new_transaction_table
+        transaction_rows = new_transaction_table()
+
+    # Generate twice as many interactions as people
+    social_rows = generate_social_rows(num_customers, num_customers * 2, first_customer)
+
+    return people_rows, transaction_rows, social_rows
+
+def createData(include_headers=True, num_customers=10, generate_transactions=True, transactions_per_customer=3, error_rate=0.0,
+               people_columns=None):
     """Generate customer data and optionally transactions."""
-    # Generate people data
-    people = [generate_person() for _ in range(num_customers)]
-    
-    # Create CSV content for people
-    people_csv = ""
-    if include_headers:
-        people_csv = "customer_id,first_name,last_name,street,city,state,zip,phone,email,job\n"
-    
-    for person in people:
-        people_csv += f"{person['customer_id']},{person['first_name']},{person['last_name']},{person['street']},"
-        people_csv += f"{person['city']},{person['state']},{person['zip']},{person['phone']},{person['email']},{person['job']}\n"
-    
-    # Generate transactions if requested
+    from transactions import TRANSACTION_COLUMNS
+    people_columns = resolve_columns(people_columns)
+    people_rows, transaction_rows, social_rows = generateRows(
+        num_customers, generate_transactions, transactions_per_customer, error_rate, people_columns)
+
+    people_csv = rows_to_csv(people_rows, people_columns if include_headers else None)
     transactions_csv = ""
     if generate_transactions:
-        if include_headers:
-            transactions_csv = "customer_id,orderid,purchasedatetime,transactiontotal,numberofitems,productcode,productcategory,cc_number,price_per_unit\n"
-        
-        # Import here to avoid circular import
-        from transactions import generateTransactions
-        for person in people:
-            transactions_csv += generateTransactions(person['customer_id'], transactions_per_customer, error_rate)
-    
-    # Generate social interactions only if we have more than one person
-    social_csv = ""
-    if include_headers:
-        social_csv = "interaction_id,person1_id,person2_id,interaction_type,interaction_date\n"
-    
-    # Generate some random social interactions between people
-    if num_customers > 1:
-        for _ in range(num_customers * 2):  # Generate twice as many interactions as people
-            person1 = random.choice(people)
-            person2 = random.choice([p for p in people if p['customer_id'] != person1['customer_id']])
-            
-            interaction_types = ['email', 'phone', 'meeting', 'video_call']
-            interaction_type = random.choice(interaction_types)
-            
-            # Generate a random date in the last 30 days
-            days_ago = random.randint(0, 30)
-            interaction_date = (datetime.now() - timedelta(days=days_ago)).strftime('%Y-%m-%d %H:%M:%S')
-            
-            social_csv += f"{generate_id()},{person1['customer_id']},{person2['customer_id']},{interaction_type},{interaction_date}\n"
-    
-    return people_csv, transactions_csv, social_csv 
\ No newline at end of file
+        transactions_csv = rows_to_csv(transaction_rows, TRANSACTION_COLUMNS if include_headers else None)
+    social_csv = rows_to_csv(social_rows, SOCIAL_COLUMNS if include_headers else None)
+
+    return people_csv, transactions_csv, social_csv
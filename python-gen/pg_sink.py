@@ -0,0 +1,265 @@
+import os
+import io
+import struct
+import datetime
+from decimal import Decimal
+
+from records import ColumnTable
+
+# PostgreSQL COPY sink: streams generated rows straight into a table with
+# COPY ... FROM STDIN, so no intermediate CSV file or separate load step is needed.
+#
+# psycopg2 is only needed when the sink opens its own connection; pass any
+# DB-API connection whose cursor has copy_expert() (e.g. a fake COPY server
+# used for local testing) via the `connection` argument instead.
+#
+# A sink loads its rows in one transaction: batches are sent as separate COPYs, but
+# they are committed together when the sink is closed, and rolled back if it is
+# aborted or its with-block exits with an error, so a failed load leaves no partial
+# table behind. Each sink (one per table, and per chunk with --workers) commits on its
+# own; rows_committed says how many rows a sink has made durable.
+#
+# The binary format needs every value in its column type's binary wire format.
+# COLUMN_TYPES lists the non-text columns of the tables in create.sql; every other
+# column is sent as UTF-8 text, which is the wire format of text and varchar.
+#
+# ColumnTables are encoded column by column: a dictionary-encoded column
+# (ColumnTable.encoded_column) has each distinct value escaped or converted once,
+# and its rows reuse those bytes by code.
+
+COPY_FORMATS = ('text', 'binary')
+
+# Binary COPY framing: signature, flags field, header extension length
+BINARY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)
+BINARY_TRAILER = struct.pack('!h', -1)
+
+# Non-text columns of the tables in create.sql, by table
+COLUMN_TYPES = {
+    'people': {'birth_dt': 'date'},
+    'transactions': {'transactiontotal': 'numeric', 'numberofitems': 'int4', 'price_per_unit': 'numeric'},
+    'social_interactions': {'interaction_date': 'timestamp'}
+}
+# Day zero of the binary date and timestamp formats
+PG_EPOCH = datetime.datetime(2000, 1, 1)
+
+# One pooled connection per worker process and DSN
+_connections = {}
+
+def get_connection(dsn):
+    """Return the pooled connection for this process, opening it on first use."""
+    key = (os.getpid(), dsn)
+    connection = _connections.get(key)
+    if connection is None or connection.closed:
+        try:
+            import psycopg2
+        except ImportError:
+            raise RuntimeError("The Postgres sink requires psycopg2 (pip install psycopg2-binary)")
+        connection = psycopg2.connect(dsn)
+        _connections[key] = connection
+    return connection
+
+def close_connections():
+    """Close all pooled connections opened by this process."""
+    pid = os.getpid()
+    for key in [k for k in _connections if k[0] == pid]:
+        _connections.pop(key).close()
+
+def escape_text(value):
+    """Escape a single value for the COPY text format."""
+    if value is None:
+        return '\\N'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+def encode_text_field(value):
+    """Encode a single value as one field of the COPY text format."""
+    return escape_text(value).encode('utf-8')
+
+def encode_text_row(row):
+    """Encode a row as one line of the COPY text format."""
+    return ('\t'.join(escape_text(value) for value in row) + '\n').encode('utf-8')
+
+def quote_identifier(name):
+    """Quote a table or column name for use in SQL."""
+    return '"' + name.replace('"', '""') + '"'
+
+def encode_text(value):
+    return str(value).encode('utf-8')
+
+def encode_int4(value):
+    return struct.pack('!i', int(value))
+
+def encode_numeric(value):
+    """Binary numeric: base-10000 digits with a weight, sign and display scale."""
+    value = Decimal(str(value))
+    if value.is_nan():
+        return struct.pack('!hhHH', 0, 0, 0xC000, 0)
+    sign, digits, exponent = value.as_tuple()
+    digits = ''.join(map(str, digits))
+    if exponent > 0:
+        digits += '0' * exponent
+        exponent = 0
+    dscale = -exponent
+    split = len(digits) - dscale
+    integer = digits[:max(split, 0)]
+    fraction = '0' * max(-split, 0) + digits[max(split, 0):]
+    integer = integer.zfill(-(-len(integer) // 4) * 4)
+    fraction = fraction.ljust(-(-len(fraction) // 4) * 4, '0')
+    groups = [int(integer[i:i + 4]) for i in range(0, len(integer), 4)]
+    weight = len(groups) - 1
+    groups += [int(fraction[i:i + 4]) for i in range(0, len(fraction), 4)]
+    while groups and groups[0] == 0:
+        groups.pop(0)
+        weight -= 1
+    while groups and groups[-1] == 0:
+        groups.pop()
+    if not groups:
+        weight = 0
+    return struct.pack(f'!hhHH{len(groups)}h', len(groups), weight, 0x4000 if sign else 0, dscale, *groups)
+
+def encode_date(value):
+    if isinstance(value, str):
+        value = datetime.date.fromisoformat(value)
+    return struct.pack('!i', (value - PG_EPOCH.date()).days)
+
+def encode_timestamp(value):
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    return struct.pack('!q', (value - PG_EPOCH) // datetime.timedelta(microseconds=1))
+
+BINARY_ENCODERS = {
+    'text': encode_text,
+    'int4': encode_int4,
+    'numeric': encode_numeric,
+    'date': encode_date,
+    'timestamp': encode_timestamp
+}
+
+def binary_encoders(columns, column_types):
+    """Return the binary encoder of each column, text for columns without a type."""
+    return [BINARY_ENCODERS[column_types.get(column, 'text')] for column in columns]
+
+def binary_field_encoder(encode):
+    """Wrap a binary encoder so it returns a whole field: length prefix and data, or NULL."""
+    null = struct.pack('!i', -1)
+    def encode_field(value):
+        if value is None:
+            return null
+        data = encode(value)
+        return struct.pack('!i', len(data)) + data
+    return encode_field
+
+def encode_binary_row(row, encoders=None):
+    """Encode a row as one binary COPY tuple, with one encoder per column (default: text)."""
+    parts = [struct.pack('!h', len(row))]
+    for position, value in enumerate(row):
+        if value is None:
+            parts.append(struct.pack('!i', -1))
+        else:
+            data = encoders[position](value) if encoders else encode_text(value)
+            parts.append(struct.pack('!i', len(data)))
+            parts.append(data)
+    return b''.join(parts)
+
+class PostgresCopySink:
+    """Buffers rows and sends them to a table in COPY batches."""
+
+    def __init__(self, table, columns, dsn=None, connection=None, batch_size=10000, copy_format='text',
+                 column_types=None):
+        """column_types maps column names to binary types (default: COLUMN_TYPES for the table)."""
+        if copy_format not in COPY_FORMATS:
+            raise ValueError(f"copy_format must be one of {COPY_FORMATS}")
+        if batch_size <= 0:
+            raise ValueError("batch_size must be greater than 0")
+        if connection is None and dsn is None:
+            raise ValueError("Either dsn or connection is required")
+        self.table = table
+        self.columns = tuple(columns)
+        self.connection = connection if connection is not None else get_connection(dsn)
+        self.batch_size = batch_size
+        self.copy_format = copy_format
+        if copy_format == 'binary':
+            encoders = binary_encoders(self.columns, COLUMN_TYPES.get(table, {}) if column_types is None
+                                       else column_types)
+            self.encode_row = lambda row: encode_binary_row(row, encoders)
+            self.field_encoders = [binary_field_encoder(encode) for encode in encoders]
+        else:
+            self.encode_row = encode_text_row
+            self.field_encoders = [encode_text_field] * len(self.columns)
+        self.buffer = []
+        self.rows_written = 0
+        self.rows_committed = 0
+
+    def copy_statement(self):
+        """Build the COPY statement for this sink."""
+        columns = ', '.join(quote_identifier(column) for column in self.columns)
+        options = " WITH (FORMAT binary)" if self.copy_format == 'binary' else ""
+        return f"COPY {quote_identifier(self.table)} ({columns}) FROM STDIN{options}"
+
+    def write_row(self, row):
+        """Add a row, sending a batch once batch_size rows are buffered."""
+        self.buffer.append(self.encode_row(row))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def write_rows(self, rows):
+        """Add many rows; ColumnTables with this sink's columns are encoded by column."""
+        if not isinstance(rows, ColumnTable) or rows.columns != self.columns:
+            for row in rows:
+                self.write_row(row)
+            return
+        for encoded in self.encode_table(rows):
+            self.buffer.append(encoded)
+            if len(self.buffer) >= self.batch_size:
+                self.flush()
+
+    def encode_table(self, table):
+        """Return the encoded rows of a ColumnTable, encoding each dictionary value once."""
+        fields = []
+        for name, encode in zip(table.columns, self.field_encoders):
+            values, dictionary = table.encoded_column(name)
+            if dictionary is None:
+                fields.append(map(encode, values))
+            else:
+                encoded = [encode(value) for value in dictionary]
+                fields.append(map(encoded.__getitem__, values))
+        if self.copy_format == 'binary':
+            count = struct.pack('!h', len(self.columns))
+            return [count + b''.join(row) for row in zip(*fields)]
+        return [b'\t'.join(row) + b'\n' for row in zip(*fields)]
+
+    def flush(self):
+        """Send the buffered rows as one COPY in the sink's transaction."""
+        if not self.buffer:
+            return
+        payload = b''.join(self.buffer)
+        if self.copy_format == 'binary':
+            payload = BINARY_HEADER + payload + BINARY_TRAILER
+        cursor = self.connection.cursor()
+        try:
+            cursor.copy_expert(self.copy_statement(), io.BytesIO(payload))
+        finally:
+            cursor.close()
+        self.rows_written += len(self.buffer)
+        self.buffer = []
+
+    def close(self):
+        """Flush any remaining rows and commit; the pooled connection stays open for reuse."""
+        self.flush()
+        self.connection.commit()
+        self.rows_committed = self.rows_written
+
+    def abort(self):
+        """Drop buffered rows and roll back everything sent since the last commit."""
+        self.buffer = []
+        self.connection.rollback()
+        self.rows_written = self.rows_committed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
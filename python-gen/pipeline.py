@@ -0,0 +1,189 @@
+import time
+import threading
+from collections import deque
+
+# Staged pipeline with bounded queues.
+#
+# Stages run on their own threads and pass work through BudgetQueues, which are
+# bounded by the approximate byte size of what they hold rather than by item count.
+# A producer that gets ahead of its consumer blocks in put() (back-pressure) or, for
+# queues created with shed=True, drops the item and counts it. A queue always admits
+# an item when it is empty, so an item larger than the budget cannot stall the run.
+#
+# When a stage fails every queue is aborted: queued items are dropped and blocked
+# stages are released. Items that hold a resource (e.g. a buffer the producer waits
+# to get back) can be queued with an on_drop callback, which abort() calls for them.
+#
+# Each queue records its peak depth and the time producers and consumers spent
+# waiting on it; Pipeline.depths() and report() expose them for tuning the budget.
+
+SIZE_SUFFIXES = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+def parse_size(text):
+    """Parse a byte size such as 512M, 2G or 65536."""
+    text = str(text).strip().upper().rstrip('B')
+    suffix = text[-1:] if text[-1:] in SIZE_SUFFIXES else ''
+    try:
+        value = float(text[:len(text) - len(suffix)])
+    except ValueError:
+        raise ValueError(f"Invalid size: {text!r} (use e.g. 512M or 2G)")
+    return int(value * SIZE_SUFFIXES[suffix])
+
+def format_size(size):
+    for suffix in ('G', 'M', 'K'):
+        if size >= SIZE_SUFFIXES[suffix]:
+            return f"{size / SIZE_SUFFIXES[suffix]:.1f}{suffix}"
+    return f"{size}B"
+
+class PipelineAborted(Exception):
+    """Raised in stages blocked on a queue after another stage failed."""
+
+class BudgetQueue:
+    """FIFO queue bounded by the total size of its items."""
+
+    def __init__(self, name, max_bytes, shed=False):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.shed = shed
+        self.items = deque()
+        self.bytes = 0
+        self.closed = False
+        self.aborted = False
+        self.condition = threading.Condition()
+        # Tuning statistics
+        self.total_items = 0
+        self.shed_items = 0
+        self.peak_items = 0
+        self.peak_bytes = 0
+        self.put_wait = 0.0
+        self.get_wait = 0.0
+
+    def put(self, item, size, on_drop=None):
+        """Queue an item of the given size; returns False if it was shed.
+
+        on_drop is called if abort() drops the item before a consumer gets it.
+        """
+        with self.condition:
+            if self.items and self.bytes + size > self.max_bytes and not self.aborted:
+                if self.shed:
+                    self.shed_items += 1
+                    return False
+                start = time.perf_counter()
+                while self.items and self.bytes + size > self.max_bytes and not self.aborted:
+                    self.condition.wait()
+                self.put_wait += time.perf_counter() - start
+            if self.aborted:
+                raise PipelineAborted(self.name)
+            self.items.append((item, size, on_drop))
+            self.bytes += size
+            self.total_items += 1
+            self.peak_items = max(self.peak_items, len(self.items))
+            self.peak_bytes = max(self.peak_bytes, self.bytes)
+            self.condition.notify_all()
+        return True
+
+    def get(self):
+        """Return the next item, or None once the queue is closed and drained."""
+        with self.condition:
+            if not self.items and not self.closed:
+                start = time.perf_counter()
+                while not self.items and not self.closed:
+                    self.condition.wait()
+                self.get_wait += time.perf_counter() - start
+            if not self.items:
+                return None
+            item, size, _ = self.items.popleft()
+            self.bytes -= size
+            self.condition.notify_all()
+            return item
+
+    def close(self):
+        """Mark the end of input; consumers drain what is left and then get None."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def abort(self):
+        """Drop queued items (calling their on_drop) and release every waiting producer and consumer."""
+        with self.condition:
+            self.aborted = True
+            self.closed = True
+            dropped, self.items = self.items, deque()
+            self.bytes = 0
+            self.condition.notify_all()
+        for _, _, on_drop in dropped:
+            if on_drop is not None:
+                on_drop()
+
+    def __iter__(self):
+        while True:
+            item = self.get()
+            if item is None:
+                return
+            yield item
+
+    def stats(self):
+        return {
+            'depth': len(self.items),
+            'bytes': self.bytes,
+            'budget': self.max_bytes,
+            'items': self.total_items,
+            'shed': self.shed_items,
+            'peak_depth': self.peak_items,
+            'peak_bytes': self.peak_bytes,
+            'put_wait': round(self.put_wait, 3),
+            'get_wait': round(self.get_wait, 3)
+        }
+
+class Pipeline:
+    """Runs stage functions on threads connected by BudgetQueues."""
+
+    def __init__(self):
+        self.queues = []
+        self.stages = []
+        self.errors = []
+
+    def queue(self, name, max_bytes, shed=False):
+        """Create a queue between two stages."""
+        return self.add_queue(BudgetQueue(name, max_bytes, shed))
+
+    def add_queue(self, budget_queue):
+        """Track a queue owned elsewhere (e.g. an OutputWriter's) in the stats."""
+        self.queues.append(budget_queue)
+        return budget_queue
+
+    def stage(self, name, function, *args):
+        """Add a stage; it should close its output queue when it is done."""
+        def run():
+            try:
+                function(*args)
+            except PipelineAborted:
+                pass
+            except BaseException as exc:
+                self.errors.append(exc)
+                for budget_queue in self.queues:
+                    budget_queue.abort()
+        self.stages.append(threading.Thread(target=run, name=f"stage-{name}", daemon=True))
+
+    def run(self):
+        """Start every stage, wait for all of them and re-raise the first failure."""
+        for thread in self.stages:
+            thread.start()
+        for thread in self.stages:
+            thread.join()
+        if self.errors:
+            raise self.errors[0]
+
+    def depths(self):
+        """Per-queue statistics keyed by queue name."""
+        return {budget_queue.name: budget_queue.stats() for budget_queue in self.queues}
+
+    def report(self):
+        """Human-readable queue statistics."""
+        lines = [f"{'queue':<12} {'budget':>8} {'items':>8} {'peak':>6} {'peak size':>10} {'shed':>6} "
+                 f"{'put wait':>9} {'get wait':>9}"]
+        for name, stats in self.depths().items():
+            lines.append(f"{name:<12} {format_size(stats['budget']):>8} {stats['items']:>8} {stats['peak_depth']:>6} "
+                         f"{format_size(stats['peak_bytes']):>10} {stats['shed']:>6} "
+                         f"{stats['put_wait']:>8.2f}s {stats['get_wait']:>8.2f}s")
+        return '\n'.join(lines)
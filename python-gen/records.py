@@ -0,0 +1,149 @@
+import sys
+from array import array
+
+# Compact struct-of-arrays storage for generated tables.
+#
+# A ColumnTable keeps one list (or typed array.array) per column instead of one
+# dict or tuple per row. Numeric columns given a typecode are stored unboxed, and
+# categorical columns are dictionary-encoded: each distinct value (state, county,
+# job title, product category, ...) is stored once and rows hold small integer codes.
+# For generated people rows this takes about a third less memory than a list of
+# dicts (tests/test_records.py measures it); most of what remains is the strings that
+# are unique per row, such as IDs, emails and addresses.
+#
+# Tables behave like a sequence of row tuples (len, iteration, indexing and
+# slicing) with codes expanded on the way out, so the CSV writer consumes them
+# unchanged; encoded_column() hands the codes and dictionary to the Postgres sink,
+# which encodes each distinct value once. record(i) gives a dict-like
+# Record view for code that reads fields by name.
+
+class Dictionary:
+    """Maps the distinct values of one column to dense integer codes."""
+
+    __slots__ = ('values', 'codes')
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+class Record:
+    """A lightweight, read-only view of one table row, indexed by column name."""
+
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    def __getitem__(self, name):
+        return self.table.value(self.table.positions[name], self.index)
+
+    def get(self, name, default=None):
+        position = self.table.positions.get(name)
+        return default if position is None else self.table.value(position, self.index)
+
+    def keys(self):
+        return self.table.columns
+
+    def __contains__(self, name):
+        return name in self.table.positions
+
+class ColumnTable:
+    """Column-major table of rows with optional typed and interned columns."""
+
+    def __init__(self, columns, typecodes=None, categorical=()):
+        self.columns = tuple(columns)
+        self.positions = {name: position for position, name in enumerate(self.columns)}
+        typecodes = typecodes or {}
+        # Encoded columns hold array('I') codes into their Dictionary
+        self.dictionaries = [Dictionary() if name in categorical else None for name in self.columns]
+        self.data = [array('I') if name in categorical else array(typecodes[name]) if name in typecodes else []
+                     for name in self.columns]
+        self.encoders = [(column.append, dictionary.encode) if dictionary is not None else (column.append, None)
+                         for column, dictionary in zip(self.data, self.dictionaries)]
+        self.size = 0
+
+    def append(self, row):
+        """Add one row given as a sequence ordered like columns."""
+        for (append, encode), value in zip(self.encoders, row):
+            append(encode(value) if encode else value)
+        self.size += 1
+
+    def extend(self, rows):
+        """Add many rows."""
+        for row in rows:
+            self.append(row)
+
+    def set(self, position, index, value):
+        """Replace the value at a column position and row index."""
+        dictionary = self.dictionaries[position]
+        self.data[position][index] = dictionary.encode(value) if dictionary is not None else value
+
+    def value(self, position, index):
+        """Return the decoded value at a column position and row index."""
+        dictionary = self.dictionaries[position]
+        value = self.data[position][index]
+        return dictionary.values[value] if dictionary is not None else value
+
+    def column(self, name):
+        """Return the decoded values of one column."""
+        position = self.positions[name]
+        dictionary = self.dictionaries[position]
+        if dictionary is not None:
+            return [dictionary.values[code] for code in self.data[position]]
+        return self.data[position]
+
+    def encoded_column(self, name):
+        """Return (codes, dictionary values) for an encoded column, or (values, None)."""
+        position = self.positions[name]
+        dictionary = self.dictionaries[position]
+        return self.data[position], dictionary.values if dictionary is not None else None
+
+    def nbytes(self):
+        """Approximate memory held by the table's values (codes and dictionaries included)."""
+        total = 0
+        for column, dictionary in zip(self.data, self.dictionaries):
+            if isinstance(column, array):
+                total += len(column) * column.itemsize
+            else:
+                total += sys.getsizeof(column) + sum(map(sys.getsizeof, column))
+            if dictionary is not None:
+                total += sum(map(sys.getsizeof, dictionary.values))
+        return total
+
+    def _decoded(self, position, index=None):
+        dictionary = self.dictionaries[position]
+        column = self.data[position] if index is None else self.data[position][index]
+        return map(dictionary.values.__getitem__, column) if dictionary is not None else column
+
+    def record(self, index):
+        """Return a Record view of one row."""
+        if not -self.size <= index < self.size:
+            raise IndexError("row index out of range")
+        return Record(self, index % self.size)
+
+    def records(self):
+        """Iterate over Record views of all rows."""
+        for index in range(self.size):
+            yield Record(self, index)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(zip(*(self._decoded(position, index) for position in range(len(self.columns)))))
+        return tuple(self.value(position, index) for position in range(len(self.columns)))
+
+    def __iter__(self):
+        return zip(*(self._decoded(position) for position in range(len(self.columns))))
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The generator modules are flat scripts that load their seed files from inputs/
+# relative to the working directory, so tests run from python-gen/.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
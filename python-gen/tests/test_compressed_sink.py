@@ -0,0 +1,35 @@
+import gzip
+import zlib
+
+import compressed_sink
+
+def write_lines(path, lines, **options):
+    with compressed_sink.CompressedWriter(str(path), 'gzip', **options) as f:
+        for line in lines:
+            f.write(line)
+
+def read_index(path):
+    with open(str(path) + '.idx') as f:
+        assert next(f) == "compressed_offset,uncompressed_offset\n"
+        return [tuple(int(value) for value in line.split(',')) for line in f]
+
+def test_stream_output_round_trips(tmp_path):
+    lines = [f"{n},row {n}\n" for n in range(5000)]
+    write_lines(tmp_path / 'out.csv.gz', lines, block_size=4096)
+    assert gzip.decompress((tmp_path / 'out.csv.gz').read_bytes()).decode() == ''.join(lines)
+
+def test_splittable_index_points_at_independent_blocks(tmp_path):
+    lines = [f"{n},{'x' * (n % 37)}\n" for n in range(5000)]
+    text = ''.join(lines).encode()
+    path = tmp_path / 'out.csv.gz'
+    write_lines(path, lines, splittable=True, block_size=4096)
+    data = path.read_bytes()
+    index = read_index(path)
+    assert len(index) > 1
+    assert index[0] == (0, 0)
+    ends = index[1:] + [(len(data), len(text))]
+    for (compressed, uncompressed), (next_compressed, next_uncompressed) in zip(index, ends):
+        # Every block decompresses on its own to whole rows at its uncompressed offset
+        block = zlib.decompress(data[compressed:next_compressed], 31)
+        assert block == text[uncompressed:next_uncompressed]
+        assert block.endswith(b'\n')
@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+import defects
+import ids
+import people
+
+def generate(count, seed):
+    ids.use_random_ids()
+    random.seed(seed)
+    ids.use_seeded_source(seed)
+    return people.generate_people_rows(count, people.resolve_columns(None))
+
+def replay(clean, log):
+    """Apply a defect log to clean rows, checking every logged original value."""
+    key = clean.positions['customer_id']
+    rows = [list(row) for row in clean]
+    by_id = {row[key]: row for row in rows}
+    for customer_id, column, defect, original, value in log:
+        if defect == 'duplicate':
+            assert value not in by_id
+            row = list(by_id[original])
+            row[key] = value
+            rows.append(row)
+            by_id[value] = row
+        else:
+            row = by_id[customer_id]
+            position = clean.positions[column]
+            assert row[position] == original
+            row[position] = value
+    return [tuple(row) for row in rows]
+
+def test_defect_log_replays_to_the_dirty_table():
+    clean = generate(3000, 5)
+    dirty = generate(3000, 5)
+    random.seed(6)
+    log = defects.DefectInjector(10, num_customers=3000).inject(dirty)
+    assert {row[2] for row in log} >= set(defects.DEFECT_KINDS)
+    assert replay(clean, log) == list(dirty)
+
+def test_injection_is_reproducible_and_keeps_keys():
+    first, second = generate(1000, 7), generate(1000, 7)
+    random.seed(8)
+    first_log = defects.DefectInjector(20, num_customers=1000).inject(first, first_customer=0)
+    random.seed(8)
+    second_log = defects.DefectInjector(20, num_customers=1000).inject(second, first_customer=0)
+    assert list(first_log) == list(second_log) and list(first) == list(second)
+    assert all(column != 'customer_id' for _, column, defect, _, _ in first_log if defect != 'duplicate')
+    customer_ids = first.column('customer_id')
+    assert len(set(customer_ids)) == len(customer_ids)
+
+def test_only_requested_kinds_are_injected():
+    rows = generate(500, 9)
+    log = defects.DefectInjector(30, ('email', 'phone'), 500).inject(rows)
+    assert {row[2] for row in log} == {'email', 'phone'}
+    assert len(rows) == 500
+
+def test_unknown_kind_is_rejected():
+    with pytest.raises(ValueError):
+        defects.DefectInjector(5, ('typo', 'smudge'))
+
+@pytest.mark.parametrize('edit', defects.TYPO_EDITS)
+def test_typo_edits_change_the_value(edit):
+    assert defects.typo('Johnson', edit, 0.5, 'n') != 'Johnson'
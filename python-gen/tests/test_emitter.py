@@ -0,0 +1,53 @@
+import os
+import json
+import socket
+import asyncio
+
+import pytest
+
+import emitter
+
+class RecordingStats(emitter.ListenerStats):
+    """ListenerStats that also keeps every line it receives."""
+
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def receive(self, line):
+        self.lines.append(line)
+        super().receive(line)
+
+async def emit_to_listener(path, count):
+    target = f'unix://{path}'
+    stats = RecordingStats()
+    listener = asyncio.create_task(emitter.listen(target, duration=10, max_events=count, stats=stats))
+    while not os.path.exists(path):
+        await asyncio.sleep(0.01)
+    sent = await emitter.emit(target, emitter.EventSource(20), rate=2000, max_events=count, report_interval=0)
+    await listener
+    return sent, stats
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason="Unix sockets are not available")
+def test_emit_streams_ordered_ndjson_to_a_listener(tmp_path):
+    count = 120
+    sent, stats = asyncio.run(asyncio.wait_for(emit_to_listener(str(tmp_path / 'events.sock'), count), 20))
+    assert sent.events == stats.events == len(stats.lines) == count
+    assert stats.invalid == 0
+    events = [json.loads(line) for line in stats.lines]
+    assert [event['seq'] for event in events] == list(range(count))
+    assert {event['event'] for event in events} <= set(emitter.EVENT_TYPES)
+    assert all(event['customer_id'] for event in events if event['event'] == 'transactions')
+
+@pytest.mark.parametrize('target, expected', [
+    ('-', ('stdout', None)),
+    ('tcp://127.0.0.1:9000', ('tcp', ('127.0.0.1', 9000))),
+    ('udp://[::1]:9000', ('udp', ('::1', 9000))),
+    ('unix:///tmp/events.sock', ('unix', '/tmp/events.sock'))
+])
+def test_parse_target(target, expected):
+    assert emitter.parse_target(target) == expected
+
+def test_parse_target_rejects_bad_addresses():
+    with pytest.raises(ValueError):
+        emitter.parse_target('tcp://localhost')
@@ -0,0 +1,27 @@
+import pytest
+
+import ids
+
+@pytest.mark.parametrize('size, alphabet', [(2, '0123456789'), (3, ids.LOWER36), (4, '01')])
+def test_unique_ids_permutation_is_a_bijection(size, alphabet):
+    unique = ids.UniqueIds(size, alphabet, key=b'test key')
+    positions = [unique.permute(index) for index in range(unique.space)]
+    assert sorted(positions) == list(range(unique.space))
+
+def test_unique_ids_are_distinct_fixed_width_and_keyed():
+    first = ids.UniqueIds(16, ids.LOWER36, key=b'k1').take(5000)
+    assert len(set(first)) == len(first)
+    assert all(len(value) == 16 and set(value) <= set(ids.LOWER36) for value in first)
+    assert ids.UniqueIds(16, ids.LOWER36, key=b'k1').take(5000) == first
+    assert ids.UniqueIds(16, ids.LOWER36, key=b'k2').take(5000) != first
+
+def test_unique_ids_reject_indexes_outside_the_space():
+    unique = ids.UniqueIds(2, '0123456789', key=b'k')
+    with pytest.raises(ValueError):
+        unique.permute(100)
+
+@pytest.mark.parametrize('size, alphabet', [(16, ids.LOWER36), (3, ids.LOWER36), (5, '01')])
+def test_unique_ids_batches_match_single_ids(size, alphabet):
+    unique = ids.UniqueIds(size, alphabet, key=b'batch')
+    indexes = range(min(unique.space, 2000))
+    assert unique.ids_for(indexes) == [unique.id_for(index) for index in indexes]
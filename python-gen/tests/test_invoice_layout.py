@@ -0,0 +1,50 @@
+import pytest
+
+import invoice_generator as ig
+import people
+from direct_pdf import DirectCanvas
+from line_items import LineItem
+
+STYLE = {'font': 'Helvetica', 'size': {'base': 10, 'header': 12, 'small': 8}, 'color': (0, 0, 0)}
+
+@pytest.mark.parametrize('count', [0, 1, 5, 9, 10, 30, 100])
+def test_paginate_transactions_places_every_row_once(count):
+    pages = ig.paginate_transactions(count)
+    indexes = [index for page in pages for index, _ in page['rows']]
+    assert indexes == list(range(count))
+    for page in pages:
+        assert all(y >= ig.PAGE_BOTTOM for _, y in page['rows'])
+    totals = [page for page in pages if page['total_y'] is not None]
+    assert len(totals) == 1 and totals[0] is pages[-1]
+    assert pages[-1]['total_y'] >= ig.PAGE_BOTTOM
+    assert pages[0]['top'] == ig.TABLE_TOP
+    assert all(page['top'] == ig.CONTINUATION_TABLE_TOP for page in pages[1:])
+
+def test_paginate_transactions_moves_the_total_to_its_own_page():
+    # Rows that exactly fill the first page leave no room for the total block
+    first_y = ig.TABLE_TOP - 15
+    capacity = int((first_y - ig.PAGE_BOTTOM) // ig.ROW_HEIGHT) + 1
+    pages = ig.paginate_transactions(capacity)
+    assert len(pages) == 2
+    assert len(pages[0]['rows']) == capacity and pages[0]['total_y'] is None
+    assert pages[1]['rows'] == [] and pages[1]['total_y'] is not None
+
+def test_paginate_transactions_rejects_pages_without_room_for_a_row():
+    with pytest.raises(ValueError):
+        ig.paginate_transactions(50, next_top=ig.PAGE_BOTTOM + 10)
+    # Rows that all fit on the first page never need a continuation page
+    assert len(ig.paginate_transactions(1, next_top=ig.PAGE_BOTTOM + 10)) == 1
+
+def test_draw_transactions_without_a_page_draws_everything():
+    items = [LineItem(f'item {n}', 2, 150, 300) for n in range(25)] + [LineItem('wrong', 1, 100, 250)]
+    canvas = DirectCanvas('unused.pdf')
+    ig.define_table_header(canvas, STYLE)
+    assert ig.draw_transactions(canvas, items, STYLE) is True
+    text = '\n'.join(canvas.code)
+    assert '(item 24)' in text and '(Total:)' in text
+
+def test_generate_invoice_accepts_the_old_positional_rates(tmp_path):
+    person = people.generate_people_rows(1).record(0)
+    items = [LineItem('item', 2, 150, 300)]
+    assert ig.generate_invoice(person, items, 5.0, 0.0, output_dir=str(tmp_path)) is False
+    assert (tmp_path / f"invoice_{person['customer_id']}.pdf").exists()
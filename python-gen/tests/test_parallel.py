@@ -0,0 +1,42 @@
+import csv
+import gzip
+
+import gendata
+import parallel
+import people
+
+# Columns holding times relative to the current time, which can tick between runs
+CLOCK_COLUMNS = {'purchasedatetime', 'interaction_date'}
+
+def read_table(path, opener=open):
+    with opener(path, 'rt', newline='') as f:
+        rows = list(csv.reader(f))
+    header = rows[0]
+    keep = [position for position, name in enumerate(header) if name not in CLOCK_COLUMNS]
+    return [[row[position] for position in keep] for row in rows]
+
+def run(tmp_path, name, *options):
+    output_dir = tmp_path / name
+    output_dir.mkdir()
+    args = gendata.parse_arguments(['--no-pdf', '--seed', '11', '--num-customers', '4500',
+                                    '--output-dir', str(output_dir), *options])
+    counts = parallel.generate_tables(args, people.resolve_columns(None), str(output_dir))
+    return output_dir, counts
+
+def test_output_is_the_same_for_any_number_of_workers(tmp_path):
+    one, one_counts = run(tmp_path, 'one', '--workers', '1')
+    three, three_counts = run(tmp_path, 'three', '--workers', '3')
+    assert one_counts == three_counts
+    assert one_counts['people'] == 4500
+    for filename in ('output_people.csv', 'output_transactions.csv', 'output_social.csv'):
+        assert read_table(one / filename) == read_table(three / filename)
+    assert not list(one.glob('.parts-*'))
+
+def test_compressed_parts_concatenate(tmp_path):
+    plain, _ = run(tmp_path, 'plain', '--workers', '2')
+    packed, _ = run(tmp_path, 'packed', '--workers', '2', '--compress', 'gzip')
+    assert read_table(packed / 'output_people.csv.gz', gzip.open) == read_table(plain / 'output_people.csv')
+
+def test_chunk_ranges_cover_every_customer():
+    ranges = parallel.chunk_ranges(4500, 2000)
+    assert ranges == [(0, 0, 2000), (1, 2000, 4000), (2, 4000, 4500)]
@@ -0,0 +1,124 @@
+import io
+import struct
+import datetime
+from decimal import Decimal
+
+import pytest
+
+import pg_sink
+from records import ColumnTable
+
+class FakeCursor:
+    def __init__(self, server):
+        self.server = server
+
+    def copy_expert(self, statement, stream):
+        self.server.copies.append((statement, stream.read()))
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    """Records COPY statements and payloads instead of talking to Postgres."""
+
+    def __init__(self):
+        self.copies = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+def decode_numeric(data):
+    ndigits, weight, sign, dscale = struct.unpack('!hhHH', data[:8])
+    groups = struct.unpack(f'!{ndigits}h', data[8:])
+    value = sum((Decimal(group) * Decimal(10000) ** (weight - i) for i, group in enumerate(groups)), Decimal(0))
+    return (-value if sign == 0x4000 else value).quantize(Decimal(1).scaleb(-dscale))
+
+def read_binary_copy(payload):
+    """Split a binary COPY payload into tuples of raw field bytes."""
+    assert payload.startswith(pg_sink.BINARY_HEADER)
+    stream = io.BytesIO(payload[len(pg_sink.BINARY_HEADER):])
+    rows = []
+    while True:
+        (count,) = struct.unpack('!h', stream.read(2))
+        if count == -1:
+            assert stream.read() == b''
+            return rows
+        row = []
+        for _ in range(count):
+            (length,) = struct.unpack('!i', stream.read(4))
+            row.append(None if length == -1 else stream.read(length))
+        rows.append(row)
+
+def test_text_copy_escapes_and_batches():
+    connection = FakeConnection()
+    with pg_sink.PostgresCopySink('people', ('customer_id', 'name_first'), connection=connection,
+                                  batch_size=2) as sink:
+        sink.write_rows([('a', 'tab\there'), ('b', 'back\\slash'), ('c', None)])
+    assert sink.rows_committed == 3
+    assert connection.commits == 1
+    statement, payload = connection.copies[0]
+    assert statement == 'COPY "people" ("customer_id", "name_first") FROM STDIN'
+    assert payload == b'a\ttab\\there\nb\tback\\\\slash\n'
+    assert connection.copies[1][1] == b'c\t\\N\n'
+
+def test_failed_load_rolls_back():
+    connection = FakeConnection()
+    with pytest.raises(RuntimeError):
+        with pg_sink.PostgresCopySink('people', ('customer_id',), connection=connection, batch_size=2) as sink:
+            sink.write_rows([('a',), ('b',), ('c',)])
+            raise RuntimeError('generator failed')
+    assert len(connection.copies) == 1
+    assert connection.commits == 0
+    assert connection.rollbacks == 1
+    assert sink.rows_committed == 0 and not sink.buffer
+
+@pytest.mark.parametrize('copy_format', pg_sink.COPY_FORMATS)
+def test_column_tables_encode_like_rows(copy_format):
+    columns = ('customer_id', 'state', 'birth_dt')
+    rows = [('a', 'NY', '1980-02-03'), ('b', 'tab\tstate', None), ('c', 'NY', '1999-12-31'), ('d', None, '2001-01-01')]
+    table = ColumnTable(columns, categorical=('state',))
+    table.extend(rows)
+    payloads = []
+    for source in (rows, table):
+        connection = FakeConnection()
+        with pg_sink.PostgresCopySink('people', columns, connection=connection, batch_size=3,
+                                      copy_format=copy_format) as sink:
+            sink.write_rows(source)
+        payloads.append([payload for _, payload in connection.copies])
+    assert payloads[0] == payloads[1] and len(payloads[1]) == 2
+
+def test_identifiers_are_quoted():
+    sink = pg_sink.PostgresCopySink('odd"table', ('col"umn',), connection=FakeConnection())
+    assert sink.copy_statement() == 'COPY "odd""table" ("col""umn") FROM STDIN'
+
+def test_binary_copy_uses_typed_wire_formats():
+    connection = FakeConnection()
+    columns = ('customer_id', 'transactiontotal', 'numberofitems', 'price_per_unit')
+    with pg_sink.PostgresCopySink('transactions', columns, connection=connection, copy_format='binary') as sink:
+        sink.write_rows([('c1', 179.85, 3, 59.95), ('c2', -0.5, 1, None)])
+    statement, payload = connection.copies[0]
+    assert statement.endswith('FROM STDIN WITH (FORMAT binary)')
+    rows = read_binary_copy(payload)
+    assert rows[0][0] == b'c1'
+    assert decode_numeric(rows[0][1]) == Decimal('179.85')
+    assert struct.unpack('!i', rows[0][2]) == (3,)
+    assert decode_numeric(rows[1][1]) == Decimal('-0.5')
+    assert rows[1][3] is None
+
+@pytest.mark.parametrize('value', ['0', '0.0001', '12345678.9', '100', '10000.01', '-42'])
+def test_numeric_round_trip(value):
+    assert decode_numeric(pg_sink.encode_numeric(value)) == Decimal(value)
+
+def test_binary_dates_and_timestamps():
+    assert struct.unpack('!i', pg_sink.encode_date(datetime.date(2000, 1, 2))) == (1,)
+    assert struct.unpack('!i', pg_sink.encode_date('1999-12-31')) == (-1,)
+    assert struct.unpack('!q', pg_sink.encode_timestamp('2000-01-01 00:00:01')) == (1000000,)
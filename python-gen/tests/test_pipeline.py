@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+import gendata
+import invoice_generator
+import pipeline
+import output_writer
+from output_writer import OutputWriter
+
+def finishes(function, timeout=10):
+    """Run function on a thread; return its exception (or None) once it finishes within the timeout."""
+    outcome = {}
+    def run():
+        try:
+            function()
+        except BaseException as exc:
+            outcome['error'] = exc
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "timed out"
+    return outcome.get('error')
+
+def test_abort_calls_on_drop_for_queued_items():
+    dropped = []
+    budget_queue = pipeline.BudgetQueue('test', 100)
+    budget_queue.put('a', 10, lambda: dropped.append('a'))
+    budget_queue.put('b', 10)
+    budget_queue.abort()
+    assert dropped == ['a']
+    assert budget_queue.get() is None
+    with pytest.raises(pipeline.PipelineAborted):
+        budget_queue.put('c', 10)
+
+def test_buffered_file_close_does_not_hang_after_abort(tmp_path):
+    writer = OutputWriter(threads=1)
+    busy, release = threading.Event(), threading.Event()
+    def blocking_job():
+        busy.set()
+        release.wait()
+    writer._submit(blocking_job, 1)
+    busy.wait()
+    f = writer.open(str(tmp_path / 'out.csv'), block_size=4096)
+    # One full block queued behind the busy I/O thread, then the queue is aborted
+    f.write('x' * 4096)
+    writer.queue.abort()
+    release.set()
+    assert finishes(f.close) is None
+    assert finishes(writer.close) is None
+
+def test_run_pipeline_reraises_a_render_failure(tmp_path, monkeypatch):
+    class RenderFailure(Exception):
+        pass
+    def fail(*args, **kwargs):
+        raise RenderFailure("render failed")
+    monkeypatch.setattr(invoice_generator, 'generate_invoice', fail)
+    args = gendata.parse_arguments(['--num-customers', '2000', '--memory-budget', '64K', '--io-threads', '1',
+                                    '--output-dir', str(tmp_path)])
+    error = finishes(lambda: gendata.run_pipeline(args, gendata.people.resolve_columns(None), str(tmp_path),
+                                                  str(tmp_path / 'pdf_output')), timeout=60)
+    assert isinstance(error, RenderFailure)
+
+def test_synced_files_are_held_open_in_bounded_batches(tmp_path, monkeypatch):
+    writer = OutputWriter(threads=1, sync=True, sync_batch=4)
+    batches = []
+    sync = writer._sync
+    monkeypatch.setattr(writer, '_sync', lambda fds: (batches.append(len(fds)), sync(fds)))
+    for n in range(10):
+        writer.write_file(str(tmp_path / f'{n}.bin'), b'x' * 100)
+    writer.close()
+    assert batches == [4, 4, 2]
+
+def test_fadvise_writes_dirty_pages_before_dropping_them(tmp_path, monkeypatch):
+    if not hasattr(output_writer.os, 'posix_fadvise'):
+        pytest.skip("posix_fadvise is not available")
+    calls = []
+    monkeypatch.setattr(output_writer.os, 'fdatasync', lambda fd: calls.append('fdatasync'))
+    monkeypatch.setattr(output_writer.os, 'posix_fadvise', lambda *args: calls.append('fadvise'))
+    with OutputWriter(threads=1, fadvise=True) as writer:
+        writer.write_file(str(tmp_path / 'a.bin'), b'x' * 100)
+    assert calls == ['fdatasync', 'fadvise']
@@ -0,0 +1,29 @@
+import gc
+import random
+import tracemalloc
+
+import columns
+import people
+
+def traced_size(build):
+    """Bytes still allocated after build() returns, with the same random stream for every build."""
+    random.seed(35)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+def test_column_table_uses_less_memory_than_a_list_of_dicts():
+    count = 5000
+    def dict_rows():
+        build_row = columns.compile_row_builder(people.PEOPLE_COLUMNS)
+        return [dict(zip(people.PEOPLE_COLUMNS, build_row())) for _ in range(count)]
+    dicts = traced_size(dict_rows)
+    table = traced_size(lambda: people.generate_people_rows(count))
+    # About a third less in practice; most of the rest is unique strings (IDs, emails, addresses)
+    assert table < 0.8 * dicts
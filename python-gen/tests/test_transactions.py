@@ -0,0 +1,40 @@
+import os
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+import transactions
+
+@pytest.fixture
+def new_york(monkeypatch):
+    if not hasattr(time, 'tzset'):
+        pytest.skip("time.tzset is not available")
+    monkeypatch.setenv('TZ', 'America/New_York')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+def epoch(*fields):
+    return int(datetime(*fields, tzinfo=timezone.utc).timestamp())
+
+def test_format_timestamps_uses_each_timestamps_own_offset(new_york):
+    times = [epoch(2024, 1, 15, 12), epoch(2024, 3, 10, 6, 59, 59), epoch(2024, 3, 10, 7), epoch(2024, 7, 1, 12)]
+    assert transactions.format_timestamps(times) == [
+        '2024-01-15 07:00:00',  # EST
+        '2024-03-10 01:59:59',  # the second before the clocks go forward
+        '2024-03-10 03:00:00',  # 02:00-03:00 does not exist locally
+        '2024-07-01 08:00:00'   # EDT
+    ]
+
+def test_format_timestamps_repeats_the_fall_back_hour(new_york):
+    times = [epoch(2024, 11, 3, 5, 30), epoch(2024, 11, 3, 5, 59, 59), epoch(2024, 11, 3, 6, 30)]
+    assert transactions.format_timestamps(times) == [
+        '2024-11-03 01:30:00',  # EDT
+        '2024-11-03 01:59:59',
+        '2024-11-03 01:30:00'   # EST, an hour later in real time
+    ]
+
+def test_format_timestamps_empty():
+    assert transactions.format_timestamps([]) == []
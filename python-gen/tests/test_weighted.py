@@ -0,0 +1,46 @@
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+import weighted
+
+WEIGHTS = [1, 2, 3, 4, 0, 10]
+
+def assert_matches_weights(counts, draws, weights=WEIGHTS):
+    total = sum(weights)
+    for index, weight in enumerate(weights):
+        assert counts.get(index, 0) / draws == pytest.approx(weight / total, abs=0.01)
+
+def test_alias_table_sample_follows_weights():
+    random.seed(1)
+    table = weighted.AliasTable(WEIGHTS)
+    draws = 100000
+    assert_matches_weights(Counter(table.sample() for _ in range(draws)), draws)
+
+def test_alias_table_sample_many_follows_weights():
+    table = weighted.AliasTable(WEIGHTS)
+    draws = 200000
+    indexes = table.sample_many(draws, np.random.default_rng(2))
+    assert_matches_weights(Counter(indexes.tolist()), draws)
+
+def test_alias_table_rejects_empty_weights():
+    with pytest.raises(ValueError):
+        weighted.AliasTable([0, 0])
+
+def test_weight_header_and_duplicate_folding():
+    seeds = weighted.WeightedSeeds.from_lines(['name,weight', 'a,3', 'b,1', ''])
+    assert seeds.values == ['a', 'b']
+    folded = weighted.WeightedSeeds.from_lines(['x', 'y', 'x', 'x'])
+    assert folded.values == ['x', 'y']
+    random.seed(3)
+    counts = Counter(folded.choice() for _ in range(20000))
+    assert counts['x'] / 20000 == pytest.approx(0.75, abs=0.02)
+
+def test_product_names_are_zipfian():
+    seeds = weighted.load_seeds('inputs/product_names.csv')
+    counts = Counter(seeds.choices(100000, np.random.default_rng(4)))
+    top_share = sum(count for _, count in counts.most_common(50)) / 100000
+    # 50 of 5000 products would get 1% of draws uniformly; Zipf's law gives them about half
+    assert top_share > 0.4
@@ -1,21 +1,14 @@
 import random
 import string
-import csv
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import os
 
-def load_data_from_csv(filename):
-    """Load data from a CSV file and return as a list."""
-    data = []
-    with open(os.path.join('inputs', filename), 'r') as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row:  # Skip empty rows
-                data.append(row[0])  # Assuming single column
-    return data
+import ids
+import weighted
+from records import ColumnTable
 
-# Load product data
-PRODUCT_NAMES = load_data_from_csv('product_names.csv')
+# Load product data; product_names.csv is weighted for a Zipfian mix of popular and rare products
+PRODUCT_NAMES = weighted.load_seeds(os.path.join('inputs', 'product_names.csv'))
 
 # Define product categories with their properties
 PRODUCT_CATEGORIES = [
@@ -71,10 +64,24 @@ def generate_cc_number():
     remaining_digits = ''.join(random.choices(string.digits, k=length-1))
     return f"{prefix}{remaining_digits}"
 
-def generate_transaction(customer_id, should_have_error=False):
-    """Generate a single transaction."""
+TRANSACTION_COLUMNS = ('customer_id', 'orderid', 'purchasedatetime', 'transactiontotal', 'numberofitems',
+                       'productcode', 'productcategory', 'cc_number', 'price_per_unit')
+
+# Numeric columns stored unboxed in ColumnTables
+TRANSACTION_TYPECODES = {
+    'transactiontotal': 'd',
+    'numberofitems': 'h',
+    'price_per_unit': 'd'
+}
+
+def new_transaction_table():
+    """Return an empty compact table for transaction rows."""
+    return ColumnTable(TRANSACTION_COLUMNS, typecodes=TRANSACTION_TYPECODES, categorical=('productcategory', 'productcode'))
+
+def generate_transaction_row(customer_id, should_have_error=False, purchase_date=None):
+    """Generate a single transaction as a tuple ordered like TRANSACTION_COLUMNS."""
     category = random.choice(PRODUCT_CATEGORIES)
-    product_name = random.choice(PRODUCT_NAMES)
+    product_name = PRODUCT_NAMES.choice()
     units = random.randint(category['min_units'], category['max_units'])
     price_per_unit = round(random.uniform(category['min_price'], category['max_price']), 2)
     
@@ -88,20 +95,24 @@ def generate_transaction(customer_id, should_have_error=False):
     else:
         total = correct_total
     
-    # Generate a random date in the last 30 days
-    days_ago = random.randint(0, 30)
-    purchase_date = (datetime.now() - timedelta(days=days_ago)).strftime('%Y-%m-%d %H:%M:%S')
+    # Generate a random date in the last 30 days unless the caller placed it in time
+    if purchase_date is None:
+        days_ago = random.randint(0, 30)
+        purchase_date = (datetime.now() - timedelta(days=days_ago)).strftime('%Y-%m-%d %H:%M:%S')
     
-    order_id = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+    order_id = ids.order_id()
     product_code = f"{category['code']}-{random.randint(100, 999)}"
     cc_number = generate_cc_number()
     
-    return f"{customer_id},{order_id},{purchase_date},{total},{units},{product_code},{category['name']},{cc_number},{price_per_unit}\n"
+    return (customer_id, order_id, purchase_date, total, units, product_code, category['name'], cc_number, price_per_unit)
 
-def generateTransactions(customer_id, max_transactions, error_rate=0.0):
-    """Generate multiple transactions for a customer."""
+def generate_transaction(customer_id, should_have_error=False):
+    """Generate a single transaction."""
+    return ','.join(str(value) for value in generate_transaction_row(customer_id, should_have_error)) + "\n"
+
+def generateTransactionRows(customer_id, max_transactions, error_rate=0.0):
+    """Generate multiple transaction rows for a customer."""
     num_transactions = random.randint(1, max_transactions)
-    transactions = ""
     
     # Convert error_rate from percentage to decimal
     error_rate = error_rate / 100.0
@@ -109,7 +120,87 @@ def generateTransactions(customer_id, max_transactions, error_rate=0.0):
     # Decide if this customer's transactions should have errors
     should_have_errors = random.random() < error_rate
     
-    for _ in range(num_transactions):
-        transactions += generate_transaction(customer_id, should_have_errors)
-    
-    return transactions 
\ No newline at end of file
+    return [generate_transaction_row(customer_id, should_have_errors) for _ in range(num_transactions)]
+
+def generate_purchase_times(counts, start, span_seconds, seasonality=0.3, peak_day=350):
+    """Place each customer's purchases on one time axis, sorted by time.
+
+    Purchases follow a Poisson process whose rate varies over the year as
+    1 + seasonality * cos(2*pi*(day_of_year - peak_day) / 365); conditioned on a
+    customer's purchase count, their times are independent draws from that density,
+    sampled here by vectorized thinning. Returns (owners, timestamps): NumPy arrays
+    of customer indexes and integer epoch seconds, ordered by timestamp.
+    """
+    import numpy as np
+    rng = np.random.default_rng(random.getrandbits(64))
+    counts = np.asarray(counts, dtype=np.int64)
+    total = int(counts.sum())
+    start_epoch = int(start.timestamp())
+    start_day = start.timetuple().tm_yday
+    seasonality = min(max(seasonality, 0.0), 1.0)
+
+    accepted = []
+    needed = total
+    while needed > 0:
+        offsets = rng.integers(0, span_seconds, int(needed * (1 + seasonality)) + 16)
+        day_of_year = (start_day + offsets // 86400) % 365
+        rate = 1 + seasonality * np.cos(2 * np.pi * (day_of_year - peak_day) / 365)
+        keep = offsets[rng.random(offsets.size) * (1 + seasonality) < rate]
+        accepted.append(keep[:needed])
+        needed -= min(needed, keep.size)
+    times = start_epoch + (np.concatenate(accepted) if accepted else np.empty(0, dtype=np.int64))
+
+    owners = np.repeat(np.arange(counts.size), counts)
+    order = np.argsort(times, kind='stable')
+    return owners[order], times[order]
+
+# Granularity of local UTC-offset lookups; DST and zone changes fall on quarter hours
+OFFSET_STEP = 900
+
+def local_offsets(times):
+    """Return the local UTC offset in seconds at each epoch second, DST included.
+
+    Offsets are looked up once per quarter hour that occurs in times.
+    """
+    import numpy as np
+    steps, inverse = np.unique(np.asarray(times) // OFFSET_STEP, return_inverse=True)
+    offsets = [datetime.fromtimestamp(step * OFFSET_STEP, timezone.utc).astimezone().utcoffset().total_seconds()
+               for step in steps.tolist()]
+    return np.asarray(offsets, dtype=np.int64)[inverse.reshape(-1)]
+
+def format_timestamps(times):
+    """Format integer epoch seconds in bulk as 'YYYY-MM-DD HH:MM:SS' local time.
+
+    Each timestamp gets the local offset in effect at that moment, so no time falls in
+    the hour skipped when clocks go forward. Local time is ambiguous when they go back:
+    the repeated hour is written twice (e.g. 01:30 EDT and then 01:30 EST), so strings
+    from that hour do not sort in real-time order. Order by the epoch seconds instead.
+    """
+    import numpy as np
+    times = np.asarray(times, dtype=np.int64)
+    if not times.size:
+        return []
+    text = np.datetime_as_string((times + local_offsets(times)).astype('datetime64[s]'))
+    return np.char.replace(text, 'T', ' ').tolist()
+
+def generateTimeOrderedTransactionRows(customer_ids, max_transactions, error_rate=0.0, seasonality=0.3):
+    """Generate transactions for all customers, already sorted by purchase time.
+
+    Purchase times span the core.trans_start_date range instead of the last 30 days,
+    so the table can be written in time order without an external sort.
+    """
+    import core as c
+    error_rate = error_rate / 100.0
+    counts = [random.randint(1, max_transactions) for _ in customer_ids]
+    should_have_errors = [random.random() < error_rate for _ in customer_ids]
+    owners, times = generate_purchase_times(counts, c.trans_start_date, c.max_seconds, seasonality)
+    dates = format_timestamps(times)
+    table = new_transaction_table()
+    for owner, date in zip(owners.tolist(), dates):
+        table.append(generate_transaction_row(customer_ids[owner], should_have_errors[owner], date))
+    return table
+
+def generateTransactions(customer_id, max_transactions, error_rate=0.0):
+    """Generate multiple transactions for a customer."""
+    rows = generateTransactionRows(customer_id, max_transactions, error_rate)
+    return ''.join(','.join(str(value) for value in row) + "\n" for row in rows) 
\ No newline at end of file
@@ -0,0 +1,112 @@
+import random
+from collections import Counter
+
+# Weighted seed lists sampled in O(1) with Walker/Vose alias tables.
+#
+# A seed file can carry weights in an optional last column, announced by a header
+# line whose last field is "weight", e.g.
+#
+#     name,weight
+#     Smith,828
+#     Johnson,655
+#
+# Files without a weight header are sampled uniformly; if they contain duplicate
+# lines (as city_county_state.csv does to fake weighting) the duplicates are folded
+# into counts, which keeps the same distribution with a smaller table.
+
+WEIGHT_HEADER = 'weight'
+
+def has_weight_header(lines):
+    """Return True if the first line announces a trailing weight column."""
+    return bool(lines) and lines[0].rsplit(',', 1)[-1].strip().lower() == WEIGHT_HEADER
+
+class AliasTable:
+    """Walker alias table over indexes 0..n-1 for a list of non-negative weights."""
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        if n == 0 or total <= 0:
+            raise ValueError("Alias table needs at least one positive weight")
+        scaled = [w * n / total for w in weights]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Anything left over is 1.0 up to rounding error
+        self.size = n
+        self._arrays = None
+
+    def sample(self):
+        """Draw one index."""
+        u = random.random() * self.size
+        i = int(u)
+        return i if u - i < self.prob[i] else self.alias[i]
+
+    def sample_many(self, count, rng=None):
+        """Draw count indexes at once as a NumPy array."""
+        import numpy as np
+        if self._arrays is None:
+            self._arrays = (np.asarray(self.prob), np.asarray(self.alias))
+        prob, alias = self._arrays
+        rng = rng if rng is not None else np.random.default_rng(random.getrandbits(64))
+        u = rng.random(count) * self.size
+        i = u.astype(np.int64)
+        return np.where(u - i < prob[i], i, alias[i])
+
+class WeightedSeeds:
+    """A seed list with an O(1) weighted (or uniform) sampler."""
+
+    def __init__(self, values, weights=None):
+        self.values = list(values)
+        self.table = AliasTable(weights) if weights is not None else None
+        self._array = None
+
+    @classmethod
+    def from_lines(cls, lines):
+        """Parse seed file lines, honouring an optional weight column."""
+        lines = [line for line in lines if line]
+        if has_weight_header(lines):
+            values, weights = [], []
+            for line in lines[1:]:
+                value, weight = line.rsplit(',', 1)
+                values.append(value)
+                weights.append(float(weight))
+            return cls(values, weights)
+        if len(set(lines)) != len(lines):
+            counts = Counter(lines)
+            return cls(list(counts), list(counts.values()))
+        return cls(lines)
+
+    def choice(self):
+        """Draw one value."""
+        if self.table is None:
+            return random.choice(self.values)
+        return self.values[self.table.sample()]
+
+    def choices(self, count, rng=None):
+        """Draw count values at once, vectorized over NumPy."""
+        import numpy as np
+        if self._array is None:
+            self._array = np.array(self.values, dtype=object)
+        if self.table is None:
+            rng = rng if rng is not None else np.random.default_rng(random.getrandbits(64))
+            indexes = rng.integers(0, len(self.values), count)
+        else:
+            indexes = self.table.sample_many(count, rng)
+        return self._array[indexes].tolist()
+
+    def __len__(self):
+        return len(self.values)
+
+def load_seeds(path):
+    """Load a seed file into WeightedSeeds."""
+    with open(path, 'r') as f:
+        return WeightedSeeds.from_lines(f.read().split('\n'))